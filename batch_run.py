@@ -2,10 +2,40 @@
 
 import os
 import json
+import shlex
 import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
 import shutil
 
+from run import (case_changes, cylinder_diameter, run_openfoam_simulation,
+                 run_parallel_simulation, create_visualization, parse_resolution)
+from physics import calculate_nu_from_reynolds
+from extract_data import extract_simulation_data, STORE_DIR
+from render import RENDERERS
+from probes import load_probe_spec
+from derived_fields import DERIVED_FIELDS
+import run_cache
+from metrics import RunMetrics, METRICS_FILE, SOLVER_LOG
+from courant import resolve_time_controls, DEFAULT_COURANT, DEFAULT_SNAPSHOTS_PER_PERIOD
+from warm_start import warm_start, initial_dir, reset_initial_conditions
+from manifest import Manifest, manifest_path, run_name, MAX_ATTEMPTS, RETRY_BACKOFF
+from foam_dict import CaseTemplate
+from meshgen import ensure_mesh, geometry
+
+# Case subdirectories each run may modify; everything else is shared
+PER_RUN_ENTRIES = ['system', '0', os.path.join('constant', 'transportProperties')]
+
+# run.py next to this script, run once per point of a serial sweep
+RUN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run.py')
+
+# Per-process memo of template cases: template_dir -> CaseTemplate
+_templates = {}
+
 
 def validate_json(data):
     """Validate JSON structure and data.
@@ -35,11 +65,360 @@ def validate_json(data):
     if not data['velocity'] or not data['Re']:
         print("Error: Arrays cannot be empty")
         return False
+
+    if 'priority' in data and (not isinstance(data['priority'], list)
+                               or len(data['priority']) != len(data['Re'])):
+        print("Error: 'priority' must be an array as long as 'Re'")
+        return False
+
+    if 'mesh' in data:
+        meshes = data['mesh'] if isinstance(data['mesh'], list) else [data['mesh']]
+        if isinstance(data['mesh'], list) and len(meshes) != len(data['Re']):
+            print("Error: a 'mesh' array must be as long as 'Re'")
+            return False
+        for mesh in meshes:
+            if mesh is not None and not isinstance(mesh, dict):
+                print("Error: 'mesh' entries must be objects of mesh parameters or null")
+                return False
+            try:
+                geometry(mesh)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return False
         
     return True
 
 
-def run_simulation(end_time, delta_t, Re, velocity, run_number):
+def link_tree(src, dst):
+    """Link a read-only directory into a case, falling back to hardlinks.
+
+    Args:
+        src: Directory to share (e.g. the template constant/polyMesh)
+        dst: Path of the link inside the new case
+    """
+    try:
+        os.symlink(os.path.abspath(src), dst, target_is_directory=True)
+    except OSError:
+        shutil.copytree(src, dst, copy_function=os.link)
+
+
+def case_template(template_dir):
+    """Return the per-run files of a template case, read once per process.
+
+    The initial conditions are read from 0.orig if the template was
+    warm-started in place.
+    """
+    key = os.path.abspath(template_dir)
+    if key not in _templates:
+        _templates[key] = CaseTemplate(template_dir, PER_RUN_ENTRIES,
+                                       {'0': initial_dir(template_dir)})
+    return _templates[key]
+
+
+def prepare_case(template_dir, case_dir, changes=None, mesh_dir=None):
+    """Create an isolated case directory from a template case.
+
+    Files a run modifies are written from the in-memory template with the
+    run's dictionary changes applied; constant/polyMesh is shared through
+    a symlink (or hardlinks where symlinks are unavailable).
+
+    Args:
+        template_dir: Path to the template OpenFOAM case
+        case_dir: Path of the new case directory
+        changes: dict of case file -> entry path -> value (see
+            run.case_changes), or None
+        mesh_dir: Case directory whose constant/polyMesh is linked instead
+            of the template's (e.g. a generated mesh), or None
+    """
+    os.makedirs(os.path.join(case_dir, 'constant'), exist_ok=True)
+    case_template(template_dir).write(case_dir, changes)
+    link_tree(os.path.join(mesh_dir or template_dir, 'constant', 'polyMesh'),
+              os.path.join(case_dir, 'constant', 'polyMesh'))
+    Path(case_dir, 'flow_cylinder.foam').touch()
+
+
+def publish(staging, final):
+    """Atomically move a finished output file or directory into place.
+
+    Args:
+        staging: Path of the completed output (same filesystem as final)
+        final: Destination path; an existing entry is replaced
+    """
+    if os.path.isdir(staging) and os.path.exists(final):
+        old = f'{final}.old-{os.getpid()}'
+        os.replace(final, old)
+        os.replace(staging, final)
+        shutil.rmtree(old)
+    else:
+        os.replace(staging, final)
+
+
+def order_pairs(pairs, jobs=1):
+    """Order (velocity, Re) pairs so that neighbouring Re values run in turn.
+
+    Pairs are sorted by Re. With several workers the sorted list is cut
+    into one contiguous block per worker and the blocks are interleaved,
+    so each worker walks along its own Re range and every run after the
+    first wave starts once its neighbour has finished.
+
+    Args:
+        pairs: List of (velocity, Re) tuples
+        jobs: Number of concurrent runs
+
+    Returns:
+        list: Reordered pairs
+    """
+    ordered = sorted(pairs, key=lambda pair: (pair[1], pair[0]))
+    jobs = max(1, min(jobs, len(ordered)))
+    size = -(-len(ordered) // jobs)
+    blocks = [ordered[i:i + size] for i in range(0, len(ordered), size)]
+    return [block[i] for i in range(size) for block in blocks if i < len(block)]
+
+
+def cache_params(Re, velocity, delta_t, write_format, write_compression, output_format,
+                 warm_start=None, early_stop=None, write_interval=0.1, probes=None,
+                 derived=None, mesh=None):
+    """Collect the run parameters that key a cached run (all but end_time).
+
+    The probes file is keyed by its contents, a generated mesh by its
+    complete geometry.
+    """
+    return {
+        'Re': float(Re),
+        'U': float(velocity),
+        'delta_t': float(delta_t),
+        'write_interval': float(write_interval),
+        'write_format': write_format,
+        'write_compression': write_compression,
+        'output_format': output_format,
+        'warm_start': warm_start,
+        'early_stop': early_stop,
+        'probes': load_probe_spec(probes) if probes else None,
+        'derived': sorted(derived) if derived else None,
+        'mesh': geometry(mesh) if mesh else None,
+    }
+
+
+def run_isolated(end_time, delta_t, Re, velocity, run_number, options, record=None,
+                 mesh=None):
+    """Run a single simulation in its own case directory.
+
+    Intended as a process-pool task: nothing outside the private case and
+    the staging directories is touched until the run is published.
+
+    Args:
+        end_time: Simulation end time
+        delta_t: Time step size, or None to choose it from the mesh
+        Re: Reynolds number
+        velocity: Inlet velocity (m/s)
+        run_number: Index of the run, used for log messages
+        options: dict with template_dir, work_dir, solver_cmd, write_format,
+            write_compression, n_procs, launcher, output_format, render,
+            keep_cases, cache_dir (None disables the run cache), cache_size,
+            warm_start (None, 'nearest' or 'interpolate'), early_stop
+            (convergence criteria, or None), write_interval, courant,
+            snapshots, metrics_file, resolution, frame_stride, renderer,
+            render_jobs, probes (probe file for the 'probes' format) and
+            derived (derived fields to store)
+        record: dict receiving the run's metrics record, or None
+        mesh: Mesh parameters of a generated mesh (see meshgen), or None
+            to use the template mesh
+
+    Returns:
+        bool: True if the run completed and was published
+    """
+    name = run_name(Re, velocity, mesh)
+    extract_kwargs = {'output_format': options['output_format'],
+                      'metadata': {'Re': Re, 'U': velocity},
+                      'early_stop': options['early_stop'],
+                      'probes': options['probes'],
+                      'derived': options['derived'],
+                      'decomposed': False}
+    mesh_dir = options['template_dir']
+    if mesh:
+        try:
+            mesh_dir = ensure_mesh(mesh, options['template_dir'])
+        except (RuntimeError, ValueError, OSError) as e:
+            print(f"[{run_number}] Error generating the mesh: {e}")
+            if record is not None:
+                record.update(run=name, Re=Re, U=velocity, status='failed', error=str(e))
+            return False
+        extract_kwargs['metadata']['mesh'] = geometry(mesh)
+        extract_kwargs['diameter'] = extract_kwargs['metadata']['mesh']['diameter']
+    delta_t, write_interval = resolve_time_controls(
+        mesh_dir, Re, velocity, delta_t, options['write_interval'],
+        options['courant'], options['snapshots'])
+    key = entry = None
+    if options['cache_dir']:
+        params = cache_params(Re, velocity, delta_t, options['write_format'],
+                              options['write_compression'], options['output_format'],
+                              options['warm_start'], options['early_stop'], write_interval,
+                              options['probes'], options['derived'], mesh)
+        key = run_cache.run_key(options['template_dir'], params, options['solver_cmd'])
+        entry = run_cache.lookup(key, options['cache_dir'])
+    metrics = RunMetrics(run=name, Re=Re, U=velocity, end_time=end_time, delta_t=delta_t,
+                         n_procs=options['n_procs'], status='failed')
+    print(f"[{run_number}] Starting Re={Re}, velocity={velocity}")
+    os.makedirs(options['work_dir'], exist_ok=True)
+    os.makedirs('data', exist_ok=True)
+    os.makedirs('media', exist_ok=True)
+    case_dir = tempfile.mkdtemp(prefix=f'case_{name}_', dir=options['work_dir'])
+    staging = tempfile.mkdtemp(prefix=f'.run_{name}_', dir='data')
+    os.chmod(staging, 0o755)
+    try:
+        if run_cache.covers(entry, end_time):
+            print(f"[{run_number}] Reusing cached results for Re={Re}, velocity={velocity}")
+            run_cache.restore_data(entry, staging)
+            tmp_video = os.path.join('media', f'.flow_{name}.mp4.tmp')
+            if options['render'] and run_cache.restore_video(entry, tmp_video):
+                publish(tmp_video, f'media/flow_{name}.mp4')
+            publish(staging, f'data/run_{name}')
+            metrics.record['status'] = 'cached'
+            return True
+
+        start_from = 'latestTime' if entry is not None and entry['latest_time'] else 'startTime'
+        nu = calculate_nu_from_reynolds(Re, velocity, cylinder_diameter(mesh_dir))
+        prepare_case(options['template_dir'], case_dir, case_changes(
+            end_time, delta_t, nu, velocity, options['write_format'],
+            options['write_compression'], start_from, write_interval, options['n_procs']),
+            mesh_dir)
+        if start_from == 'latestTime':
+            # Continue a shorter cached run from its last time directory
+            run_cache.restore_data(entry, staging)
+            latest = run_cache.restore_latest_time(entry, case_dir)
+            extract_kwargs['resume'] = True
+            print(f"[{run_number}] Resuming from cached time {latest}")
+        elif options['warm_start']:
+            extract_kwargs['metadata']['warm_start'] = warm_start(
+                case_dir, Re, velocity, 'data', options['warm_start'] == 'interpolate')
+
+        if options['n_procs'] > 1:
+            with metrics.stage('simulate'):
+                success = run_parallel_simulation(case_dir, options['n_procs'],
+                                                  options['solver_cmd'], options['launcher'])
+            if success:
+                with metrics.stage('extract'):
+                    extract_simulation_data(case_dir, staging, **extract_kwargs)
+        else:
+            # Extraction runs alongside the solver
+            success = run_openfoam_simulation(case_dir, options['solver_cmd'], staging,
+                                              metrics, **extract_kwargs)
+        metrics.add_solver_log(os.path.join(case_dir, SOLVER_LOG), staging)
+        if not success:
+            return False
+
+        video = os.path.join(case_dir, 'flow_visualization.mp4')
+        if options['render']:
+            with metrics.stage('render'):
+                create_visualization(case_dir, case_dir, options['renderer'],
+                                     store_path=os.path.join(staging, STORE_DIR),
+                                     render_jobs=options['render_jobs'],
+                                     resolution=options['resolution'],
+                                     stride=options['frame_stride'])
+        if key is not None:
+            run_cache.save(key, params, end_time, staging, case_dir, video,
+                           options['cache_dir'])
+            run_cache.evict(options['cache_size'], options['cache_dir'])
+        if options['render']:
+            if os.path.exists(video):
+                tmp_video = os.path.join('media', f'.flow_{name}.mp4.tmp')
+                shutil.move(video, tmp_video)
+                publish(tmp_video, f'media/flow_{name}.mp4')
+
+        publish(staging, f'data/run_{name}')
+        metrics.record['status'] = 'ok'
+        print(f"[{run_number}] Finished Re={Re}, velocity={velocity}")
+        return True
+    except Exception as e:
+        print(f"[{run_number}] Error: {e}")
+        metrics.record['error'] = str(e)
+        return False
+    finally:
+        metrics.write(options['metrics_file'])
+        if record is not None:
+            record.update(metrics.record)
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        if not options['keep_cases']:
+            shutil.rmtree(case_dir, ignore_errors=True)
+
+
+def run_points(manifest_args, run_point):
+    """Claim and run points of a sweep manifest until none are left.
+
+    Failed points are claimed again once their retry backoff has passed,
+    while they have attempts left.
+
+    Args:
+        manifest_args: Keyword arguments of Manifest (path, max_attempts,
+            backoff)
+        run_point: Callable taking a claimed point and returning
+            (success, metrics record or None)
+
+    Returns:
+        int: Number of successful runs
+    """
+    manifest = Manifest(**manifest_args)
+    successful = 0
+    try:
+        while True:
+            point = manifest.claim()
+            if point is None:
+                wait = manifest.next_retry()
+                if wait is None:
+                    return successful
+                time.sleep(wait)
+                continue
+            success, record = run_point(point)
+            outputs = {'data': f"data/run_{point['name']}"}
+            video = f"media/flow_{point['name']}.mp4"
+            if os.path.exists(video):
+                outputs['video'] = video
+            manifest.finish(point['id'], success, outputs, record,
+                            None if success else (record or {}).get('error', 'run failed'))
+            successful += bool(success)
+    finally:
+        manifest.close()
+
+
+def _run_isolated_point(end_time, delta_t, options, point):
+    """Run a manifest point with run_isolated (a picklable run_point)."""
+    record = {}
+    success = run_isolated(end_time, delta_t, point['Re'], point['U'], point['id'],
+                           options, record, point['mesh'])
+    return success, record
+
+
+def run_sweep(manifest_args, end_time, delta_t, jobs, options):
+    """Run the points of a sweep manifest concurrently in a process pool.
+
+    Each worker process claims points from the manifest until none are
+    left, so points are taken in priority order as workers become free.
+
+    Args:
+        manifest_args: Keyword arguments of Manifest
+        end_time: Simulation end time
+        delta_t: Time step size
+        jobs: Number of worker processes
+        options: Options passed to run_isolated
+
+    Returns:
+        int: Number of successful runs
+    """
+    run_point = partial(_run_isolated_point, end_time, delta_t, options)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_points, manifest_args, run_point) for _ in range(jobs)]
+        return sum(future.result() for future in as_completed(futures))
+
+
+def run_simulation(end_time, delta_t, Re, velocity, run_number,
+                   write_format='ascii', write_compression=False, solver_cmd=None,
+                   n_procs=1, launcher=None, output_format='store',
+                   cache_dir=None, cache_size=run_cache.DEFAULT_CACHE_BYTES,
+                   warm_start=None, early_stop=None, write_interval=None,
+                   courant=DEFAULT_COURANT, snapshots=DEFAULT_SNAPSHOTS_PER_PERIOD,
+                   metrics_file=METRICS_FILE, resolution=(1920, 1080), frame_stride=1,
+                   renderer='paraview', render_jobs=None, probes=None, derived=None):
     """Run single simulation with given parameters."""
     print(f"\nRunning simulation {run_number}")
     print(f"Parameters: Re={Re}, velocity={velocity}")
@@ -48,31 +427,68 @@ def run_simulation(end_time, delta_t, Re, velocity, run_number):
         # Create directories
         os.makedirs('media', exist_ok=True)
         run_dir = f'data/run_Re{Re}_U{velocity}'
+        video = f'media/flow_Re{Re}_U{velocity}.mp4'
+
+        delta_t, write_interval = resolve_time_controls(
+            'flow_cylinder', Re, velocity, delta_t, write_interval, courant, snapshots)
+        key = None
+        if cache_dir:
+            # Hash the pristine initial conditions, not 0/ as the last run left it
+            reset_initial_conditions('flow_cylinder')
+            params = cache_params(Re, velocity, delta_t, write_format,
+                                  write_compression, output_format, warm_start,
+                                  early_stop, write_interval, probes, derived)
+            key = run_cache.run_key('flow_cylinder', params, solver_cmd)
+            entry = run_cache.lookup(key, cache_dir)
+            if run_cache.covers(entry, end_time):
+                print("Reusing cached results")
+                shutil.rmtree(run_dir, ignore_errors=True)
+                run_cache.restore_data(entry, run_dir)
+                run_cache.restore_video(entry, video)
+                RunMetrics(run=f'Re{Re}_U{velocity}', Re=Re, U=velocity, end_time=end_time,
+                           delta_t=delta_t, n_procs=n_procs,
+                           status='cached').write(metrics_file)
+                return True
+
         os.makedirs(run_dir, exist_ok=True)
         
         # Run the simulation
         subprocess.run([
-            'python3',
-            'run.py',
+            sys.executable,
+            RUN_SCRIPT,
             '--end-time', str(end_time),
             '--delta-t', str(delta_t),
+            '--write-interval', str(write_interval),
             '--Re', str(Re),
-            '--velocity', str(velocity)
-        ], check=True)
+            '--velocity', str(velocity),
+            '--write-format', write_format,
+            '--solver', shlex.join(solver_cmd or ['icoFoam']),
+            '--np', str(n_procs),
+            '--launcher', shlex.join(launcher or ['mpirun']),
+            '--output-dir', run_dir,
+            '--format', output_format,
+            '--metrics', metrics_file,
+            '--resolution', '%dx%d' % tuple(resolution),
+            '--frame-stride', str(frame_stride),
+            '--renderer', renderer
+        ] + (['--compress'] if write_compression else [])
+          + (['--warm-start', warm_start] if warm_start else [])
+          + (['--render-jobs', str(render_jobs)] if render_jobs else [])
+          + (['--probes', probes] if probes else [])
+          + (['--derived', *derived] if derived else [])
+          + (['--early-stop',
+              '--stop-tolerance', str(early_stop.get('tolerance', 0.01)),
+              '--stop-periods', str(early_stop.get('n_periods', 4))]
+             if early_stop else []), check=True)
         
         # Move and rename the video file
         if os.path.exists('flow_visualization.mp4'):
-            new_name = f'media/flow_Re{Re}_U{velocity}.mp4'
-            shutil.move('flow_visualization.mp4', new_name)
-            print(f"Video saved as: {new_name}")
-        
-        # Extract data directly to run directory
-        print("Extracting simulation data...")
-        subprocess.run([
-            'python3',
-            'extract_data.py',
-            '--output-dir', run_dir
-        ], check=True)
+            shutil.move('flow_visualization.mp4', video)
+            print(f"Video saved as: {video}")
+
+        if key is not None:
+            run_cache.save(key, params, end_time, run_dir, 'flow_cylinder', video, cache_dir)
+            run_cache.evict(cache_size, cache_dir)
         
         return True
     except subprocess.CalledProcessError as e:
@@ -83,13 +499,66 @@ def run_simulation(end_time, delta_t, Re, velocity, run_number):
         return False
 
 
-def main(config_file, end_time, delta_t):
+def main(config_file, end_time, delta_t, write_format='ascii', write_compression=False,
+         jobs=None, solver_cmd=None, template_dir='flow_cylinder', work_dir='work',
+         render=True, keep_cases=False, n_procs=1, launcher=None, output_format='store',
+         cache_dir=run_cache.RUN_CACHE_DIR, cache_size=run_cache.DEFAULT_CACHE_BYTES,
+         warm_start=None, early_stop=None, write_interval=None, courant=DEFAULT_COURANT,
+         snapshots=DEFAULT_SNAPSHOTS_PER_PERIOD, metrics_file=METRICS_FILE,
+         resolution=(1920, 1080), frame_stride=1, renderer='paraview', render_jobs=None,
+         probes=None, derived=None, manifest=None, max_attempts=MAX_ATTEMPTS,
+         retry_backoff=RETRY_BACKOFF):
     """Run multiple simulations from config file.
+
+    The state of every (Re, velocity) point is kept in a manifest, so an
+    interrupted sweep resumes with the points that are not done yet.
+    Points may run on generated meshes given by the config's 'mesh' entry
+    (one object for all points, or an array with one object or null per
+    point); these need parallel runs (jobs).
     
     Args:
         config_file: Path to JSON configuration file
         end_time: Simulation end time
-        delta_t: Time step size
+        delta_t: Time step size, or None to choose it per run from the mesh
+            and the run's inlet velocity
+        write_format: Field output format, 'ascii' or 'binary'
+        write_compression: Whether to gzip the written fields
+        jobs: Number of parallel runs; if None, runs execute one after
+            another in the shared template case
+        solver_cmd: Solver command as an argument list, default ['icoFoam']
+        template_dir: Template case copied for each parallel run
+        work_dir: Directory holding the per-run case directories
+        render: Whether parallel runs render a video
+        keep_cases: Keep per-run case directories after they finish
+        n_procs: MPI ranks per run (decomposes each case when > 1)
+        launcher: MPI launcher command as an argument list, default ['mpirun']
+        output_format: Extracted data format, 'store', 'csv' or 'probes'
+        cache_dir: Directory of the run cache, or None to always simulate
+        cache_size: Size bound of the run cache in bytes
+        warm_start: Seed each run from the closest completed Re ('nearest'),
+            or interpolate between the two nearest ('interpolate'); runs
+            are then ordered by Re
+        early_stop: Convergence criteria (tolerance, n_periods) for
+            stopping runs once shedding has settled, or None
+        write_interval: Time between written fields, or None for automatic
+            (with automatic deltaT) or 0.1
+        courant: Target Courant number for the automatic deltaT
+        snapshots: Written time steps per expected shedding period
+        metrics_file: JSON lines file receiving one metrics record per run
+        resolution: (width, height) of the rendered videos
+        frame_stride: Render every frame_stride-th written time step
+        renderer: 'paraview' or 'matplotlib'
+        render_jobs: Processes drawing the frames of one video with the
+            matplotlib renderer; by default the CPUs are shared between
+            the parallel runs
+        probes: Probe file sampled by the 'probes' output format
+        derived: Derived fields (vorticity, Q, ...) added to each run's
+            store, or None
+        manifest: Sweep manifest database, default
+            data/manifest_<config name>.sqlite
+        max_attempts: Attempts per point before it stays failed
+        retry_backoff: Delay before the first retry of a failed point (s),
+            doubled on each further attempt
     """
     # Load and validate JSON
     try:
@@ -102,15 +571,81 @@ def main(config_file, end_time, delta_t):
     if not validate_json(data):
         return
         
-    # Run simulations
-    successful = 0
+    # Record the sweep points; done points of an earlier attempt are kept
     total = len(data['velocity'])
-    
-    for i, (velocity, Re) in enumerate(zip(data['velocity'], data['Re']), 1):
-        if run_simulation(end_time, delta_t, Re, velocity, i):
-            successful += 1
-            
-    print(f"\nCompleted {successful}/{total} simulations")
+    meshes = data.get('mesh')
+    if not isinstance(meshes, list):
+        meshes = [meshes] * total
+    if any(meshes) and not jobs:
+        print("Error: runs on generated meshes need --jobs")
+        return
+    pairs = list(zip(data['velocity'], data['Re'], data.get('priority', [0] * total), meshes))
+    if warm_start:
+        pairs = order_pairs(pairs, jobs or 1)
+    params = {
+        'end_time': end_time, 'delta_t': delta_t, 'write_interval': write_interval,
+        'courant': courant, 'snapshots': snapshots, 'write_format': write_format,
+        'write_compression': write_compression, 'output_format': output_format,
+        'n_procs': n_procs, 'template_dir': template_dir, 'solver_cmd': solver_cmd,
+        'warm_start': warm_start, 'early_stop': early_stop,
+        'probes': load_probe_spec(probes) if probes else None,
+        'derived': sorted(derived) if derived else None,
+    }
+    manifest_args = {'path': manifest or manifest_path(config_file),
+                     'max_attempts': max_attempts, 'backoff': retry_backoff}
+    sweep = Manifest(**manifest_args)
+    sweep.add(pairs, params)
+    recovered = sweep.recover()
+    names = {run_name(Re, velocity, mesh) for velocity, Re, _, mesh in pairs}
+    done = sum(point['state'] == 'done' and point['name'] in names
+               for point in sweep.points())
+    sweep.close()
+    print(f"Manifest {manifest_args['path']}: {done}/{total} points done"
+          + (f", {recovered} interrupted points resumed" if recovered else ""))
+
+    # Run simulations
+    if jobs:
+        options = {
+            'template_dir': template_dir,
+            'work_dir': work_dir,
+            'solver_cmd': solver_cmd,
+            'write_format': write_format,
+            'write_compression': write_compression,
+            'n_procs': n_procs,
+            'launcher': launcher,
+            'output_format': output_format,
+            'render': render,
+            'keep_cases': keep_cases,
+            'cache_dir': cache_dir,
+            'cache_size': cache_size,
+            'warm_start': warm_start,
+            'early_stop': early_stop,
+            'write_interval': write_interval,
+            'courant': courant,
+            'snapshots': snapshots,
+            'metrics_file': metrics_file,
+            'resolution': resolution,
+            'frame_stride': frame_stride,
+            'renderer': renderer,
+            'render_jobs': render_jobs or max(1, (os.cpu_count() or 1) // jobs),
+            'probes': probes,
+            'derived': derived,
+        }
+        successful = run_sweep(manifest_args, end_time, delta_t, jobs, options)
+    else:
+        successful = run_points(manifest_args, lambda point: (run_simulation(
+            end_time, delta_t, point['Re'], point['U'], point['id'],
+            write_format, write_compression, solver_cmd,
+            n_procs, launcher, output_format, cache_dir, cache_size,
+            warm_start, early_stop, write_interval, courant, snapshots,
+            metrics_file, resolution, frame_stride, renderer,
+            render_jobs, probes, derived), None))
+
+    sweep = Manifest(**manifest_args)
+    states = [point['state'] for point in sweep.points() if point['name'] in names]
+    sweep.close()
+    print(f"\nCompleted {successful} simulations; "
+          f"{states.count('done')}/{total} points done, {states.count('failed')} failed")
 
 
 if __name__ == "__main__":
@@ -119,7 +654,87 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Run multiple OpenFOAM simulations')
     parser.add_argument('input', type=str, help='JSON input file')
     parser.add_argument('--end-time', type=float, required=True, help='End time for simulation')
-    parser.add_argument('--delta-t', type=float, required=True, help='Time step size')
+    parser.add_argument('--delta-t', type=float, default=None,
+                        help='Time step size (default: largest stable step for --courant)')
+    parser.add_argument('--write-interval', type=float, default=None,
+                        help='Time between written fields (default: --snapshots per '
+                             'shedding period with automatic deltaT, else 0.1)')
+    parser.add_argument('--courant', type=float, default=DEFAULT_COURANT,
+                        help='Target Courant number for the automatic deltaT')
+    parser.add_argument('--snapshots', type=int, default=DEFAULT_SNAPSHOTS_PER_PERIOD,
+                        help='Written time steps per expected shedding period '
+                             'for the automatic writeInterval')
+    parser.add_argument('--write-format', choices=['ascii', 'binary'], default='ascii',
+                        help='Format of the written fields')
+    parser.add_argument('--compress', action='store_true',
+                        help='Write gzip-compressed fields (writeCompression on)')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Run N simulations in parallel, each in its own case directory')
+    parser.add_argument('--solver', type=str, default='icoFoam',
+                        help='Solver command to run inside each case directory')
+    parser.add_argument('--template', type=str, default='flow_cylinder',
+                        help='Template case for parallel runs')
+    parser.add_argument('--work-dir', type=str, default='work',
+                        help='Directory for the per-run case directories')
+    parser.add_argument('--no-video', action='store_true',
+                        help='Skip video rendering in parallel runs')
+    parser.add_argument('--keep-cases', action='store_true',
+                        help='Keep per-run case directories after they finish')
+    parser.add_argument('--np', dest='n_procs', type=int, default=1,
+                        help='Number of MPI ranks per run (decomposes the case when > 1)')
+    parser.add_argument('--launcher', type=str, default='mpirun',
+                        help='MPI launcher command used when --np > 1')
+    parser.add_argument('--format', choices=['store', 'csv', 'probes'], default='store',
+                        help='Output format of the extracted data')
+    parser.add_argument('--probes', type=str, default=None,
+                        help='Probe file (JSON points and lines) sampled with --format probes')
+    parser.add_argument('--derived', nargs='*', choices=DERIVED_FIELDS, default=None,
+                        help='Store derived fields (default with no names: all of them)')
+    parser.add_argument('--cache-dir', type=str, default=run_cache.RUN_CACHE_DIR,
+                        help='Directory of the run cache')
+    parser.add_argument('--cache-size', type=float,
+                        default=run_cache.DEFAULT_CACHE_BYTES / 1024 ** 3,
+                        help='Size bound of the run cache in GB (least recently used runs are evicted)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always simulate, never reuse or store cached runs')
+    parser.add_argument('--warm-start', choices=['nearest', 'interpolate'], default=None,
+                        help='Seed each run from the closest completed Re (or interpolate '
+                             'between the two nearest) and order runs by Re')
+    parser.add_argument('--early-stop', action='store_true',
+                        help='Stop each serial run once the shedding cycle has settled')
+    parser.add_argument('--stop-tolerance', type=float, default=0.01,
+                        help='Relative spread of St and mean Cd allowed for --early-stop')
+    parser.add_argument('--stop-periods', type=int, default=4,
+                        help='Number of shedding periods that must agree for --early-stop')
+    parser.add_argument('--metrics', type=str, default=METRICS_FILE,
+                        help='JSON lines file the per-run metrics are appended to')
+    parser.add_argument('--resolution', type=parse_resolution, default=(1920, 1080),
+                        help='Video resolution as WIDTHxHEIGHT (even numbers)')
+    parser.add_argument('--frame-stride', type=int, default=1,
+                        help='Render every N-th written time step')
+    parser.add_argument('--renderer', choices=RENDERERS, default='paraview',
+                        help='Render videos with ParaView (pvbatch) or Matplotlib')
+    parser.add_argument('--render-jobs', type=int, default=None,
+                        help='Processes drawing the frames of each video with '
+                             '--renderer matplotlib')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='Sweep manifest database (default: '
+                             'data/manifest_<input name>.sqlite)')
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS,
+                        help='Attempts per point before it stays failed')
+    parser.add_argument('--retry-backoff', type=float, default=RETRY_BACKOFF,
+                        help='Seconds before the first retry of a failed point '
+                             '(doubled on each further attempt)')
     
     args = parser.parse_args()
-    main(args.input, args.end_time, args.delta_t) 
\ No newline at end of file
+    main(args.input, args.end_time, args.delta_t, args.write_format, args.compress,
+         args.jobs, shlex.split(args.solver), args.template, args.work_dir,
+         not args.no_video, args.keep_cases, args.n_procs, shlex.split(args.launcher),
+         args.format, None if args.no_cache else args.cache_dir,
+         int(args.cache_size * 1024 ** 3), args.warm_start,
+         {'tolerance': args.stop_tolerance, 'n_periods': args.stop_periods}
+         if args.early_stop else None, args.write_interval, args.courant, args.snapshots,
+         args.metrics, args.resolution, args.frame_stride, args.renderer, args.render_jobs,
+         args.probes,
+         None if args.derived is None else args.derived or list(DERIVED_FIELDS),
+         args.manifest, args.max_attempts, args.retry_backoff) 
\ No newline at end of file
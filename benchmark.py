@@ -0,0 +1,793 @@
+"""Benchmarks of the extraction pipeline on synthetic cases.
+
+Nothing here needs OpenFOAM, ParaView or ffmpeg. make_case writes a
+synthetic case: a structured channel mesh of a chosen size with a square
+obstacle as the Circle patch, plus the template's dictionaries and
+initial conditions. The stub solver (python3 benchmark.py solve, run in a
+case directory) stands in for icoFoam: it follows the controlDict
+(endTime, deltaT, writeInterval, writeFormat, writeCompression,
+startFrom, stopAt), writes a travelling-wave wake at every write time and
+prints an icoFoam-like log, sleeping --step-time seconds per time step.
+
+The suite times each stage for every mesh size, step count and field
+format, each in a fresh process so that its peak memory is its own:
+
+    solve          stub solver writing the time directories
+    mesh           parsing the polyMesh
+    read           reading U and p of every time directory
+    write_store    appending the read snapshots to a result store
+    write_csv      appending them to the velocity/pressure CSVs
+    extract_store  extract_data with the store format (reads, writes, forces)
+    extract_csv    extract_data with the CSV format
+    sweep          batch_run with the stub solver, end to end
+
+Throughput is cells * steps per second (times the points of a sweep);
+peak memory is the high-water RSS of the stage's process and its
+children. Results are saved as JSON, and two result files are compared
+stage by stage:
+
+    python3 benchmark.py suite --sizes 1000 10000 --steps 20 --out data/bench.json
+    python3 benchmark.py compare data/bench_old.json data/bench.json
+    python3 benchmark.py readers --sizes 1000 10000 100000
+"""
+
+import contextlib
+import gzip
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from foam_io import read_field, count_cells
+from foam_dict import FoamDict, edit_dict
+from foam_mesh import parse_mesh, load_mesh
+from result_store import ResultStore
+from extract_data import (extract_simulation_data, list_time_dirs, read_time_field,
+                          store_snapshot, append_snapshot, ensure_directory)
+from run import control_dict_changes
+from warm_start import initial_dir
+
+
+# Field formats: name -> (binary, compressed)
+FORMATS = {
+    'ascii': (False, False),
+    'binary': (True, False),
+    'ascii.gz': (False, True),
+    'binary.gz': (True, True),
+}
+
+STAGES = ('solve', 'mesh', 'read', 'write_store', 'write_csv', 'extract_store',
+          'extract_csv')
+
+# Time between written fields of the synthetic runs (one write per step)
+WRITE_INTERVAL = 0.1
+
+# Shedding frequency of the stub solver's wake
+STUB_FREQUENCY = 0.2
+
+MESH_HEADER = '''FoamFile
+{{
+    version     2.0;
+    format      ascii;
+    class       {cls};
+    location    "constant/polyMesh";
+    object      {name};{note}
+}}
+// * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //
+
+'''
+
+
+FIELD_HEADER = '''FoamFile
+{{
+    version     2.0;
+    format      {fmt};
+    arch        "LSB;label=32;scalar=64";
+    class       {cls};
+    object      {name};
+}}
+// * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //
+
+dimensions      [0 1 -1 0 0 0 0];
+
+internalField   nonuniform List<{kind}>
+{n}
+('''
+
+FIELD_FOOTER = '''
+;
+
+boundaryField
+{
+}
+
+
+// ************************************************************************* //
+'''
+
+
+def legacy_read_vector_file(filepath):
+    """Line-by-line vector reader that extract_data.py used originally.
+
+    Kept as the baseline for the benchmark (debug printing removed).
+    """
+    with open(filepath, 'r') as f:
+        lines = f.readlines()
+    start_idx = -1
+    end_idx = -1
+    for i, line in enumerate(lines):
+        if line.strip() == '(':
+            start_idx = i + 1
+        elif line.strip() == ')':
+            end_idx = i
+            break
+    if start_idx == -1 or end_idx == -1:
+        return []
+    data = []
+    for line in lines[start_idx:end_idx]:
+        if '(' in line and ')' in line:
+            values = line.strip('()\n').split()
+            if len(values) == 3:
+                try:
+                    vector = [float(v) for v in values]
+                    data.append(np.sqrt(sum(v*v for v in vector)))
+                except ValueError:
+                    continue
+    return data
+
+
+def legacy_read_scalar_file(filepath):
+    """Line-by-line scalar reader that extract_data.py used originally."""
+    with open(filepath, 'r') as f:
+        lines = f.readlines()
+    start_idx = -1
+    end_idx = -1
+    for i, line in enumerate(lines):
+        if line.strip() == '(':
+            start_idx = i + 1
+        elif line.strip() == ')':
+            end_idx = i
+            break
+    if start_idx == -1 or end_idx == -1:
+        return []
+    data = []
+    for line in lines[start_idx:end_idx]:
+        try:
+            data.append(float(line.strip()))
+        except ValueError:
+            continue
+    return data
+
+
+def write_field(path, values, binary=False, compress=False):
+    """Write a volScalarField/volVectorField with the given values.
+
+    Args:
+        path: Output file path; the file name is used as the object name
+            ('.gz' is appended when compress is True)
+        values: Array of shape (N,) or (N, 3)
+        binary: Write the internalField as raw binary instead of ASCII
+        compress: Gzip the file
+
+    Returns:
+        str: Path of the written file
+    """
+    values = np.asarray(values, dtype=np.float64)
+    is_vector = values.ndim == 2
+    header = FIELD_HEADER.format(
+        fmt='binary' if binary else 'ascii',
+        cls='volVectorField' if is_vector else 'volScalarField',
+        kind='vector' if is_vector else 'scalar',
+        name=os.path.basename(path), n=len(values))
+    if binary:
+        body = values.astype('<f8').tobytes()
+    elif is_vector:
+        body = ''.join('\n(%g %g %g)' % tuple(v) for v in values).encode() + b'\n'
+    else:
+        body = ''.join('\n%g' % v for v in values).encode() + b'\n'
+    content = header.encode() + body + b')' + FIELD_FOOTER.encode()
+    if compress:
+        path += '.gz'
+        with gzip.open(path, 'wb', compresslevel=1) as f:
+            f.write(content)
+    else:
+        with open(path, 'wb') as f:
+            f.write(content)
+    return path
+
+
+def _best_time(func, path, repeat):
+    """Return the best wall time of func(path) over repeat calls."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_field_readers(sizes=(1000, 10000, 100000), repeat=3):
+    """Compare read_field against the legacy line-by-line readers.
+
+    Every size is timed for ASCII, binary and gzip-compressed variants of
+    the files; the legacy readers only understand plain ASCII.
+
+    Args:
+        sizes: Cell counts of the synthetic fields
+        repeat: Number of timed repetitions per reader (best is reported)
+
+    Returns:
+        list: One result dict per (size, field, format) combination
+    """
+    rng = np.random.default_rng(0)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            fields = (('U', rng.standard_normal((n, 3)), legacy_read_vector_file),
+                      ('p', rng.standard_normal(n), legacy_read_scalar_file))
+            for name, values, legacy in fields:
+                path = write_field(os.path.join(tmp, name), values)
+                t_legacy = _best_time(legacy, path, repeat)
+                for fmt, binary, compress in (('ascii', False, False),
+                                              ('binary', True, False),
+                                              ('ascii.gz', False, True),
+                                              ('binary.gz', True, True)):
+                    path = write_field(os.path.join(tmp, f'{name}_{fmt}'),
+                                       values, binary, compress)
+                    t_new = _best_time(read_field, path, repeat)
+                    results.append({
+                        'cells': n,
+                        'field': name,
+                        'format': fmt,
+                        'legacy_s': t_legacy,
+                        'read_field_s': t_new,
+                        'speedup': t_legacy / t_new,
+                    })
+                    print(f"{name:>2} {fmt:>9} {n:>8} cells: legacy "
+                          f"{t_legacy*1e3:8.2f} ms, read_field {t_new*1e3:8.2f} ms "
+                          f"({t_legacy / t_new:6.1f}x)")
+    return results
+
+
+def channel_mesh(n_cells, length=15.0, height=10.0, centre=(2.0, 5.0), diameter=1.0):
+    """Build a one-cell-deep structured channel mesh around a square obstacle.
+
+    The patches are those of the template case: In, Out, Bottom and Top on
+    the channel sides, Circle around the obstacle and FrontBack in z.
+
+    Args:
+        n_cells: Approximate number of cells
+        length: Channel length (x)
+        height: Channel height (y)
+        centre: Centre of the obstacle
+        diameter: Side of the obstacle
+
+    Returns:
+        dict: points (P, 3), faces (F, 4), owner, neighbour, n_internal and
+            patches as (name, type, start face, n faces) in file order
+    """
+    nx = max(4, round(math.sqrt(n_cells * length / height)))
+    ny = max(4, round(n_cells / nx))
+    dx, dy = length / nx, height / ny
+    xc = (np.arange(nx) + 0.5) * dx
+    yc = (np.arange(ny) + 0.5) * dy
+    inside = ((np.abs(xc[None, :] - centre[0]) < diameter / 2)
+              & (np.abs(yc[:, None] - centre[1]) < diameter / 2))
+    if not inside.any():
+        inside[int(centre[1] / dy), int(centre[0] / dx)] = True
+    active = ~inside
+    cell = np.full((ny, nx), -1)
+    cell[active] = np.arange(active.sum())
+
+    def point(i, j, k):
+        return (k * (ny + 1) + j) * (nx + 1) + i
+
+    # Point order giving a +x, +y or +z normal; reversed for the opposite side
+    def x_face(i, j):
+        return np.stack([point(i, j, 0), point(i, j + 1, 0), point(i, j + 1, 1),
+                         point(i, j, 1)], axis=-1)
+
+    def y_face(i, j):
+        return np.stack([point(i, j, 0), point(i, j, 1), point(i + 1, j, 1),
+                         point(i + 1, j, 0)], axis=-1)
+
+    def z_face(i, j, k):
+        return np.stack([point(i, j, k), point(i + 1, j, k), point(i + 1, j + 1, k),
+                         point(i, j + 1, k)], axis=-1)
+
+    jx, ix = np.nonzero(active[:, :-1] & active[:, 1:])
+    jy, iy = np.nonzero(active[:-1, :] & active[1:, :])
+    faces = np.concatenate([x_face(ix + 1, jx), y_face(iy, jy + 1)])
+    owner = np.concatenate([cell[jx, ix], cell[jy, iy]])
+    neighbour = np.concatenate([cell[jx, ix + 1], cell[jy + 1, iy]])
+    order = np.lexsort((neighbour, owner))
+    face_blocks, owner_blocks = [faces[order]], [owner[order]]
+
+    j, i = np.nonzero(active)
+    walls = [
+        np.nonzero(active[:, :-1] & inside[:, 1:]),
+        np.nonzero(inside[:, :-1] & active[:, 1:]),
+        np.nonzero(active[:-1, :] & inside[1:, :]),
+        np.nonzero(inside[:-1, :] & active[1:, :]),
+    ]
+    top, bottom = np.nonzero(active[-1])[0], np.nonzero(active[0])[0]
+    inlet, outlet = np.nonzero(active[:, 0])[0], np.nonzero(active[:, -1])[0]
+    boundary = [
+        ('FrontBack', 'empty', [z_face(i, j, 0)[:, ::-1], z_face(i, j, 1)],
+         [cell[j, i], cell[j, i]]),
+        ('Top', 'wall', [y_face(top, ny)], [cell[ny - 1, top]]),
+        ('In', 'patch', [x_face(0, inlet)[:, ::-1]], [cell[inlet, 0]]),
+        ('Bottom', 'wall', [y_face(bottom, 0)[:, ::-1]], [cell[0, bottom]]),
+        ('Out', 'patch', [x_face(nx, outlet)], [cell[outlet, nx - 1]]),
+        ('Circle', 'wall',
+         [x_face(walls[0][1] + 1, walls[0][0]), x_face(walls[1][1] + 1, walls[1][0])[:, ::-1],
+          y_face(walls[2][1], walls[2][0] + 1), y_face(walls[3][1], walls[3][0] + 1)[:, ::-1]],
+         [cell[walls[0]], cell[walls[1][0], walls[1][1] + 1],
+          cell[walls[2]], cell[walls[3][0] + 1, walls[3][1]]]),
+    ]
+    patches = []
+    start = len(owner)
+    for name, patch_type, blocks, owners in boundary:
+        face_blocks += blocks
+        owner_blocks += owners
+        n = sum(len(block) for block in blocks)
+        patches.append((name, patch_type, start, n))
+        start += n
+    faces = np.concatenate(face_blocks)
+
+    # Drop the points inside the obstacle
+    k, j, i = np.meshgrid(np.arange(2), np.arange(ny + 1), np.arange(nx + 1), indexing='ij')
+    points = np.column_stack([i.ravel() * dx, j.ravel() * dy, k.ravel() * 1.0])
+    used = np.unique(faces)
+    relabel = np.full(len(points), -1)
+    relabel[used] = np.arange(len(used))
+    return {'points': points[used], 'faces': relabel[faces],
+            'owner': np.concatenate(owner_blocks), 'neighbour': neighbour[order],
+            'n_cells': int(active.sum()), 'patches': patches}
+
+
+def _write_mesh_file(path, cls, lines, note=''):
+    """Write one ASCII polyMesh file holding a list of preformatted lines."""
+    with open(path, 'w') as f:
+        f.write(MESH_HEADER.format(cls=cls, name=os.path.basename(path), note=note))
+        f.write(f'{len(lines)}\n(\n')
+        f.write('\n'.join(lines))
+        f.write('\n)\n\n// ' + '*' * 73 + ' //\n')
+
+
+def write_mesh(mesh_dir, mesh):
+    """Write a channel_mesh as constant/polyMesh files."""
+    os.makedirs(mesh_dir, exist_ok=True)
+    n_faces, n_internal = len(mesh['faces']), len(mesh['neighbour'])
+    note = (f'\n    note        "nPoints:{len(mesh["points"])}  nCells:{mesh["n_cells"]}  '
+            f'nFaces:{n_faces}  nInternalFaces:{n_internal}";')
+    _write_mesh_file(os.path.join(mesh_dir, 'points'), 'vectorField',
+                     ['(%.10g %.10g %.10g)' % tuple(p) for p in mesh['points']])
+    _write_mesh_file(os.path.join(mesh_dir, 'faces'), 'faceList',
+                     ['4(%d %d %d %d)' % tuple(f) for f in mesh['faces']])
+    _write_mesh_file(os.path.join(mesh_dir, 'owner'), 'labelList',
+                     [str(c) for c in mesh['owner']], note)
+    _write_mesh_file(os.path.join(mesh_dir, 'neighbour'), 'labelList',
+                     [str(c) for c in mesh['neighbour']], note)
+    _write_mesh_file(os.path.join(mesh_dir, 'boundary'), 'polyBoundaryMesh', [
+        f'    {name}\n    {{\n        type            {patch_type};\n'
+        f'        nFaces          {n};\n        startFace       {start};\n    }}'
+        for name, patch_type, start, n in mesh['patches']])
+
+
+def make_case(case_dir, n_cells, field_format='ascii', steps=20, template_dir='flow_cylinder'):
+    """Write a synthetic case: channel mesh plus the template's dictionaries.
+
+    Args:
+        case_dir: New case directory
+        n_cells: Approximate number of cells
+        field_format: Key of FORMATS, the writeFormat/writeCompression set
+        steps: Number of time steps written up to endTime
+        template_dir: Case providing system/, transportProperties and 0/
+
+    Returns:
+        int: Number of cells of the mesh
+    """
+    mesh = channel_mesh(n_cells)
+    write_mesh(os.path.join(case_dir, 'constant', 'polyMesh'), mesh)
+    shutil.copytree(os.path.join(template_dir, 'system'), os.path.join(case_dir, 'system'))
+    shutil.copytree(initial_dir(template_dir), os.path.join(case_dir, '0'))
+    shutil.copy(os.path.join(template_dir, 'constant', 'transportProperties'),
+                os.path.join(case_dir, 'constant'))
+    binary, compress = FORMATS[field_format]
+    edit_dict(os.path.join(case_dir, 'system', 'controlDict'), control_dict_changes(
+        round(steps * WRITE_INTERVAL, 6), WRITE_INTERVAL, 'binary' if binary else 'ascii',
+        compress, write_interval=WRITE_INTERVAL))
+    return mesh['n_cells']
+
+
+def wake_fields(centres, t, frequency=STUB_FREQUENCY):
+    """Return a travelling-wave wake (U, p) at the cell centres at time t."""
+    x, y = centres[:, 0], centres[:, 1]
+    y = y - 0.5 * (y.min() + y.max())
+    envelope = np.exp(-y ** 2)
+    phase = 2 * np.pi * (frequency * t - 0.2 * x)
+    velocities = np.column_stack([1 - 0.3 * envelope * np.cos(phase) ** 2,
+                                  0.4 * envelope * np.sin(phase), np.zeros(len(x))])
+    pressures = (0.5 * (1 - (velocities ** 2).sum(axis=1))
+                 - 0.3 * y * envelope * np.sin(phase))
+    return velocities, pressures
+
+
+def stub_solve(case_dir='.', step_time=0.0):
+    """Stand in for icoFoam: write wake fields as the controlDict asks.
+
+    Prints an icoFoam-like log (time, Courant number, residuals, execution
+    time) and stops early once stopAt is set to writeNow.
+
+    Args:
+        case_dir: Case directory
+        step_time: Minimum wall time per time step (s)
+    """
+    control_path = os.path.join(case_dir, 'system', 'controlDict')
+    control = FoamDict.read(control_path)
+    end_time, delta_t = float(control['endTime']), float(control['deltaT'])
+    steps_per_write = max(1, round(float(control['writeInterval']) / delta_t))
+    binary = control.get('writeFormat') == 'binary'
+    compress = str(control.get('writeCompression', 'off')) in ('on', 'true', 'yes')
+    times = [float(t) for t in list_time_dirs(case_dir)]
+    t = float(control.get('startTime', 0))
+    if control.get('startFrom') == 'latestTime' and times:
+        t = max(times)
+    centres = parse_mesh(case_dir).cell_centres
+    clock = time.perf_counter()
+
+    print('Starting time loop\n')
+    step = 0
+    while t < end_time - 1e-6 * delta_t:
+        start = time.perf_counter()
+        t = round(t + delta_t, 9)
+        step += 1
+        print(f'Time = {t:g}\n\nCourant Number mean: 0.1 max: 0.5')
+        for name, residual in (('Ux', 1e-3), ('Uy', 2e-3), ('p', 1e-1)):
+            print(f'smoothSolver:  Solving for {name}, Initial residual = {residual / step:g}, '
+                  f'Final residual = 1e-08, No Iterations 3')
+        stop = False
+        if step % steps_per_write == 0 or t >= end_time - 1e-6 * delta_t:
+            time_dir = os.path.join(case_dir, '%g' % t)
+            os.makedirs(time_dir, exist_ok=True)
+            velocities, pressures = wake_fields(centres, t)
+            write_field(os.path.join(time_dir, 'U'), velocities, binary, compress)
+            write_field(os.path.join(time_dir, 'p'), pressures, binary, compress)
+            stop = FoamDict.read(control_path).get('stopAt') == 'writeNow'
+        time.sleep(max(0.0, step_time - (time.perf_counter() - start)))
+        elapsed = time.perf_counter() - clock
+        print(f'ExecutionTime = {elapsed:.2f} s  ClockTime = {round(elapsed)} s\n', flush=True)
+        if stop:
+            break
+    print('End\n')
+
+
+def _snapshots(case_dir):
+    """Yield (t, U, p) of every time directory after 0, read from disk."""
+    n_cells = count_cells(case_dir)
+    for t_dir in list_time_dirs(case_dir):
+        if float(t_dir) > 0:
+            yield (float(t_dir), read_time_field(case_dir, t_dir, 'U', n_cells),
+                   read_time_field(case_dir, t_dir, 'p', n_cells))
+
+
+def _bench_read(case_dir, options):
+    start = time.perf_counter()
+    for _ in _snapshots(case_dir):
+        pass
+    return time.perf_counter() - start
+
+
+def _timed_writes(case_dir, write):
+    """Return the time spent in write(t, U, p) over all snapshots (reads untimed)."""
+    seconds = 0.0
+    for snapshot in _snapshots(case_dir):
+        start = time.perf_counter()
+        write(*snapshot)
+        seconds += time.perf_counter() - start
+    return seconds
+
+
+def _bench_write_store(case_dir, options):
+    store = ResultStore('store', 'a')
+
+    def write(t, velocities, pressures):
+        store_snapshot(store, t, velocities, pressures)
+
+    seconds = _timed_writes(case_dir, write)
+    start = time.perf_counter()
+    store.flush()
+    return seconds + time.perf_counter() - start
+
+
+def _bench_write_csv(case_dir, options):
+    for name in ('velocity', 'pressure', 'drag'):
+        ensure_directory(name)
+    return _timed_writes(case_dir, lambda t, u, p: append_snapshot('.', t, u, p))
+
+
+def _bench_extract(output_format):
+    def bench(case_dir, options):
+        load_mesh(case_dir)
+        start = time.perf_counter()
+        extract_simulation_data(case_dir, 'out', output_format=output_format,
+                                metadata={'Re': 100.0, 'U': 1.0}, resume=False)
+        return time.perf_counter() - start
+    return bench
+
+
+def _bench_sweep(case_dir, options):
+    # batch_run pulls in the renderers and the run cache; only sweeps need it
+    from batch_run import main as run_batch
+
+    points = options['sweep_points']
+    with open('sweep.json', 'w') as f:
+        json.dump({'velocity': [1.0] * points, 'Re': [100 + 10 * k for k in range(points)]}, f)
+    control = FoamDict.read(os.path.join(case_dir, 'system', 'controlDict'))
+    binary, compress = FORMATS[options['format']]
+    solver = [sys.executable, os.path.abspath(__file__), 'solve',
+              '--step-time', str(options['step_time'])]
+    start = time.perf_counter()
+    run_batch('sweep.json', float(control['endTime']), float(control['deltaT']),
+              'binary' if binary else 'ascii', compress, options['jobs'], solver,
+              case_dir, render=False, cache_dir=None)
+    seconds = time.perf_counter() - start
+    finished = [name for name in os.listdir('data') if name.startswith('run_')]
+    if len(finished) != points:
+        raise RuntimeError(f"Only {len(finished)} of {points} sweep points finished")
+    return seconds
+
+
+def _bench_timed(func):
+    def bench(case_dir, options):
+        start = time.perf_counter()
+        func(case_dir)
+        return time.perf_counter() - start
+    return bench
+
+
+# Stage name -> function(case_dir, options) returning its wall time; each
+# runs with a scratch working directory as the current directory
+STAGE_FUNCTIONS = {
+    'idle': lambda case_dir, options: 0.0,
+    'solve': _bench_timed(stub_solve),
+    'mesh': _bench_timed(parse_mesh),
+    'read': _bench_read,
+    'write_store': _bench_write_store,
+    'write_csv': _bench_write_csv,
+    'extract_store': _bench_extract('store'),
+    'extract_csv': _bench_extract('csv'),
+    'sweep': _bench_sweep,
+}
+
+
+def _stage_process(queue, stage, case_dir, work_dir, options):
+    """Run one stage in a child process and report (seconds, peak RSS in MB)."""
+    try:
+        os.chdir(work_dir)
+        # Silence the stage and the processes it starts (sweep workers, solvers)
+        with open(os.devnull, 'w') as devnull:
+            os.dup2(devnull.fileno(), sys.stdout.fileno())
+        seconds = STAGE_FUNCTIONS[stage](case_dir, options)
+        peak = max(resource.getrusage(who).ru_maxrss
+                   for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+        queue.put((seconds, peak / 1024))
+    except Exception as e:
+        queue.put(f'{type(e).__name__}: {e}')
+
+
+def measure(stage, case_dir, work_dir, options=None):
+    """Time a stage in a fresh process.
+
+    Args:
+        stage: Key of STAGE_FUNCTIONS
+        case_dir: Synthetic case the stage works on
+        work_dir: Scratch directory used as the working directory
+        options: dict of stage options (sweep_points, jobs, step_time,
+            format)
+
+    Returns:
+        tuple: (wall time in s, peak RSS of the process and its children
+            in MB)
+    """
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_stage_process,
+                          args=(queue, stage, os.path.abspath(case_dir), work_dir, options or {}))
+    process.start()
+    result = queue.get()
+    process.join()
+    if isinstance(result, str):
+        raise RuntimeError(f"Stage '{stage}' failed: {result}")
+    return result
+
+
+def environment():
+    """Describe the code version and machine a benchmark ran on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_suite(sizes=(1000, 10000, 100000), steps=(20,), formats=('ascii', 'binary', 'ascii.gz'),
+              stages=STAGES + ('sweep',), sweep_points=4, jobs=2, step_time=0.0,
+              template_dir='flow_cylinder'):
+    """Time the pipeline stages on synthetic cases.
+
+    Every combination of mesh size, step count and field format gets a
+    new case; the stub solver writes its time directories (timed as the
+    'solve' stage), then every other stage runs on it.
+
+    Args:
+        sizes: Approximate cell counts
+        steps: Numbers of written time steps
+        formats: Field formats (keys of FORMATS)
+        stages: Stages to time (STAGES and 'sweep')
+        sweep_points: Points of the benchmark sweep
+        jobs: Parallel runs of the benchmark sweep
+        step_time: Minimum wall time per stub solver step in the sweep (s)
+        template_dir: Case providing the dictionaries and initial conditions
+
+    Returns:
+        dict: Environment, configuration, idle process RSS and one result
+            per (stage, cells, steps, format)
+    """
+    report = environment()
+    report['config'] = {'sizes': list(sizes), 'steps': list(steps), 'formats': list(formats),
+                        'stages': list(stages), 'sweep_points': sweep_points, 'jobs': jobs,
+                        'step_time': step_time}
+    results = report['results'] = []
+    base = tempfile.mkdtemp(prefix='benchmark_')
+    try:
+        idle = os.path.join(base, 'idle')
+        os.makedirs(idle)
+        report['baseline_rss_mb'] = measure('idle', base, idle)[1]
+        for n in sizes:
+            for n_steps in steps:
+                for fmt in formats:
+                    case_dir = os.path.join(base, f'case_{n}_{n_steps}_{fmt}')
+                    n_cells = make_case(case_dir, n, fmt, n_steps, template_dir)
+                    if 'solve' not in stages:
+                        with open(os.devnull, 'w') as devnull, \
+                                contextlib.redirect_stdout(devnull):
+                            stub_solve(case_dir)
+                    options = {'sweep_points': sweep_points, 'jobs': jobs,
+                               'step_time': step_time, 'format': fmt}
+                    for stage in (s for s in STAGES + ('sweep',) if s in stages):
+                        work_dir = os.path.join(base, f'work_{stage}')
+                        os.makedirs(work_dir)
+                        seconds, peak = measure(stage, case_dir, work_dir, options)
+                        shutil.rmtree(work_dir)
+                        work = n_cells * n_steps * (sweep_points if stage == 'sweep' else 1)
+                        results.append({'stage': stage, 'cells': n_cells, 'steps': n_steps,
+                                        'format': fmt, 'seconds': seconds,
+                                        'throughput': work / seconds if seconds else None,
+                                        'peak_rss_mb': peak})
+                        print(f"{stage:>13} {n_cells:>8} cells {n_steps:>4} steps {fmt:>9}: "
+                              f"{seconds:8.3f} s {work / max(seconds, 1e-12):12.4g} "
+                              f"cells*steps/s  peak {peak:7.1f} MB")
+                    shutil.rmtree(case_dir)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    return report
+
+
+def save_results(report, path):
+    """Write a benchmark report as JSON (atomically)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp, path)
+    print(f"Saved {path}")
+
+
+def compare_results(old_path, new_path):
+    """Print the speedup of every stage found in two benchmark reports.
+
+    Returns:
+        list: (stage, cells, steps, format, old s, new s, speedup) rows
+    """
+    with open(old_path, 'r') as f:
+        old = json.load(f)
+    with open(new_path, 'r') as f:
+        new = json.load(f)
+
+    def key(result):
+        return result['stage'], result['cells'], result['steps'], result['format']
+
+    before = {key(result): result for result in old['results']}
+    rows = []
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for result in new['results']:
+        previous = before.get(key(result))
+        if previous is None or not result['seconds']:
+            continue
+        speedup = previous['seconds'] / result['seconds']
+        rows.append(key(result) + (previous['seconds'], result['seconds'], speedup))
+        print(f"{result['stage']:>13} {result['cells']:>8} cells {result['steps']:>4} steps "
+              f"{result['format']:>9}: {previous['seconds']:8.3f} s -> "
+              f"{result['seconds']:8.3f} s ({speedup:5.2f}x), peak "
+              f"{previous['peak_rss_mb']:.0f} -> {result['peak_rss_mb']:.0f} MB")
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the extraction pipeline')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    suite_parser = subparsers.add_parser('suite', help='Time the pipeline on synthetic cases')
+    suite_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                              help='Approximate cell counts of the synthetic meshes')
+    suite_parser.add_argument('--steps', type=int, nargs='+', default=[20],
+                              help='Numbers of written time steps')
+    suite_parser.add_argument('--formats', nargs='+', choices=list(FORMATS),
+                              default=['ascii', 'binary', 'ascii.gz'], help='Field formats')
+    suite_parser.add_argument('--stages', nargs='+', choices=STAGES + ('sweep',),
+                              default=list(STAGES + ('sweep',)), help='Stages to time')
+    suite_parser.add_argument('--sweep-points', type=int, default=4,
+                              help='Points of the benchmark sweep')
+    suite_parser.add_argument('--jobs', type=int, default=2,
+                              help='Parallel runs of the benchmark sweep')
+    suite_parser.add_argument('--step-time', type=float, default=0.0,
+                              help='Minimum wall time per stub solver step in the sweep (s)')
+    suite_parser.add_argument('--template', type=str, default='flow_cylinder',
+                              help='Case providing the dictionaries and initial conditions')
+    suite_parser.add_argument('--out', type=str, default=os.path.join('data', 'benchmark.json'),
+                              help='JSON file receiving the results')
+    compare_parser = subparsers.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('old', help='Earlier results')
+    compare_parser.add_argument('new', help='Later results')
+    readers_parser = subparsers.add_parser('readers',
+                                           help='Compare read_field with the legacy readers')
+    readers_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                                help='Cell counts of the synthetic fields')
+    readers_parser.add_argument('--repeat', type=int, default=3, help='Repetitions per reader')
+    case_parser = subparsers.add_parser('case', help='Write a synthetic case')
+    case_parser.add_argument('case_dir', help='New case directory')
+    case_parser.add_argument('--cells', type=int, default=10000, help='Approximate cell count')
+    case_parser.add_argument('--steps', type=int, default=20, help='Written time steps')
+    case_parser.add_argument('--format', choices=list(FORMATS), default='ascii',
+                             help='Field format')
+    case_parser.add_argument('--template', type=str, default='flow_cylinder',
+                             help='Case providing the dictionaries and initial conditions')
+    solve_parser = subparsers.add_parser('solve', help='Stub icoFoam, run inside a case')
+    solve_parser.add_argument('--case-dir', type=str, default='.', help='Case directory')
+    solve_parser.add_argument('--step-time', type=float, default=0.0,
+                              help='Minimum wall time per time step (s)')
+
+    args = parser.parse_args()
+    if args.command == 'suite':
+        save_results(run_suite(args.sizes, args.steps, args.formats, tuple(args.stages),
+                               args.sweep_points, args.jobs, args.step_time, args.template),
+                     args.out)
+    elif args.command == 'compare':
+        compare_results(args.old, args.new)
+    elif args.command == 'readers':
+        bench_field_readers(args.sizes, args.repeat)
+    elif args.command == 'case':
+        n_cells = make_case(args.case_dir, args.cells, args.format, args.steps, args.template)
+        print(f"Wrote {args.case_dir} ({n_cells} cells); run 'python3 benchmark.py solve' "
+              f"in it to write the time directories")
+    else:
+        stub_solve(args.case_dir, args.step_time)
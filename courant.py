@@ -0,0 +1,168 @@
+"""Choose deltaT and writeInterval from the mesh and the flow conditions.
+
+icoFoam is only stable for Courant numbers below about 1. The Courant
+number of a cell is
+
+    Co = 0.5 * deltaT * sum_f |U . S_f| / V <= deltaT * |U| * 0.5 * sum_f |S_f| / V
+
+so the largest stable deltaT for a target Courant number follows from the
+peak velocity and the largest 0.5 * sum_f |S_f| / V (an inverse cell size)
+over the mesh. Faces on 'empty' patches carry no flux in a 2D case and
+are left out.
+
+The write interval is chosen so that the expected shedding period,
+estimated from Roshko's Strouhal-Reynolds relation, is resolved by a
+fixed number of snapshots.
+"""
+
+import math
+import numpy as np
+from foam_mesh import load_mesh
+from forces import patch_diameter
+
+
+# Target Courant number for automatic time steps
+DEFAULT_COURANT = 0.5
+
+# Peak velocity around the cylinder relative to the inlet velocity
+# (2 for potential flow)
+VELOCITY_SPEEDUP = 2.0
+
+# Snapshots written per expected shedding period
+DEFAULT_SNAPSHOTS_PER_PERIOD = 20
+
+
+def inverse_cell_size(mesh):
+    """Return 0.5 * sum_f |S_f| / V for every cell, ignoring empty patches.
+
+    Args:
+        mesh: PolyMesh
+
+    Returns:
+        np.ndarray: (C,) inverse cell sizes
+    """
+    mag = np.linalg.norm(mesh.face_areas, axis=1)
+    for patch in mesh.patches.values():
+        if patch['type'] == 'empty':
+            mag[patch['startFace']:patch['startFace'] + patch['nFaces']] = 0.0
+    n_internal = mesh.n_internal_faces
+    total = (np.bincount(mesh.owner, mag, minlength=mesh.n_cells)
+             + np.bincount(mesh.neighbour, mag[:n_internal], minlength=mesh.n_cells))
+    return 0.5 * total / mesh.cell_volumes
+
+
+def min_cell_size(mesh):
+    """Return the smallest cell size 1 / max(inverse_cell_size) of a mesh."""
+    return float(1.0 / inverse_cell_size(mesh).max())
+
+
+def round_down(value, digits=2):
+    """Round a positive value down to the given number of significant digits."""
+    scale = 10.0 ** (math.floor(math.log10(value)) - digits + 1)
+    return round(math.floor(value / scale * (1 + 1e-9)) * scale, 12)
+
+
+def stable_delta_t(mesh, velocity, courant=DEFAULT_COURANT, speedup=VELOCITY_SPEEDUP):
+    """Return the largest deltaT keeping the Courant number below courant.
+
+    Args:
+        mesh: PolyMesh
+        velocity: Inlet velocity
+        courant: Target maximum Courant number
+        speedup: Peak velocity in the domain relative to the inlet
+
+    Returns:
+        float: Time step, rounded down to two significant digits
+    """
+    return round_down(courant * min_cell_size(mesh) / (speedup * abs(velocity)))
+
+
+def courant_number(mesh, velocity, delta_t, speedup=VELOCITY_SPEEDUP):
+    """Estimate the maximum Courant number of a run."""
+    return float(delta_t * speedup * abs(velocity) * inverse_cell_size(mesh).max())
+
+
+def strouhal_estimate(Re):
+    """Estimate the shedding Strouhal number (Roshko, laminar range).
+
+    Roshko's St = 0.212 (1 - 21.2 / Re) is used from the onset of shedding
+    and capped at 0.2 above it; below Re = 47 (no shedding) the onset value
+    is returned so write intervals stay finite.
+    """
+    return min(0.212 * (1.0 - 21.2 / max(Re, 47.0)), 0.2)
+
+
+def auto_write_interval(delta_t, velocity, diameter, Re,
+                        snapshots=DEFAULT_SNAPSHOTS_PER_PERIOD):
+    """Pick a writeInterval resolving one shedding period with snapshots writes.
+
+    Args:
+        delta_t: Time step
+        velocity: Inlet velocity
+        diameter: Cylinder diameter
+        Re: Reynolds number
+        snapshots: Number of writes per expected shedding period
+
+    Returns:
+        float: Write interval, a whole number of time steps
+    """
+    period = diameter / (strouhal_estimate(Re) * abs(velocity))
+    steps = max(1, int(period / snapshots / delta_t))
+    return round(steps * delta_t, 12)
+
+
+def auto_time_controls(case_dir, Re, velocity, courant=DEFAULT_COURANT,
+                       snapshots=DEFAULT_SNAPSHOTS_PER_PERIOD, diameter=None):
+    """Choose deltaT and writeInterval for a run of a case.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        Re: Reynolds number
+        velocity: Inlet velocity
+        courant: Target maximum Courant number
+        snapshots: Number of writes per expected shedding period
+        diameter: Cylinder diameter; measured from the cylinder patch if None
+
+    Returns:
+        tuple: (delta_t, write_interval)
+    """
+    mesh = load_mesh(case_dir)
+    delta_t = stable_delta_t(mesh, velocity, courant)
+    diameter = diameter or patch_diameter(mesh)
+    write_interval = auto_write_interval(delta_t, velocity, diameter, Re, snapshots)
+    print(f"Automatic time controls: deltaT={delta_t}, writeInterval={write_interval} "
+          f"(Co={courant}, min cell size {min_cell_size(mesh):.4g})")
+    return delta_t, write_interval
+
+
+def resolve_time_controls(case_dir, Re, velocity, delta_t=None, write_interval=None,
+                          courant=DEFAULT_COURANT, snapshots=DEFAULT_SNAPSHOTS_PER_PERIOD):
+    """Fill in deltaT and writeInterval a run did not set explicitly.
+
+    Without delta_t both values are chosen automatically. A given delta_t
+    is checked against the Courant limit, and the write interval (0.1 by
+    default) is rounded to a whole number of its time steps.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        Re: Reynolds number
+        velocity: Inlet velocity
+        delta_t: Time step, or None for automatic
+        write_interval: Write interval, or None for the default
+        courant: Target maximum Courant number in automatic mode
+        snapshots: Number of writes per expected shedding period in
+            automatic mode
+
+    Returns:
+        tuple: (delta_t, write_interval)
+    """
+    if delta_t is None:
+        delta_t, auto_interval = auto_time_controls(case_dir, Re, velocity, courant, snapshots)
+        return delta_t, write_interval or auto_interval
+
+    co = courant_number(load_mesh(case_dir), velocity, delta_t)
+    if co > 1.0:
+        print(f"Warning: deltaT={delta_t} gives an estimated Courant number of {co:.2f}; "
+              f"the run may be unstable")
+    steps = max(1, round((write_interval or 0.1) / delta_t))
+    return delta_t, round(steps * delta_t, 12)
@@ -0,0 +1,339 @@
+"""Derived flow fields from sparse finite-volume operators.
+
+The Green-Gauss cell gradient
+
+    grad(phi)_c = 1/V_c * sum_f phi_f S_f
+
+is linear in the cell values, so it is assembled once per mesh as a
+sparse (3C, C) matrix G, with rows k*C + c holding d/dx_k at cell c. Face
+values are interpolated linearly between owner and neighbour, with a
+skewness correction. Boundary faces take the owner value (zero
+gradient), except on walls, where the velocity is zero (no slip). Faces
+on 'empty' patches are left out.
+
+The velocity gradient of every stored time step then comes from one
+sparse product, G @ U, where U holds all components and all time steps
+as columns. Vorticity, the Q-criterion and the divergence (a check on
+continuity) follow from the gradient. The wall shear stress on the
+cylinder is a second sparse operator acting on the flattened velocity.
+
+Operators are cached per mesh hash under cache/operators.
+"""
+
+import os
+import numpy as np
+import scipy.sparse as sp
+from forces import CYLINDER_PATCH, reference_values
+
+
+# Directory holding cached operators, relative to the working directory
+OPERATOR_CACHE_DIR = os.path.join('cache', 'operators')
+
+# Skewness corrections folded into the gradient operator
+SKEW_CORRECTIONS = 1
+
+# Fields store_derived_fields can write
+DERIVED_FIELDS = ('vorticity', 'Q', 'divergence', 'wallShearStress')
+
+# Operators already loaded in this process, by mesh hash and name
+_loaded = {}
+
+
+def wall_patches(mesh):
+    """Return the names of the patches of type 'wall'."""
+    return [name for name, patch in mesh.patches.items() if patch['type'] == 'wall']
+
+
+def gradient_operator(mesh, zero_patches=(), corrections=SKEW_CORRECTIONS):
+    """Assemble the Green-Gauss gradient as a sparse matrix.
+
+    Linear interpolation gives the face value at the point where the line
+    between the cell centres crosses the face, not at the face centre. On
+    skewed (e.g. triangular) meshes this costs accuracy, so the face
+    values are corrected with the interpolated gradient times the offset
+    to the face centre; each correction is one more sparse product folded
+    into the operator. Zero-gradient boundary values are corrected along
+    the face in the same way.
+
+    Args:
+        mesh: PolyMesh
+        zero_patches: Patches where the field is zero; other non-empty
+            patches are zero-gradient
+        corrections: Number of skewness corrections
+
+    Returns:
+        scipy.sparse.csr_matrix: (3C, C) operator; (G @ phi).reshape(3, C)
+            is the gradient of the cell field phi
+    """
+    n_cells = mesh.n_cells
+    n_internal = mesh.n_internal_faces
+    own = mesh.owner[:n_internal]
+    nei = mesh.neighbour
+    areas = mesh.face_areas
+    centres = mesh.cell_centres
+    inv_volumes = 1.0 / mesh.cell_volumes
+
+    # Linear interpolation weight of the owner value at internal faces
+    face_centres = mesh.face_centres[:n_internal]
+    w = (np.einsum('ij,ij->i', areas[:n_internal], centres[nei] - face_centres)
+         / np.einsum('ij,ij->i', areas[:n_internal], centres[nei] - centres[own]))
+    crossing = w[:, None] * centres[own] + (1 - w[:, None]) * centres[nei]
+    offset = face_centres - crossing
+
+    # Boundary faces contributing their owner value
+    boundary = [np.arange(0)]
+    for name, patch in mesh.patches.items():
+        if patch['type'] == 'empty' or name in zero_patches:
+            continue
+        sl = mesh.patch_slice(name)
+        boundary.append(np.arange(sl.start, sl.stop))
+    boundary = np.concatenate(boundary)
+    b_own = mesh.owner[boundary]
+    b_areas = areas[boundary]
+    b_normals = b_areas / np.linalg.norm(b_areas, axis=1)[:, None]
+    b_offset = mesh.face_centres[boundary] - centres[b_own]
+    b_offset -= np.einsum('ij,ij->i', b_offset, b_normals)[:, None] * b_normals
+
+    # S_f phi_f / V summed into the owner (+) and neighbour (-) of each
+    # face, with phi_f = w phi_owner + (1 - w) phi_neighbour
+    rows, cols, values = [], [], []
+    for k in range(3):
+        for source, weight in ((own, w), (nei, 1 - w)):
+            s = areas[:n_internal, k] * weight
+            rows += [k * n_cells + own, k * n_cells + nei]
+            cols += [source, source]
+            values += [s * inv_volumes[own], -s * inv_volumes[nei]]
+        rows.append(k * n_cells + b_own)
+        cols.append(b_own)
+        values.append(b_areas[:, k] * inv_volumes[b_own])
+    operator = sp.csr_matrix((np.concatenate(values), (np.concatenate(rows),
+                                                       np.concatenate(cols))),
+                             shape=(3 * n_cells, n_cells))
+    if not corrections:
+        return operator
+
+    # Correction of the gradient from the gradient: face value offset
+    # (x_f - x_crossing) . grad(phi)_f, with the gradient interpolated
+    rows, cols, values = [], [], []
+    for k in range(3):
+        for j in range(3):
+            for source, weight in ((own, w), (nei, 1 - w)):
+                s = areas[:n_internal, k] * offset[:, j] * weight
+                rows += [k * n_cells + own, k * n_cells + nei]
+                cols += [j * n_cells + source, j * n_cells + source]
+                values += [s * inv_volumes[own], -s * inv_volumes[nei]]
+            rows.append(k * n_cells + b_own)
+            cols.append(j * n_cells + b_own)
+            values.append(b_areas[:, k] * b_offset[:, j] * inv_volumes[b_own])
+    correction = sp.csr_matrix((np.concatenate(values), (np.concatenate(rows),
+                                                         np.concatenate(cols))),
+                               shape=(3 * n_cells, 3 * n_cells))
+    corrected = operator
+    for _ in range(corrections):
+        corrected = operator + correction @ corrected
+    return corrected.tocsr()
+
+
+def wall_shear_operator(mesh, patch=CYLINDER_PATCH):
+    """Assemble the wall shear stress of a no-slip patch as a sparse matrix.
+
+    The shear on a face is the tangential velocity of its owner cell over
+    the wall-normal distance, as in forces.patch_forces. The result is the
+    kinematic stress exerted by the fluid on the wall; multiply by nu.
+
+    Args:
+        mesh: PolyMesh
+        patch: Wall patch name
+
+    Returns:
+        scipy.sparse.csr_matrix: (3F, 3C) operator acting on U.ravel() of
+            a (C, 3) velocity; the result reshapes to (F, 3)
+    """
+    sl = mesh.patch_slice(patch)
+    areas = mesh.face_areas[sl]
+    normals = areas / np.linalg.norm(areas, axis=1)[:, None]
+    cells = mesh.owner[sl]
+    dist = np.abs(np.einsum('ij,ij->i', mesh.face_centres[sl] - mesh.cell_centres[cells],
+                            normals))
+    # (I - n n^T) / d for every face
+    blocks = ((np.eye(3)[None] - normals[:, :, None] * normals[:, None, :])
+              / dist[:, None, None])
+    n_faces = len(cells)
+    rows = np.repeat(3 * np.arange(n_faces)[:, None] + np.arange(3), 3, axis=1)
+    cols = np.tile(3 * cells[:, None] + np.arange(3), 3).reshape(n_faces, 3, 3)
+    return sp.csr_matrix((blocks.ravel(), (rows.ravel(), cols.ravel())),
+                         shape=(3 * n_faces, 3 * mesh.n_cells))
+
+
+def _cached(mesh, name, build, cache_dir):
+    """Load an operator from memory or disk, building and saving it if needed."""
+    key = (mesh.hash, name)
+    if mesh.hash is not None and key in _loaded:
+        return _loaded[key]
+    path = None
+    if cache_dir and mesh.hash:
+        path = os.path.join(cache_dir, f'{mesh.hash}_{name}.npz')
+    if path and os.path.exists(path):
+        operator = sp.load_npz(path).tocsr()
+    else:
+        operator = build()
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f'{path}.tmp-{os.getpid()}.npz'
+            sp.save_npz(tmp, operator)
+            os.replace(tmp, path)
+    if mesh.hash is not None:
+        _loaded[key] = operator
+    return operator
+
+
+def velocity_gradient_operator(mesh, cache_dir=OPERATOR_CACHE_DIR):
+    """Return the cached gradient operator for velocity (zero on walls)."""
+    return _cached(mesh, 'grad_U', lambda: gradient_operator(mesh, wall_patches(mesh)),
+                   cache_dir)
+
+
+def cached_wall_shear_operator(mesh, patch=CYLINDER_PATCH, cache_dir=OPERATOR_CACHE_DIR):
+    """Return the cached wall shear operator of a patch."""
+    return _cached(mesh, f'shear_{patch}', lambda: wall_shear_operator(mesh, patch),
+                   cache_dir)
+
+
+def velocity_gradient(operator, velocities):
+    """Apply a gradient operator to one or many velocity fields.
+
+    Args:
+        operator: Result of gradient_operator
+        velocities: (C, 3) or (T, C, 3) cell velocities
+
+    Returns:
+        np.ndarray: (C, 3, 3) or (T, C, 3, 3) gradient J with
+            J[..., c, i, k] = dU_i/dx_k
+    """
+    velocities = np.asarray(velocities, dtype=float)
+    single = velocities.ndim == 2
+    u = velocities[None] if single else velocities
+    n_times, n_cells = u.shape[:2]
+    # Columns are (time, component) pairs: one product for all of them
+    columns = u.transpose(1, 0, 2).reshape(n_cells, n_times * 3)
+    grad = (operator @ columns).reshape(3, n_cells, n_times, 3)
+    grad = grad.transpose(2, 1, 3, 0)
+    return grad[0] if single else grad
+
+
+def vorticity(grad):
+    """Return the vorticity vectors (curl U) from velocity gradients."""
+    return np.stack([grad[..., 2, 1] - grad[..., 1, 2],
+                     grad[..., 0, 2] - grad[..., 2, 0],
+                     grad[..., 1, 0] - grad[..., 0, 1]], axis=-1)
+
+
+def q_criterion(grad):
+    """Return Q = (|Omega|^2 - |S|^2) / 2 from velocity gradients."""
+    transposed = np.swapaxes(grad, -1, -2)
+    strain = 0.5 * (grad + transposed)
+    rotation = 0.5 * (grad - transposed)
+    return 0.5 * (np.sum(rotation ** 2, axis=(-2, -1)) - np.sum(strain ** 2, axis=(-2, -1)))
+
+
+def divergence(grad):
+    """Return the divergence (trace) of velocity gradients."""
+    return np.trace(grad, axis1=-2, axis2=-1)
+
+
+def wall_shear_stress(operator, velocities, nu):
+    """Apply a wall shear operator to one or many velocity fields.
+
+    Args:
+        operator: Result of wall_shear_operator
+        velocities: (C, 3) or (T, C, 3) cell velocities
+        nu: Kinematic viscosity
+
+    Returns:
+        np.ndarray: (F, 3) or (T, F, 3) kinematic wall shear stress
+    """
+    velocities = np.asarray(velocities, dtype=float)
+    single = velocities.ndim == 2
+    u = velocities[None] if single else velocities
+    n_faces = operator.shape[0] // 3
+    tau = nu * (operator @ u.reshape(len(u), -1).T).T.reshape(len(u), n_faces, 3)
+    return tau[0] if single else tau
+
+
+def derived_fields(mesh, velocities, names=DERIVED_FIELDS, nu=None,
+                   patch=CYLINDER_PATCH, cache_dir=OPERATOR_CACHE_DIR):
+    """Compute derived fields for a block of velocity snapshots.
+
+    Args:
+        mesh: PolyMesh
+        velocities: (T, C, 3) cell velocities
+        names: Fields to compute, from DERIVED_FIELDS
+        nu: Kinematic viscosity, needed for wallShearStress
+        patch: Wall patch of the wall shear stress
+        cache_dir: Operator cache directory, or None to disable caching
+
+    Returns:
+        dict: Field name -> (T, C[, 3]) values; wallShearStress is
+            (T, F_patch, 3)
+    """
+    fields = {}
+    if set(names) & {'vorticity', 'Q', 'divergence'}:
+        grad = velocity_gradient(velocity_gradient_operator(mesh, cache_dir), velocities)
+        if 'vorticity' in names:
+            fields['vorticity'] = vorticity(grad)
+        if 'Q' in names:
+            fields['Q'] = q_criterion(grad)
+        if 'divergence' in names:
+            fields['divergence'] = divergence(grad)
+    if 'wallShearStress' in names and nu is not None and patch in mesh.patches:
+        fields['wallShearStress'] = wall_shear_stress(
+            cached_wall_shear_operator(mesh, patch, cache_dir), velocities, nu)
+    return fields
+
+
+def store_derived_fields(store, mesh, names=DERIVED_FIELDS, diameter=None,
+                         patch=CYLINDER_PATCH, cache_dir=OPERATOR_CACHE_DIR):
+    """Compute derived fields for every stored velocity and save them.
+
+    U is processed one stored time block at a time, so memory stays
+    bounded for long runs. The results replace earlier derived fields.
+
+    Args:
+        store: Writable ResultStore holding U
+        mesh: PolyMesh the store was extracted from
+        names: Fields to compute, from DERIVED_FIELDS
+        diameter: Cylinder diameter overriding the run metadata (for nu)
+        patch: Wall patch of the wall shear stress
+        cache_dir: Operator cache directory, or None to disable caching
+
+    Returns:
+        list: Names of the written fields
+    """
+    unknown = set(names) - set(DERIVED_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown derived fields: {', '.join(sorted(unknown))}")
+    if 'U' not in store.fields:
+        return []
+    nu = None
+    if patch in mesh.patches:
+        nu = reference_values(mesh, store.metadata, diameter, patch)['nu']
+    if 'wallShearStress' in names and nu is None:
+        print("No viscosity or wall patch for the wall shear stress; skipping it")
+    for name in names:
+        store.remove(name)
+
+    times = store.times('U')
+    block = store.index['fields']['U']['chunk_times']
+    written = set()
+    for start in range(0, len(times), block):
+        stop = min(start + block, len(times))
+        fields = derived_fields(mesh, store.read('U', slice(start, stop)), names, nu,
+                                patch, cache_dir)
+        for name, values in fields.items():
+            for t, row in zip(times[start:stop], values):
+                store.append(name, t, row)
+            written.add(name)
+    if 'wallShearStress' in written:
+        store.metadata['wallShearStress_patch'] = patch
+    store.flush()
+    return sorted(written)
@@ -1,9 +1,28 @@
 """Extract simulation data and save to CSV."""
 
 import os
+import json
+import shutil
+import time
 import numpy as np
-import pandas as pd
 import argparse
+from foam_io import (read_field, find_field, processor_dirs,
+                     read_cell_addressing, read_decomposed_field, read_dict_value,
+                     mesh_hash)
+from result_store import ResultStore
+from shedding import SheddingMonitor, request_stop
+from metrics import SOLVER_LOG
+from probes import ProbeSet, PROBES_DIR, load_probe_spec
+from derived_fields import store_derived_fields, DERIVED_FIELDS
+from foam_mesh import load_mesh
+from forces import (CYLINDER_PATCH, patch_cells, patch_forces, force_coefficients,
+                    reference_values, store_force_coefficients)
+
+# Time directories already written to an output directory (CSV format)
+PROCESSED_FILE = '.processed_times.json'
+
+# Directory of the chunked result store inside an output directory
+STORE_DIR = 'store'
 
 
 def ensure_directory(path):
@@ -12,220 +31,540 @@ def ensure_directory(path):
         os.makedirs(path)
 
 
-def calculate_drag_coefficient(force, velocity, density, area):
-    """Calculate drag coefficient."""
-    return 2 * force / (density * velocity * velocity * area)
+def list_time_dirs(directory):
+    """Return the time directory names in directory, sorted by time."""
+    time_dirs = []
+    for item in os.listdir(directory):
+        try:
+            if item == '0' or (item.replace('.', '').isdigit() and float(item) > 0):
+                time_dirs.append(item)
+        except ValueError:
+            continue
+    time_dirs.sort(key=lambda x: float(x) if x.replace('.', '').isdigit() else 0)
+    return time_dirs
+
+
+def read_time_field(case_dir, t_dir, name, n_cells=None, addressing=None):
+    """Read one field at one time, from a reconstructed or decomposed case.
 
+    Args:
+        case_dir: Path to OpenFOAM case directory
+        t_dir: Name of the time directory
+        name: Field name (e.g. 'U')
+        n_cells: Number of cells, used to expand uniform fields
+        addressing: Result of read_cell_addressing for decomposed cases,
+            or None to read from the case root
 
-def read_openfoam_vector_file(filepath):
-    """Read OpenFOAM vector file and return list of values."""
-    print(f"Reading vector file: {filepath}")
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-        print(f"Total lines in file: {len(lines)}")
-        
-        # Debug: Print first few lines
-        print("First 10 lines:")
-        for line in lines[:10]:
-            print(line.strip())
+    Returns:
+        np.ndarray or None: Field values, or None if the field is missing
+    """
+    if addressing:
+        if find_field(os.path.join(addressing[0][0], t_dir), name) is None:
+            return None
+        return read_decomposed_field(addressing, t_dir, name)
+    path = find_field(os.path.join(case_dir, t_dir), name)
+    if path is None:
+        return None
+    return read_field(path, n_cells)
+
+
+def _is_settled(directory, settle_time):
+    """Return True if no file below directory changed for settle_time seconds."""
+    newest = 0.0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+            except OSError:
+                # File replaced while we were looking: still being written
+                return False
+    return time.time() - newest >= settle_time
+
+
+def watch_time_dirs(directory, processed=(), is_running=None, poll_interval=1.0,
+                    settle_time=2.0):
+    """Yield time directory names as soon as they are completely written.
+    
+    A time directory is complete once a later one exists, once the solver
+    has stopped, or once none of its files changed for settle_time seconds.
+    
+    Args:
+        directory: Directory containing the time directories
+        processed: Time directory names to skip
+        is_running: Callable returning True while the solver is running; if
+            None, the directories present now are yielded and the generator
+            returns
+        poll_interval: Seconds between directory scans
+        settle_time: Seconds without modification after which the latest
+            time directory is considered complete
         
-        # Find the data section
-        start_idx = -1
-        end_idx = -1
-        for i, line in enumerate(lines):
-            if line.strip() == '(':
-                start_idx = i + 1
-                print(f"Found data start at line {i+1}")
-            elif line.strip() == ')':
-                end_idx = i
-                print(f"Found data end at line {i}")
+    Yields:
+        str: Name of the next complete time directory, in time order
+    """
+    processed = set(processed)
+    while True:
+        # Check before listing so the last scan sees everything written
+        running = is_running() if is_running is not None else False
+        time_dirs = list_time_dirs(directory)
+        for t_dir in time_dirs:
+            if t_dir in processed:
+                continue
+            if (running and t_dir == time_dirs[-1]
+                    and not _is_settled(os.path.join(directory, t_dir), settle_time)):
                 break
-        
-        if start_idx == -1 or end_idx == -1:
-            print("Could not find data section markers")
-            return []
-        
-        # Process vector data
-        data = []
-        for line in lines[start_idx:end_idx]:
-            if '(' in line and ')' in line:
-                values = line.strip('()\n').split()
-                if len(values) == 3:
-                    try:
-                        vector = [float(v) for v in values]
-                        magnitude = np.sqrt(sum(v*v for v in vector))
-                        data.append(magnitude)
-                    except ValueError:
-                        continue
-        
-        print(f"Extracted {len(data)} vector values")
-        return data
+            processed.add(t_dir)
+            yield t_dir
+        if not running:
+            return
+        time.sleep(poll_interval)
 
 
-def read_openfoam_scalar_file(filepath):
-    """Read OpenFOAM scalar file and return list of values."""
-    print(f"Reading scalar file: {filepath}")
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-        print(f"Total lines in file: {len(lines)}")
+def _load_processed(output_dir):
+    """Return the time directories already extracted into output_dir."""
+    state_path = os.path.join(output_dir, PROCESSED_FILE)
+    if not os.path.exists(state_path):
+        return []
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+
+def _save_processed(output_dir, processed):
+    """Atomically record the extracted time directories."""
+    state_path = os.path.join(output_dir, PROCESSED_FILE)
+    with open(state_path + '.tmp', 'w') as f:
+        json.dump(processed, f)
+    os.replace(state_path + '.tmp', state_path)
+
+
+def _append_row(path, t, values, header):
+    """Append a single time row to a CSV file, writing the header if new."""
+    new_file = not os.path.exists(path)
+    with open(path, 'a') as f:
+        if new_file:
+            f.write(','.join(['Time'] + header) + '\n')
+        f.write(f'{t!r},' + ','.join(np.char.mod('%.12g', values)) + '\n')
+
+
+def append_snapshot(output_dir, t, velocities=None, pressures=None, forces=None):
+    """Append one snapshot to the velocity, pressure and drag CSVs.
+    
+    Args:
+        output_dir: Directory with the velocity/, pressure/ and drag/ outputs
+        t: Simulation time of the snapshot
+        velocities: Velocity vectors of shape (N, 3), or None
+        pressures: Pressure values of shape (N,), or None
+        forces: Result of force_context, or None to skip drag and lift
+    """
+    if velocities is not None and len(velocities):
+        _append_row(os.path.join(output_dir, "velocity", "data.csv"), t,
+                    np.linalg.norm(velocities, axis=1),
+                    [f'Node_{i}' for i in range(len(velocities))])
+
+    if pressures is not None and len(pressures):
+        _append_row(os.path.join(output_dir, "pressure", "data.csv"), t, pressures,
+                    [f'Node_{i}' for i in range(len(pressures))])
+
+        # Calculate drag and lift coefficients
+        if forces is not None:
+            cd, cl = snapshot_coefficients(forces, velocities, pressures)
+            _append_row(os.path.join(output_dir, "drag", "data.csv"), t,
+                        [cd, cl], ['Drag_Coefficient', 'Lift_Coefficient'])
+
+
+def snapshot_coefficients(forces, velocities, pressures):
+    """Compute Cd and Cl of a single snapshot.
+    
+    Args:
+        forces: Result of force_context
+        velocities: Velocity vectors of shape (N, 3), or None
+        pressures: Pressure values of shape (N,)
         
-        # Debug: Print first few lines
-        print("First 10 lines:")
-        for line in lines[:10]:
-            print(line.strip())
+    Returns:
+        tuple: (Cd, Cl)
+    """
+    mesh, ref = forces
+    cells = patch_cells(mesh)
+    wall_velocities = None
+    if velocities is not None and len(velocities) and ref['nu'] is not None:
+        wall_velocities = velocities[cells][None]
+    force = patch_forces(mesh, pressures[cells][None], wall_velocities, ref['nu'])
+    cd, cl = force_coefficients(force, ref['velocity'], ref['diameter'], ref['depth'])
+    return float(cd[0]), float(cl[0])
+
+
+def store_probe_snapshot(store, t, probes, velocities=None, pressures=None,
+                         coefficients=None):
+    """Append the probe samples of one snapshot to a probe store.
+    
+    Args:
+        store: Writable ResultStore
+        t: Simulation time of the snapshot
+        probes: ProbeSet
+        velocities: Velocity vectors of shape (N, 3), or None
+        pressures: Pressure values of shape (N,), or None
+        coefficients: (Cd, Cl) of the snapshot, or None
         
-        # Find the data section
-        start_idx = -1
-        end_idx = -1
-        for i, line in enumerate(lines):
-            if line.strip() == '(':
-                start_idx = i + 1
-                print(f"Found data start at line {i+1}")
-            elif line.strip() == ')':
-                end_idx = i
-                print(f"Found data end at line {i}")
-                break
+    Returns:
+        bool: True if a complete time block was flushed
+    """
+    flushed = store_snapshot(
+        store, t, None if velocities is None else probes.sample(velocities),
+        None if pressures is None else probes.sample(pressures))
+    if coefficients is not None:
+        flushed |= store.append('Cd', t, [coefficients[0]])
+        flushed |= store.append('Cl', t, [coefficients[1]])
+    return flushed
+
+
+def store_snapshot(store, t, velocities=None, pressures=None):
+    """Append one snapshot to a result store.
+    
+    Args:
+        store: Writable ResultStore
+        t: Simulation time of the snapshot
+        velocities: Velocity vectors of shape (N, 3), or None
+        pressures: Pressure values of shape (N,), or None
         
-        if start_idx == -1 or end_idx == -1:
-            print("Could not find data section markers")
-            return []
+    Returns:
+        bool: True if a complete time block was flushed
+    """
+    flushed = False
+    if velocities is not None and len(velocities):
+        flushed |= store.append('U', t, velocities)
+    if pressures is not None and len(pressures):
+        flushed |= store.append('p', t, pressures)
+    return flushed
+
+
+def force_context(case_dir, metadata, diameter=None, mesh=None):
+    """Load the mesh and reference values needed for drag and lift.
+    
+    Args:
+        case_dir: Path to OpenFOAM case directory
+        metadata: Run attributes (U, Re, nu, ...)
+        diameter: Cylinder diameter overriding the run metadata
+        mesh: Mesh of the case if already loaded, or None
         
-        # Process scalar data
-        data = []
-        for line in lines[start_idx:end_idx]:
-            try:
-                value = float(line.strip())
-                data.append(value)
-            except ValueError:
-                continue
+    Returns:
+        tuple or None: (mesh, reference values), or None if the mesh has no
+            cylinder patch
+    """
+    if mesh is None:
+        mesh = load_mesh(case_dir)
+    if CYLINDER_PATCH not in mesh.patches:
+        print(f"No '{CYLINDER_PATCH}' patch in the mesh; skipping drag and lift")
+        return None
+    return mesh, reference_values(mesh, metadata, diameter)
+
+
+def _checkpoint(store, processed):
+    """Flush the store together with the list of extracted time directories."""
+    store.metadata['processed_times'] = list(processed)
+    store.flush()
+
+
+def export_drag_csv(store, output_dir):
+    """Write drag/data.csv from the drag and lift coefficients in a store."""
+    if 'Cd' not in store.fields:
+        return
+    path = os.path.join(output_dir, "drag", "data.csv")
+    with open(path, 'w') as f:
+        f.write('Time,Drag_Coefficient,Lift_Coefficient\n')
+        for t, cd, cl in zip(store.times('Cd'), store.read('Cd', cells=0),
+                             store.read('Cl', cells=0)):
+            f.write(f'{float(t)!r},{cd:.12g},{cl:.12g}\n')
+
+
+def run_metadata(case_dir):
+    """Collect run attributes stored with the extracted data.
+    
+    Args:
+        case_dir: Path to OpenFOAM case directory
         
-        print(f"Extracted {len(data)} scalar values")
-        return data
+    Returns:
+        dict: nu, deltaT, endTime and the polyMesh hash
+    """
+    metadata = {'mesh_hash': mesh_hash(case_dir)}
+    control_dict = os.path.join(case_dir, "system", "controlDict")
+    transport = os.path.join(case_dir, "constant", "transportProperties")
+    for path, key in ((control_dict, 'deltaT'), (control_dict, 'endTime'),
+                      (transport, 'nu')):
+        value = read_dict_value(path, key) if os.path.exists(path) else None
+        if value is not None:
+            # Strip dimensions such as 'nu [0 2 -1 0 0 0 0] 0.01'
+            metadata[key] = float(value.split()[-1])
+    return metadata
 
 
-def extract_simulation_data(case_dir, output_dir):
+def extract_simulation_data(case_dir, output_dir, is_running=None, poll_interval=1.0,
+                            settle_time=2.0, resume=True, output_format='store',
+                            metadata=None, diameter=None, early_stop=None, probes=None,
+                            derived=None, decomposed=None):
     """Extract velocity, pressure and drag coefficient data.
     
+    Snapshots are appended to the output as each time directory is read,
+    and the processed times are recorded with the output, so running the
+    extraction again only handles new time directories. With is_running,
+    the case is watched and extraction overlaps with the solver.
+    
+    The default 'store' format writes a chunked, compressed time x cell
+    ResultStore to output_dir/store (fields U, p, Cd and Cl) plus
+    drag/data.csv. The 'csv' format writes the wide per-node
+    velocity/pressure/drag CSV files. The 'probes' format only keeps U and
+    p interpolated to the probe points and lines, with Cd and Cl, in a
+    store at output_dir/probes, plus drag/data.csv.
+    
+    Drag and lift coefficients are integrated over the cylinder patch from
+    pressure and wall shear, using the run's velocity, nu and diameter.
+    Derived fields (vorticity, Q, divergence, wallShearStress) are added
+    to the store from the stored velocities once extraction ends.
+    
     Args:
         case_dir: Path to OpenFOAM case directory
         output_dir: Directory to save extracted data
+        is_running: Callable returning True while the solver is running, or
+            None to extract what is on disk now
+        poll_interval: Seconds between scans while the solver is running
+        settle_time: Seconds without modification after which the latest
+            time directory is considered complete
+        resume: Keep previously extracted data and skip its time
+            directories; if False, existing outputs are replaced
+        output_format: 'store', 'csv' or 'probes'
+        metadata: Extra run attributes (e.g. Re, U) saved in the store
+        diameter: Cylinder diameter for the coefficients; measured from the
+            cylinder patch if not given
+        early_stop: dict of check_convergence criteria (n_periods,
+            tolerance, ...) to stop the solver once shedding has settled,
+            or None to run to endTime; needs is_running
+        probes: Probe file path or spec dict, required for the 'probes'
+            format
+        derived: Names of derived fields to store (see DERIVED_FIELDS),
+            or None; 'store' format only
+        decomposed: Whether to read the processor* directories instead of
+            the case root, as set by the run's solver mode; None guesses it
+            from the case (processor* directories and no time directories
+            besides 0), which stale processor* directories can mislead
+        
+    Returns:
+        int: Number of newly extracted time steps
     """
     print(f"\nExtracting data from: {case_dir}")
     
-    # Get time directories
-    time_dirs = []
-    for item in os.listdir(case_dir):
-        try:
-            if item == '0' or (item.replace('.', '').isdigit() and float(item) > 0):
-                time_dirs.append(item)
-        except ValueError:
-            continue
-    time_dirs.sort(key=lambda x: float(x) if x.replace('.', '').isdigit() else 0)
-    
     # Create output directories
-    ensure_directory(os.path.join(output_dir, "velocity"))
-    ensure_directory(os.path.join(output_dir, "pressure"))
     ensure_directory(os.path.join(output_dir, "drag"))
+    store = None
+    if output_format == 'csv':
+        ensure_directory(os.path.join(output_dir, "velocity"))
+        ensure_directory(os.path.join(output_dir, "pressure"))
+        processed = _load_processed(output_dir) if resume else []
+        if not processed:
+            # Start over, dropping any partial outputs
+            for name in ("velocity", "pressure", "drag"):
+                path = os.path.join(output_dir, name, "data.csv")
+                if os.path.exists(path):
+                    os.remove(path)
+    attrs = run_metadata(case_dir)
+    attrs.update(metadata or {})
+    if diameter is not None:
+        attrs['D'] = diameter
+    mesh = load_mesh(case_dir)
+    probe_set = None
+    if output_format == 'probes':
+        if probes is None:
+            raise ValueError("The 'probes' output format needs a probe file")
+        spec = load_probe_spec(probes) if isinstance(probes, str) else probes
+        probe_set = ProbeSet(mesh, spec)
+        attrs.update(probe_set.metadata())
+        print(f"Sampling {len(probe_set)} probe locations")
+    if output_format != 'csv':
+        store_path = os.path.join(output_dir, PROBES_DIR if probe_set else STORE_DIR)
+        if not resume and os.path.exists(store_path):
+            shutil.rmtree(store_path)
+        store = ResultStore(store_path, 'a', metadata=attrs)
+        processed = list(store.metadata.get('processed_times', []))
+    n_cells = mesh.n_cells
+    forces = force_context(case_dir, attrs, diameter, mesh)
+
+    # Read processor* directly if the case is decomposed and not reconstructed
+    source_dir = case_dir
+    addressing = None
+    if decomposed is None:
+        decomposed = len(list_time_dirs(case_dir)) <= 1 and bool(processor_dirs(case_dir))
+    if decomposed:
+        addressing = read_cell_addressing(case_dir)
+        source_dir = addressing[0][0]
+        print(f"Reading decomposed case ({len(addressing)} processors)")
+
+    monitor = None
+    if early_stop is not None and is_running is not None and forces is not None:
+        ref = forces[1]
+        monitor = SheddingMonitor(ref['velocity'], ref['diameter'], **early_stop)
+
+    # Process each time directory as it becomes available
+    n_new = 0
+    try:
+        for t_dir in watch_time_dirs(source_dir, processed, is_running, poll_interval,
+                                     settle_time):
+            t = float(t_dir) if t_dir.replace('.', '').isdigit() else 0.0
+            print(f"Processing time step {t} (directory: {t_dir})")
+            velocities = read_time_field(case_dir, t_dir, 'U', n_cells, addressing)
+            pressures = read_time_field(case_dir, t_dir, 'p', n_cells, addressing)
+            if velocities is None:
+                print(f"No U file found in {t_dir}")
+            if pressures is None:
+                print(f"No p file found in {t_dir}")
+            processed.append(t_dir)
+            n_new += 1
+            coefficients = None
+            if forces is not None and pressures is not None and (
+                    probe_set is not None or (monitor is not None and not monitor.converged)):
+                coefficients = snapshot_coefficients(forces, velocities, pressures)
+            if store is None:
+                append_snapshot(output_dir, t, velocities, pressures, forces)
+                _save_processed(output_dir, processed)
+            elif probe_set is not None:
+                if store_probe_snapshot(store, t, probe_set, velocities, pressures,
+                                        coefficients):
+                    _checkpoint(store, processed)
+            elif store_snapshot(store, t, velocities, pressures):
+                _checkpoint(store, processed)
+
+            if (monitor is not None and not monitor.converged and coefficients is not None
+                    and monitor.update(t, *coefficients)):
+                state = monitor.state
+                print(f"Flow settled ({state['mode']}) at t={t}: St={state['strouhal']:.4f}, "
+                      f"mean Cd={state['cd_mean']:.4f}; stopping the solver")
+                request_stop(case_dir)
+                attrs['early_stop'] = dict(state, time=t)
+                if store is not None:
+                    store.metadata['early_stop'] = attrs['early_stop']
+    finally:
+        if store is not None:
+            _checkpoint(store, processed)
+            if forces is not None and probe_set is None and 'p' in store.fields:
+                store_force_coefficients(store, forces[0], diameter)
+            export_drag_csv(store, output_dir)
+            if derived and probe_set is None:
+                written = store_derived_fields(store, mesh, derived, diameter)
+                if written:
+                    print(f"Stored derived fields: {', '.join(written)}")
+
+    print("\nSummary:")
+    print(f"New time steps processed: {n_new}")
+    print(f"Total time steps extracted: {len(processed)}")
+    print(f"Saved data in: {output_dir}")
+    return n_new
+
+
+def solver_finished(log_path, tail_bytes=65536):
+    """Return True if a solver log shows that the solver has ended.
+
+    The solver has ended once its log closes with 'End' (a completed or
+    'stopAt writeNow' run) or reports a FOAM FATAL error.
+
+    Args:
+        log_path: Path to the solver log
+        tail_bytes: Number of bytes read from the end of the log
+    """
+    try:
+        with open(log_path, 'rb') as f:
+            f.seek(max(0, os.path.getsize(log_path) - tail_bytes))
+            text = f.read().decode(errors='replace')
+    except OSError:
+        return False
+    lines = text.split()
+    return 'FOAM FATAL' in text or (bool(lines) and lines[-1] == 'End')
+
+
+def _pid_alive(pid):
+    """Return True if a process with the given pid exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def end_time_reached(case_dir, settle_time=2.0, log_path=None, process=None):
+    """Return a callable that is True until the solver has finished.
     
-    # Initialize data structures
-    times = []
-    velocity_data = {}
-    pressure_data = {}
-    drag_coeffs = []
+    The solver has finished once the endTime directory is written, once
+    its log shows that it ended (see solver_finished), which covers early
+    stops and crashes, or once the watched process has exited.
     
-    # Constants for drag coefficient calculation
-    density = 1.0
-    diameter = 1.0
-    area = diameter
-    inlet_velocity = 1.0
-
-    # Process each time directory
-    for t_dir in time_dirs:
-        t = float(t_dir) if t_dir.replace('.', '').isdigit() else 0.0
-        print(f"\nProcessing time step {t} (directory: {t_dir})")
-        time_dir = os.path.join(case_dir, t_dir)
-        
-        # Read velocity file
-        U_file = os.path.join(time_dir, 'U')
-        if os.path.exists(U_file):
-            print(f"Found U file: {U_file}")
-            velocities = read_openfoam_vector_file(U_file)
-            if velocities:
-                times.append(t)
-                for node_idx, vel in enumerate(velocities):
-                    if node_idx not in velocity_data:
-                        velocity_data[node_idx] = []
-                    velocity_data[node_idx].append(vel)
-        else:
-            print(f"No U file found in {time_dir}")
-
-        # Read pressure file
-        p_file = os.path.join(time_dir, 'p')
-        if os.path.exists(p_file):
-            print(f"Found p file: {p_file}")
-            pressures = read_openfoam_scalar_file(p_file)
-            for node_idx, p in enumerate(pressures):
-                if node_idx not in pressure_data:
-                    pressure_data[node_idx] = []
-                pressure_data[node_idx].append(p)
-            
-            # Calculate drag coefficient
-            if pressures:
-                p_upstream = np.max(pressures)
-                p_downstream = np.min(pressures)
-                force = (p_upstream - p_downstream) * area
-                cd = calculate_drag_coefficient(force, inlet_velocity, density, area)
-                drag_coeffs.append(cd)
-        else:
-            print(f"No p file found in {time_dir}")
+    Args:
+        case_dir: Path to OpenFOAM case directory
+        settle_time: Seconds without modification after which the endTime
+            directory is considered complete
+        log_path: Solver log, default log.icoFoam in the case directory
+        process: subprocess.Popen or pid of the solver, or None
+    """
+    with open(os.path.join(case_dir, "system", "controlDict"), 'r') as f:
+        end_time = next(float(line.split()[1].rstrip(';')) for line in f
+                        if line.split() and line.split()[0] == 'endTime')
+    log_path = log_path or os.path.join(case_dir, SOLVER_LOG)
 
-    print("\nSummary:")
-    print(f"Time steps processed: {len(times)}")
-    print(f"Velocity nodes: {len(velocity_data)}")
-    print(f"Pressure nodes: {len(pressure_data)}")
-    print(f"Drag coefficients calculated: {len(drag_coeffs)}")
-
-    # Save velocity data
-    if velocity_data:
-        vel_columns = ['Time'] + [f'Node_{i}' for i in sorted(velocity_data.keys())]
-        vel_df = pd.DataFrame(columns=vel_columns)
-        vel_df['Time'] = times
-        for node_idx in sorted(velocity_data.keys()):
-            vel_df[f'Node_{node_idx}'] = velocity_data[node_idx]
-        vel_path = os.path.join(output_dir, "velocity", "data.csv")
-        vel_df.to_csv(vel_path, index=False)
-        print(f"\nSaved velocity data: {vel_path}")
-
-    # Save pressure data
-    if pressure_data:
-        press_columns = ['Time'] + [f'Node_{i}' for i in sorted(pressure_data.keys())]
-        press_df = pd.DataFrame(columns=press_columns)
-        press_df['Time'] = times
-        for node_idx in sorted(pressure_data.keys()):
-            press_df[f'Node_{node_idx}'] = pressure_data[node_idx]
-        press_path = os.path.join(output_dir, "pressure", "data.csv")
-        press_df.to_csv(press_path, index=False)
-        print(f"Saved pressure data: {press_path}")
-
-    # Save drag coefficient data
-    if drag_coeffs:
-        drag_df = pd.DataFrame({
-            'Time': times,
-            'Drag_Coefficient': drag_coeffs
-        })
-        drag_path = os.path.join(output_dir, "drag", "data.csv")
-        drag_df.to_csv(drag_path, index=False)
-        print(f"Saved drag coefficient data: {drag_path}")
-
-
-def main(case_dir, output_dir):
+    def is_running():
+        if process is not None:
+            if isinstance(process, int):
+                if not _pid_alive(process):
+                    return False
+            elif process.poll() is not None:
+                return False
+        if solver_finished(log_path):
+            return False
+        for t_dir in list_time_dirs(case_dir):
+            if float(t_dir) >= end_time - 1e-12:
+                return not _is_settled(os.path.join(case_dir, t_dir), settle_time)
+        return True
+
+    return is_running
+
+
+def main(case_dir, output_dir, follow=False, output_format='store', Re=None,
+         velocity=None, diameter=None, probes=None, derived=None, log_path=None,
+         pid=None, decomposed=None):
     """Extract simulation data."""
-    extract_simulation_data(case_dir, output_dir)
+    is_running = end_time_reached(case_dir, log_path=log_path, process=pid) if follow else None
+    metadata = {key: value for key, value in (('Re', Re), ('U', velocity))
+                if value is not None}
+    extract_simulation_data(case_dir, output_dir, is_running, output_format=output_format,
+                            metadata=metadata, diameter=diameter, probes=probes,
+                            derived=derived, decomposed=decomposed)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--output-dir', type=str, default='data',
                        help='Directory to save extracted data')
+    parser.add_argument('--case-dir', type=str, default='flow_cylinder',
+                       help='OpenFOAM case directory to extract from')
+    parser.add_argument('--follow', action='store_true',
+                       help='Keep watching the case until the solver has finished')
+    parser.add_argument('--log', type=str, default=None,
+                       help='Solver log checked with --follow (default: log.icoFoam '
+                            'in the case directory)')
+    parser.add_argument('--pid', type=int, default=None,
+                       help='Process id of the solver; --follow stops when it exits')
+    parser.add_argument('--format', choices=['store', 'csv', 'probes'], default='store',
+                       help='Chunked result store (default), wide per-node CSV files, '
+                            'or probe time series only')
+    parser.add_argument('--probes', type=str, default=None,
+                       help='Probe file (JSON points and lines) for --format probes')
+    parser.add_argument('--derived', nargs='*', choices=DERIVED_FIELDS, default=None,
+                       help='Store derived fields (default with no names: all of them)')
+    parser.add_argument('--decomposed', action=argparse.BooleanOptionalAction, default=None,
+                       help='Read the processor* directories (default: guess from the case)')
+    parser.add_argument('--Re', type=float, default=None,
+                       help='Reynolds number of the run')
+    parser.add_argument('--velocity', type=float, default=None,
+                       help='Free stream velocity used for the force coefficients')
+    parser.add_argument('--diameter', type=float, default=None,
+                       help='Cylinder diameter (default: measured from the mesh)')
     args = parser.parse_args()
-    main("flow_cylinder", args.output_dir) 
\ No newline at end of file
+    main(args.case_dir, args.output_dir, args.follow, args.format, args.Re,
+         args.velocity, args.diameter, args.probes,
+         None if args.derived is None else args.derived or list(DERIVED_FIELDS),
+         args.log, args.pid, args.decomposed) 
\ No newline at end of file
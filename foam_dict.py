@@ -0,0 +1,468 @@
+"""Parse, edit and write OpenFOAM dictionary files.
+
+A FoamDict keeps the original text of a dictionary and the position of
+every entry in it, so changing a value replaces exactly that value and
+leaves layout, comments and all other entries untouched:
+
+    d = FoamDict.read('system/controlDict')
+    d['deltaT']                              # 0.01
+    d.set('deltaT', 0.002)
+    d.set('boundaryField/In/value', 'uniform (2 0 0)')
+    d.write('system/controlDict')            # atomic
+
+Values are returned as Python objects: numbers as int or float, words
+and strings as str, '( ... )' lists as list, '[ ... ]' dimensions as
+Dimensions, sub-dictionaries as dict, and entries of several tokens (e.g.
+'uniform (1 0 0)') as tuple. set() accepts the same types; a str is
+written verbatim. Large 'List<type> N ( ... )' data is kept as Raw text
+without being parsed.
+
+CaseTemplate reads the dictionaries of a template case once and writes
+edited copies for new cases without touching the template.
+"""
+
+import os
+import re
+
+
+_NUMBER_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$')
+_PAREN_RE = re.compile(r'[()]')
+_PUNCTUATION = '{}()[];'
+
+# Column the values of inserted entries start at
+KEY_WIDTH = 16
+
+
+class Dimensions(list):
+    """Dimension set of a dimensioned value, written as '[ ... ]'."""
+
+
+class Raw(str):
+    """Text of an unparsed value, written verbatim."""
+
+
+def format_value(value):
+    """Write a Python value in dictionary syntax (see the module docstring)."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() and abs(value) < 1e16 else repr(value)
+    if isinstance(value, Dimensions):
+        return '[' + ' '.join(format_value(v) for v in value) + ']'
+    if isinstance(value, list):
+        return '(' + ' '.join(format_value(v) for v in value) + ')'
+    if isinstance(value, tuple):
+        return ' '.join(format_value(v) for v in value)
+    if isinstance(value, dict):
+        body = ''.join(f'    {key:<{KEY_WIDTH - 4}}{format_value(v)};\n'
+                       for key, v in value.items())
+        return '{\n' + body + '}'
+    return str(value)
+
+
+def _next_token(text, i):
+    """Return the next (kind, value, start, end) token from offset i, or None.
+
+    Comments are skipped. Kinds are 'punct', 'string', 'number', 'word'
+    and 'code' (#{ ... #}). A word directly followed by '(' takes in the
+    balanced parentheses, so keys such as div(phi,U) stay one word.
+    """
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+        elif text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end < 0 else end + 1
+        elif text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+        elif text.startswith('#{', i):
+            end = text.find('#}', i + 2)
+            end = n if end < 0 else end + 2
+            return 'code', Raw(text[i:end]), i, end
+        elif c == '"':
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == '\\' else 1
+            return 'string', text[i + 1:j], i, j + 1
+        elif c in _PUNCTUATION:
+            return 'punct', c, i, i + 1
+        else:
+            j = i
+            while j < n and not text[j].isspace() and text[j] not in '{}[];")':
+                if text[j] == '(':
+                    if not (text[i].isalpha() or text[i] in '$#'):
+                        break
+                    depth = 0
+                    while j < n:
+                        depth += {'(': 1, ')': -1}.get(text[j], 0)
+                        j += 1
+                        if depth == 0:
+                            break
+                    continue
+                j += 1
+            word = text[i:j]
+            if _NUMBER_RE.match(word):
+                value = float(word) if any(ch in word for ch in '.eE') else int(word)
+                return 'number', value, i, j
+            return 'word', word, i, j
+    return None
+
+
+class _Parser:
+    """Recursive descent over the tokens of one text, read on demand."""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+        self.last_end = 0
+        self._peeked = None
+
+    def peek(self):
+        if self._peeked is None or self._peeked[0] != self.pos:
+            self._peeked = (self.pos, _next_token(self.text, self.pos))
+        return self._peeked[1]
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("Unexpected end of dictionary")
+        self.pos = self.last_end = token[3]
+        return token
+
+    def peek_second(self):
+        """Return the token after the next one."""
+        token = self.peek()
+        return None if token is None else _next_token(self.text, token[3])
+
+    def dictionary(self, start, closing):
+        """Parse entries up to closing ('}' or None for end of text)."""
+        node = {'entries': {}, 'start': start, 'close': len(self.text)}
+        while True:
+            token = self.peek()
+            if token is None:
+                if closing is not None:
+                    raise ValueError("Missing '}' in dictionary")
+                return node
+            kind, value, tok_start, tok_end = token
+            if kind == 'punct' and value == closing:
+                self.next()
+                node['close'] = tok_start
+                return node
+            if kind == 'punct' and value == ';':
+                self.next()
+                continue
+            if kind == 'punct':
+                raise ValueError(f"Unexpected '{value}' at offset {tok_start}")
+            self.next()
+            entry = {'key': str(value), 'start': tok_start}
+            nxt = self.peek()
+            if nxt is not None and nxt[:2] == ('punct', '{'):
+                self.next()
+                entry['dict'] = self.dictionary(nxt[3], '}')
+                entry['end'] = entry['value_end'] = self.last_end
+                entry['value_start'] = nxt[2]
+            else:
+                items, spans = self.values(single=str(value).startswith('#'))
+                entry['items'], entry['spans'] = items, spans
+                entry['value_start'] = spans[0][0] if spans else tok_end
+                entry['value_end'] = spans[-1][1] if spans else tok_end
+                entry['end'] = self.last_end
+            node['entries'][entry['key']] = entry
+
+    def values(self, single=False):
+        """Parse the values of an entry up to its ';' (or one value for #directives)."""
+        items, spans = [], []
+        while True:
+            token = self.peek()
+            if token is None or token[:2] in (('punct', ';'), ('punct', '}')):
+                if token is not None and token[1] == ';':
+                    self.next()
+                return items, spans
+            start = token[2]
+            items.append(self.value(items))
+            spans.append((start, self.last_end))
+            if single:
+                return items, spans
+
+    def value(self, previous=()):
+        """Parse one value: a token, a list, dimensions or a dictionary."""
+        kind, value, start, end = self.next()
+        if kind == 'punct' and value == '(':
+            return self.sequence(')', list)
+        if kind == 'punct' and value == '[':
+            return self.sequence(']', Dimensions)
+        if kind == 'punct' and value == '{':
+            return _plain(self.dictionary(end, '}'))
+        if kind == 'punct':
+            raise ValueError(f"Unexpected '{value}' at offset {start}")
+        nxt = self.peek()
+        if (kind == 'number' and nxt is not None and nxt[:2] == ('punct', '(')
+                and previous and str(previous[-1]).startswith('List<')):
+            # Skip the data of a large List<type> without tokenizing it
+            depth = 0
+            for match in _PAREN_RE.finditer(self.text, nxt[2]):
+                depth += 1 if match.group() == '(' else -1
+                if depth == 0:
+                    close = match.end()
+                    break
+            else:
+                raise ValueError("Unterminated list")
+            self.pos = self.last_end = close
+            return Raw(self.text[start:close])
+        return value
+
+    def sequence(self, closing, cls):
+        items = cls()
+        while True:
+            token = self.peek()
+            if token is None:
+                raise ValueError(f"Missing '{closing}'")
+            if token[:2] in (('punct', closing), ('punct', ';')):
+                self.next()
+                if token[1] == closing:
+                    return items
+                continue
+            kind, value = token[:2]
+            nxt = self.peek_second()
+            if kind in ('word', 'string') and nxt is not None and nxt[:2] == ('punct', '{'):
+                # Named dictionary inside a list (e.g. polyMesh/boundary)
+                self.next()
+                self.next()
+                items.append((value, _plain(self.dictionary(nxt[3], '}'))))
+            else:
+                items.append(self.value(items))
+
+
+def _entry_value(entry):
+    if 'dict' in entry:
+        return _plain(entry['dict'])
+    items = entry['items']
+    if not items:
+        return None
+    return items[0] if len(items) == 1 else tuple(items)
+
+
+def _plain(node):
+    """Convert a parsed dictionary node to a plain dict of values."""
+    return {key: _entry_value(entry) for key, entry in node['entries'].items()}
+
+
+def parse(text):
+    """Parse dictionary text into a dict of values (see the module docstring)."""
+    return _plain(_Parser(text).dictionary(0, None))
+
+
+def _line_start(text, pos):
+    return text.rfind('\n', 0, pos) + 1
+
+
+def _indent(text, pos):
+    start = _line_start(text, pos)
+    line = text[start:pos]
+    return line[:len(line) - len(line.lstrip())]
+
+
+class FoamDict:
+    """Dictionary file contents with surgical edits.
+
+    Args:
+        text: Dictionary text
+    """
+
+    def __init__(self, text):
+        self._set_text(text)
+
+    def _set_text(self, text):
+        self.text = text
+        self.root = _Parser(text).dictionary(0, None)
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'r') as f:
+            return cls(f.read())
+
+    def _find(self, path):
+        """Return (parent node, entry or None, last key) of a '/'-separated path."""
+        keys = path.split('/')
+        node = self.root
+        for key in keys[:-1]:
+            entry = node['entries'].get(key)
+            if entry is None or 'dict' not in entry:
+                return None, None, keys[-1]
+            node = entry['dict']
+        return node, node['entries'].get(keys[-1]), keys[-1]
+
+    def get(self, path, default=None):
+        """Return the value of an entry ('a/b/c' for nested dictionaries)."""
+        _, entry, _ = self._find(path)
+        return default if entry is None else _entry_value(entry)
+
+    def __getitem__(self, path):
+        _, entry, _ = self._find(path)
+        if entry is None:
+            raise KeyError(path)
+        return _entry_value(entry)
+
+    def __contains__(self, path):
+        return self._find(path)[1] is not None
+
+    def as_dict(self):
+        """Return the whole dictionary as plain Python values."""
+        return _plain(self.root)
+
+    def _replace(self, start, end, text):
+        self._set_text(self.text[:start] + text + self.text[end:])
+
+    def set(self, path, value):
+        """Set an entry, creating it (and missing sub-dictionaries) if needed.
+
+        An existing entry keeps its position and layout; only its value text
+        changes. Setting a number on a dimensioned entry such as
+        'nu [0 2 -1 0 0 0 0] 0.01' replaces just the number. A dict value
+        sets each of its entries inside an existing sub-dictionary.
+
+        Args:
+            path: Entry name, '/'-separated for nested dictionaries
+            value: New value (see format_value)
+        """
+        keys = path.split('/')
+        for depth in range(1, len(keys)):
+            parent = '/'.join(keys[:depth])
+            if parent not in self:
+                self.set(parent, {})
+        node, entry, key = self._find(path)
+        if node is None:
+            raise ValueError(f"'{path}' is inside an entry that is not a dictionary")
+        if entry is not None and 'dict' in entry and isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                self.set(f'{path}/{sub_key}', sub_value)
+            return
+        if entry is not None:
+            items = entry.get('items', [])
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and len(items) > 1 and isinstance(items[-1], (int, float))):
+                start, end = entry['spans'][-1]
+            else:
+                start, end = entry['value_start'], entry['value_end']
+            text = format_value(value)
+            if isinstance(value, dict):
+                text = text.replace('\n', '\n' + _indent(self.text, entry['start']))
+            if 'dict' not in entry and not entry.get('items'):
+                text = ' ' + text
+            self._replace(start, end, text)
+            return
+        self._insert(node, key, value)
+
+    def _insert(self, node, key, value):
+        """Add a new entry at the end of a dictionary node."""
+        entries = list(node['entries'].values())
+        if node is self.root:
+            indent = ''
+            pos = entries[-1]['end'] if entries else len(self.text)
+            prefix = '\n\n'
+        elif entries:
+            indent = _indent(self.text, entries[-1]['start'])
+            pos = entries[-1]['end']
+            prefix = '\n'
+        else:
+            indent = _indent(self.text, node['close']) + '    '
+            pos = node['start']
+            prefix = '\n'
+        text = format_value(value)
+        if isinstance(value, dict):
+            text = text.replace('\n', '\n' + indent)
+            line = f'{indent}{key}\n{indent}{text}'
+        else:
+            line = f'{indent}{key:<{KEY_WIDTH}} {text};' if len(key) >= KEY_WIDTH \
+                else f'{indent}{key:<{KEY_WIDTH}}{text};'
+        self._replace(pos, pos, prefix + line)
+
+    def update(self, changes):
+        """Apply several changes: dict of path -> value."""
+        for path, value in changes.items():
+            self.set(path, value)
+
+    def write(self, path):
+        """Write the dictionary atomically (temporary file, then rename)."""
+        write_atomic(path, self.text)
+
+
+def write_atomic(path, text):
+    """Write a text file through a temporary file and a rename."""
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def edit_dict(path, changes):
+    """Apply changes (path -> value) to a dictionary file in place, atomically."""
+    d = FoamDict.read(path)
+    d.update(changes)
+    d.write(path)
+
+
+class CaseTemplate:
+    """Files of a template case held in memory.
+
+    Args:
+        template_dir: Template case directory
+        entries: Files or directories to load, relative to the case
+        sources: dict mapping an entry to the directory it is read from
+            instead (e.g. '0' -> '0.orig')
+    """
+
+    def __init__(self, template_dir, entries, sources=None):
+        self.template_dir = template_dir
+        self.files = {}
+        sources = sources or {}
+        for entry in entries:
+            src = sources.get(entry, os.path.join(template_dir, entry))
+            if os.path.isdir(src):
+                for root, _, names in os.walk(src):
+                    for name in names:
+                        path = os.path.join(root, name)
+                        rel = os.path.join(entry, os.path.relpath(path, src))
+                        with open(path, 'rb') as f:
+                            self.files[rel] = f.read()
+            elif os.path.exists(src):
+                with open(src, 'rb') as f:
+                    self.files[entry] = f.read()
+        self._parsed = {}
+
+    def dictionary(self, name):
+        """Return a new FoamDict of one template file."""
+        if name not in self._parsed:
+            self._parsed[name] = FoamDict(self.files[name].decode())
+        template = self._parsed[name]
+        d = FoamDict.__new__(FoamDict)
+        d.text, d.root = template.text, template.root
+        return d
+
+    def write(self, case_dir, edits=None):
+        """Write the template files into a case, applying edits.
+
+        Args:
+            case_dir: Case directory to write into
+            edits: dict of file name (relative to the case) -> dict of
+                entry path -> value; files must be part of the template
+        """
+        edits = edits or {}
+        for name, data in self.files.items():
+            path = os.path.join(case_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if edits.get(name):
+                d = self.dictionary(name)
+                d.update(edits[name])
+                write_atomic(path, d.text)
+            else:
+                tmp = f'{path}.tmp-{os.getpid()}'
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+        missing = set(edits) - set(self.files)
+        if missing:
+            raise FileNotFoundError(f"Not in the template: {', '.join(sorted(missing))}")
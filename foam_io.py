@@ -0,0 +1,523 @@
+"""Read OpenFOAM field and list files into NumPy arrays.
+
+ASCII, binary and gzip-compressed ('.gz') files are supported. Binary
+payloads are returned as zero-copy views of a memory-mapped file (or of the
+decompressed buffer for '.gz' files).
+"""
+
+import gzip
+import hashlib
+import mmap
+import os
+import re
+import struct
+import numpy as np
+
+
+# Number of components stored per element for each OpenFOAM value type
+N_COMPONENTS = {
+    'scalar': 1,
+    'vector': 3,
+    'symmTensor': 6,
+    'tensor': 9,
+    'label': 1,
+}
+
+_FIELD_TYPES = {
+    'volScalarField': 'scalar',
+    'volVectorField': 'vector',
+    'volSymmTensorField': 'symmTensor',
+    'volTensorField': 'tensor',
+    'surfaceScalarField': 'scalar',
+    'surfaceVectorField': 'vector',
+    'scalarField': 'scalar',
+    'vectorField': 'vector',
+    'labelList': 'label',
+}
+
+_HEADER_RE = re.compile(rb'FoamFile\s*\{(.*?)\}', re.S)
+_HEADER_ENTRY_RE = re.compile(rb'(\w+)\s+("[^"]*"|[^;]*);')
+_INTERNAL_FIELD_RE = re.compile(rb'internalField\s+(uniform|nonuniform)\s+')
+_LIST_START_RE = re.compile(rb'(?:List<(\w+)>\s*)?(\d+)\s*([({])')
+_N_CELLS_RE = re.compile(r'nCells:\s*(\d+)')
+_ARCH_RE = re.compile(r'(label|scalar)=(\d+)')
+
+
+def find_field(time_dir, name):
+    """Return the path of a field file, allowing for a compressed copy.
+
+    Args:
+        time_dir: Path to the time directory
+        name: Field name (e.g. 'U')
+
+    Returns:
+        str or None: Path to 'name' or 'name.gz', or None if neither exists
+    """
+    path = os.path.join(time_dir, name)
+    if os.path.exists(path):
+        return path
+    if os.path.exists(path + '.gz'):
+        return path + '.gz'
+    return None
+
+
+def load_file(filepath):
+    """Load a (possibly compressed) OpenFOAM file as a bytes-like buffer.
+
+    Plain files are memory-mapped. Compressed files are decompressed in a
+    streaming fashion straight into a single preallocated buffer sized from
+    the gzip trailer, so the payload is never held twice.
+
+    Args:
+        filepath: Path to the file; '.gz' files are decompressed
+
+    Returns:
+        bytes-like: mmap, bytearray or bytes with the file contents
+    """
+    if filepath.endswith('.gz'):
+        with open(filepath, 'rb') as f:
+            f.seek(-4, os.SEEK_END)
+            size = struct.unpack('<I', f.read(4))[0]
+        with gzip.open(filepath, 'rb') as f:
+            buf = bytearray(size)
+            n_read = f.readinto(buf)
+            rest = f.read()
+        if n_read < size or rest:
+            # ISIZE is only the size modulo 2**32
+            return bytes(buf[:n_read]) + rest
+        return buf
+
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _find(data, sub, pos):
+    """Return the index of sub in data after pos, like bytes.index."""
+    idx = data.find(sub, pos)
+    if idx < 0:
+        raise ValueError(f"Expected {sub!r} after offset {pos}")
+    return idx
+
+
+def _binary_dtype(header, value_type):
+    """Return the on-disk NumPy dtype for binary data of value_type."""
+    arch = header.get('arch', 'LSB;label=32;scalar=64')
+    sizes = dict(_ARCH_RE.findall(arch))
+    order = '>' if 'MSB' in arch else '<'
+    if value_type == 'label':
+        return np.dtype(f"{order}i{int(sizes.get('label', 32)) // 8}")
+    return np.dtype(f"{order}f{int(sizes.get('scalar', 64)) // 8}")
+
+
+def read_header(data):
+    """Parse the FoamFile header block.
+
+    Args:
+        data: Raw file contents as a bytes-like buffer
+
+    Returns:
+        dict: Header entries as strings (quotes removed)
+    """
+    match = _HEADER_RE.search(data)
+    if match is None:
+        return {}
+    header = {}
+    for key, value in _HEADER_ENTRY_RE.findall(match.group(1)):
+        header[key.decode()] = value.strip().strip(b'"').decode()
+    return header
+
+
+def _value_type(header, default='scalar'):
+    """Return the element type ('scalar', 'vector', ...) named by a header."""
+    return _FIELD_TYPES.get(header.get('class', ''), default)
+
+
+def _parse_uniform(data, pos, n_components):
+    """Parse the value following 'uniform' at pos."""
+    if n_components == 1:
+        end = _find(data, b';', pos)
+        return np.array([float(data[pos:end])])
+    end = _find(data, b')', pos)
+    return np.fromstring(data[_find(data, b'(', pos) + 1:end].decode(), sep=' ')
+
+
+def _parse_ascii_list(data, pos, count, n_components, dtype):
+    """Parse an ASCII list body that starts right after its opening '('.
+
+    Vectors are written one per line as '(x y z)', so the list ends at the
+    first ')' that starts a line; parentheses inside the block are stripped
+    and the remaining numbers are converted in a single NumPy call.
+
+    Returns:
+        tuple: (values, offset just past the closing ')')
+    """
+    if count == 0:
+        return np.empty(0, dtype=dtype), _find(data, b')', pos) + 1
+    if n_components == 1:
+        end = _find(data, b')', pos)
+    else:
+        end = _find(data, b'\n)', pos)
+    block = data[pos:end]
+    if n_components > 1:
+        block = block.translate(None, b'()')
+    values = np.fromstring(block.decode(), dtype=dtype, sep=' ')
+    if values.size != count * n_components:
+        raise ValueError(
+            f"Expected {count} values of {n_components} components, "
+            f"found {values.size} numbers")
+    return values, _find(data, b')', end) + 1
+
+
+def _parse_binary_list(data, pos, count, n_components, disk_dtype, dtype):
+    """Wrap a binary list body starting at pos without copying it.
+
+    Returns:
+        tuple: (values, offset just past the closing ')')
+    """
+    values = np.frombuffer(data, dtype=disk_dtype, count=count * n_components,
+                           offset=pos)
+    end = pos + values.nbytes
+    if data[end:end + 1] != b')':
+        raise ValueError(f"Binary list of {count} elements is not closed by ')'")
+    if values.dtype != dtype:
+        values = values.astype(dtype)
+    return values, end + 1
+
+
+def _parse_list(data, pos, n_components, dtype, header):
+    """Parse a '[List<type>] N (...)' list starting at pos.
+
+    Args:
+        data: Raw file contents as a bytes-like buffer
+        pos: Offset of the list (just after 'nonuniform' or the header)
+        n_components: Number of components per element
+        dtype: NumPy dtype of the returned values
+        header: Parsed FoamFile header (selects ASCII or binary parsing)
+
+    Returns:
+        tuple: (flat array of count * n_components values, offset just past
+            the end of the list)
+    """
+    match = _LIST_START_RE.search(data, pos)
+    if match is None:
+        raise ValueError("Could not find list size and opening bracket")
+    value_type = 'label' if np.issubdtype(dtype, np.integer) else 'scalar'
+    if match.group(1) is not None:
+        n_components = N_COMPONENTS.get(match.group(1).decode(), n_components)
+    count = int(match.group(2))
+    body = match.end()
+    binary = header.get('format') == 'binary'
+
+    if match.group(3) == b'{':
+        # Compact uniform list: N{value}
+        if binary:
+            value = np.frombuffer(data, dtype=_binary_dtype(header, value_type),
+                                  count=n_components, offset=body).astype(dtype)
+            end = body + value.nbytes
+        else:
+            end = _find(data, b'}', body)
+            value = np.fromstring(data[body:end].translate(None, b'()').decode(),
+                                  dtype=dtype, sep=' ')
+        return np.tile(value, count), end + 1
+
+    if binary:
+        return _parse_binary_list(data, body, count, n_components,
+                                  _binary_dtype(header, value_type), dtype)
+    return _parse_ascii_list(data, body, count, n_components, dtype)
+
+
+def _shape(values, n_components):
+    """Reshape a flat value array to (N,) or (N, n_components)."""
+    if n_components == 1:
+        return values
+    return values.reshape(-1, n_components)
+
+
+def read_field(filepath, n_cells=None):
+    """Read the internalField of an OpenFOAM volume field.
+
+    Args:
+        filepath: Path to the field file (e.g. '0.1/U' or '0.1/U.gz')
+        n_cells: Number of cells, used to expand 'uniform' fields. If None,
+            a uniform field is returned as a single element.
+
+    Returns:
+        np.ndarray: Array of shape (N,) for scalars or (N, 3) for vectors
+    """
+    return parse_field(load_file(filepath), n_cells)
+
+
+def parse_field(data, n_cells=None):
+    """Parse the internalField from raw field file contents.
+
+    Args:
+        data: Raw file contents as a bytes-like buffer
+        n_cells: Number of cells, used to expand 'uniform' fields
+
+    Returns:
+        np.ndarray: Array of shape (N,) for scalars or (N, 3) for vectors
+    """
+    header = read_header(data)
+    n_components = N_COMPONENTS[_value_type(header)]
+
+    match = _INTERNAL_FIELD_RE.search(data)
+    if match is None:
+        raise ValueError("No internalField entry found")
+
+    if match.group(1) == b'uniform':
+        value = _parse_uniform(data, match.end(), n_components)
+        values = np.tile(value, n_cells if n_cells is not None else 1)
+    else:
+        values, _ = _parse_list(data, match.end(), n_components, np.float64, header)
+    return _shape(values, n_components)
+
+
+def read_list(filepath, dtype=np.float64):
+    """Read a top-level OpenFOAM list file such as points or owner.
+
+    Args:
+        filepath: Path to the list file
+        dtype: NumPy dtype of the values
+
+    Returns:
+        np.ndarray: Array of shape (N,) or (N, n_components)
+    """
+    data = load_file(filepath)
+    header = read_header(data)
+    n_components = N_COMPONENTS[_value_type(header)]
+    start = _HEADER_RE.search(data)
+    values, _ = _parse_list(data, start.end() if start else 0, n_components, dtype,
+                            header)
+    return _shape(values, n_components)
+
+
+def read_faces(filepath):
+    """Read a polyMesh faces file into compressed-row (CSR) arrays.
+
+    Both the ASCII 'faceList' form ('4(0 1 2 3)' per face) and the
+    'faceCompactList' form (an offsets list followed by a labels list, used
+    for binary output) are supported.
+
+    Args:
+        filepath: Path to the faces file
+
+    Returns:
+        tuple: (offsets, labels) where the points of face i are
+            labels[offsets[i]:offsets[i + 1]]
+    """
+    data = load_file(filepath)
+    header = read_header(data)
+    start = _HEADER_RE.search(data)
+    pos = start.end() if start else 0
+
+    if header.get('class') == 'faceCompactList':
+        offsets, end = _parse_list(data, pos, 1, np.int64, header)
+        labels, _ = _parse_list(data, end, 1, np.int64, header)
+        return offsets, labels
+
+    match = _LIST_START_RE.search(data, pos)
+    if match is None:
+        raise ValueError("Could not find list size and opening bracket")
+    count = int(match.group(2))
+    end = _find(data, b'\n)', match.end()) if count else match.end()
+    # Mark brackets with negative sentinels and convert in one call:
+    # '4(0 1 2 3)' -> 4 -1 0 1 2 3 -2
+    block = data[match.end():end].replace(b'(', b' -1 ').replace(b')', b' -2 ')
+    tokens = np.fromstring(block.decode(), dtype=np.int64, sep=' ')
+    opens = np.nonzero(tokens == -1)[0]
+    if len(opens) != count:
+        raise ValueError(f"Expected {count} faces, found {len(opens)}")
+    sizes = tokens[opens - 1]
+    keep = tokens >= 0
+    keep[opens - 1] = False
+    labels = tokens[keep]
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    if offsets[-1] != len(labels):
+        raise ValueError("Face sizes do not match the number of point labels")
+    return offsets, labels
+
+
+def read_boundary(filepath):
+    """Read a polyMesh boundary file.
+
+    Args:
+        filepath: Path to the boundary file
+
+    Returns:
+        dict: Patch name -> {'type', 'nFaces', 'startFace'}, in file order
+    """
+    data = bytes(load_file(filepath))
+    start = _HEADER_RE.search(data)
+    body = data[start.end() if start else 0:].decode()
+    patches = {}
+    for name, entries in re.findall(r'(\w+)\s*\{([^}]*)\}', body):
+        info = dict(re.findall(r'(\w+)\s+([^;]*);', entries))
+        patches[name] = {
+            'type': info.get('type', 'patch'),
+            'nFaces': int(info['nFaces']),
+            'startFace': int(info['startFace']),
+        }
+    return patches
+
+
+def processor_dirs(case_dir):
+    """Return the processor* directories of a decomposed case, in rank order.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+
+    Returns:
+        list: Paths of processor0, processor1, ... (empty if not decomposed)
+    """
+    ranks = []
+    for item in os.listdir(case_dir):
+        if item.startswith('processor') and item[len('processor'):].isdigit():
+            ranks.append(int(item[len('processor'):]))
+    return [os.path.join(case_dir, f'processor{rank}') for rank in sorted(ranks)]
+
+
+def read_cell_addressing(case_dir):
+    """Read the local-to-global cell maps of a decomposed case.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+
+    Returns:
+        list: (processor_dir, addressing) pairs, where addressing holds the
+            global index of every local cell
+    """
+    addressing = []
+    for proc_dir in processor_dirs(case_dir):
+        path = find_field(os.path.join(proc_dir, 'constant', 'polyMesh'),
+                          'cellProcAddressing')
+        addressing.append((proc_dir, read_list(path, np.int64)))
+    return addressing
+
+
+def read_decomposed_field(addressing, time_name, name):
+    """Assemble a global internalField from the processor* directories.
+
+    Args:
+        addressing: Result of read_cell_addressing
+        time_name: Name of the time directory (e.g. '0.1')
+        name: Field name (e.g. 'U')
+
+    Returns:
+        np.ndarray: Array of shape (N,) or (N, 3) in global cell order
+    """
+    n_cells = sum(len(cells) for _, cells in addressing)
+    values = None
+    for proc_dir, cells in addressing:
+        local = read_field(find_field(os.path.join(proc_dir, time_name), name),
+                           len(cells))
+        if values is None:
+            values = np.empty((n_cells,) + local.shape[1:])
+        values[cells] = local
+    return values
+
+
+def read_dict_value(filepath, key):
+    """Return the raw value of a top-level 'key value;' dictionary entry.
+
+    Args:
+        filepath: Path to the dictionary file (e.g. system/controlDict)
+        key: Entry name
+
+    Returns:
+        str or None: Value text without the trailing ';', or None if missing
+    """
+    with open(filepath, 'r') as f:
+        for line in f:
+            parts = line.split(None, 1)
+            if len(parts) == 2 and parts[0] == key:
+                return parts[1].strip().rstrip(';').strip()
+    return None
+
+
+def mesh_hash(case_dir):
+    """Return a SHA-256 digest of the polyMesh files of a case.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+
+    Returns:
+        str: Hex digest over points, faces, owner, neighbour and boundary
+    """
+    digest = hashlib.sha256()
+    mesh_dir = os.path.join(case_dir, "constant", "polyMesh")
+    for name in ('points', 'faces', 'owner', 'neighbour', 'boundary'):
+        path = find_field(mesh_dir, name)
+        if path is None:
+            continue
+        digest.update(name.encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def count_cells(case_dir):
+    """Return the number of mesh cells from the owner file header note.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+
+    Returns:
+        int or None: Number of cells, or None if the note is missing
+    """
+    owner_path = find_field(os.path.join(case_dir, "constant", "polyMesh"), "owner")
+    if owner_path is None:
+        return None
+    opener = gzip.open if owner_path.endswith('.gz') else open
+    with opener(owner_path, 'rb') as f:
+        header = read_header(f.read(2048))
+    match = _N_CELLS_RE.search(header.get('note', ''))
+    return int(match.group(1)) if match else None
+
+
+def _format_list(values, header):
+    """Format values as the body of an internalField list."""
+    value_type = 'vector' if values.ndim == 2 else 'scalar'
+    n = len(values)
+    if header.get('format') == 'binary':
+        body = values.astype(_binary_dtype(header, 'scalar')).tobytes()
+    else:
+        row = '\n(%.12g %.12g %.12g)' if value_type == 'vector' else '\n%.12g'
+        body = ((row * n) % tuple(values.ravel())).encode() + b'\n'
+    return f'nonuniform List<{value_type}> \n{n}\n('.encode() + body + b')\n'
+
+
+def write_internal_field(template_path, out_path, values):
+    """Write a copy of a field file with a new nonuniform internalField.
+
+    The header, dimensions and boundaryField of the template are kept, and
+    the list is written in the format (ascii or binary) the header declares.
+
+    Args:
+        template_path: Field file to copy (e.g. '0/U')
+        out_path: Output path, may be the same as template_path
+        values: Array of shape (N,) or (N, 3)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    data = load_file(template_path)
+    header = read_header(data)
+    match = _INTERNAL_FIELD_RE.search(data)
+    if match is None:
+        raise ValueError(f"No internalField entry in {template_path}")
+    if match.group(1) == b'uniform':
+        end = _find(data, b';', match.end())
+    else:
+        n_components = N_COMPONENTS[_value_type(header)]
+        _, list_end = _parse_list(data, match.end(), n_components, np.float64, header)
+        end = _find(data, b';', list_end)
+    content = (bytes(data[:match.start()]) + b'internalField   '
+               + _format_list(values, header) + bytes(data[end:]))
+
+    opener = gzip.open if out_path.endswith('.gz') else open
+    tmp = f'{out_path}.tmp-{os.getpid()}'
+    with opener(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, out_path)
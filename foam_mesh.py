@@ -0,0 +1,228 @@
+"""Parse an OpenFOAM polyMesh into NumPy arrays and cache the result.
+
+The mesh is held as flat arrays: point coordinates, CSR-style face->point
+lists, owner/neighbour cells and per-patch face ranges. Face centres, face
+area vectors, cell centres and cell volumes are computed with the same
+triangle/pyramid decomposition OpenFOAM uses, fully vectorized.
+
+Parsed meshes are cached as .npz files keyed by a hash of the polyMesh
+files, so later extractions skip both parsing and the geometry pass.
+"""
+
+import json
+import os
+import numpy as np
+from foam_io import (read_list, read_faces, read_boundary, find_field, mesh_hash)
+
+
+# Directory holding cached meshes, relative to the working directory
+MESH_CACHE_DIR = os.path.join('cache', 'mesh')
+
+_ARRAYS = ('points', 'face_offsets', 'face_labels', 'owner', 'neighbour',
+           'face_centres', 'face_areas', 'cell_centres', 'cell_volumes')
+
+
+class PolyMesh:
+    """Arrays describing an OpenFOAM polyMesh and its geometry.
+
+    Attributes:
+        points: (P, 3) point coordinates
+        face_offsets: (F + 1,) start of each face in face_labels
+        face_labels: Point labels of all faces, concatenated
+        owner: (F,) owner cell of each face
+        neighbour: (F_internal,) neighbour cell of each internal face
+        patches: dict of patch name -> {'type', 'nFaces', 'startFace'}
+        face_centres: (F, 3) face centres
+        face_areas: (F, 3) face area vectors, pointing out of the owner
+        cell_centres: (C, 3) cell centres
+        cell_volumes: (C,) cell volumes
+        hash: Hash of the polyMesh files the mesh was built from
+    """
+
+    def __init__(self, arrays, patches, hash=None):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.patches = patches
+        self.hash = hash
+
+    @property
+    def n_cells(self):
+        return len(self.cell_volumes)
+
+    @property
+    def n_faces(self):
+        return len(self.owner)
+
+    @property
+    def n_internal_faces(self):
+        return len(self.neighbour)
+
+    def patch_slice(self, name):
+        """Return the slice of face indices belonging to a boundary patch."""
+        patch = self.patches[name]
+        return slice(patch['startFace'], patch['startFace'] + patch['nFaces'])
+
+    def face_points(self, face):
+        """Return the point labels of one face."""
+        return self.face_labels[self.face_offsets[face]:self.face_offsets[face + 1]]
+
+    def save(self, path):
+        """Save the mesh arrays to a compressed .npz file."""
+        tmp = f'{path}.tmp-{os.getpid()}.npz'
+        np.savez(tmp, patches=json.dumps(self.patches), hash=self.hash or '',
+                 **{name: getattr(self, name) for name in _ARRAYS})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a mesh saved with save()."""
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in _ARRAYS}
+            return cls(arrays, json.loads(str(data['patches'])),
+                       str(data['hash']) or None)
+
+
+def face_geometry(points, offsets, labels):
+    """Compute face centres and area vectors for CSR faces.
+
+    Each face is split into triangles around its point average; the area
+    vector is the sum of the triangle area vectors and the centre is the
+    area-weighted mean of the triangle centres.
+
+    Args:
+        points: (P, 3) point coordinates
+        offsets: (F + 1,) face offsets into labels
+        labels: Point labels of all faces
+
+    Returns:
+        tuple: (face_centres (F, 3), face_areas (F, 3))
+    """
+    sizes = np.diff(offsets)
+    n_faces = len(sizes)
+    face_of = np.repeat(np.arange(n_faces), sizes)
+
+    # Index of the next point of each face, wrapping to the first
+    following = np.arange(1, len(labels) + 1)
+    following[offsets[1:] - 1] = offsets[:-1]
+
+    p = points[labels]
+    p_next = points[labels[following]]
+    centre_est = _sum_rows(face_of, p, n_faces) / sizes[:, None]
+    c = centre_est[face_of]
+
+    tri_normals = np.cross(p_next - p, c - p)
+    tri_areas = np.linalg.norm(tri_normals, axis=1)
+    tri_centres = p + p_next + c
+
+    sum_normals = _sum_rows(face_of, tri_normals, n_faces)
+    sum_areas = np.bincount(face_of, tri_areas, minlength=n_faces)
+    sum_centres = _sum_rows(face_of, tri_areas[:, None] * tri_centres, n_faces)
+
+    degenerate = sum_areas < 1e-300
+    sum_areas[degenerate] = 1.0
+    face_centres = sum_centres / (3.0 * sum_areas[:, None])
+    face_centres[degenerate] = centre_est[degenerate]
+    return face_centres, 0.5 * sum_normals
+
+
+def cell_geometry(face_centres, face_areas, owner, neighbour, n_cells):
+    """Compute cell centres and volumes from face geometry.
+
+    Each cell is split into pyramids with the faces as bases and the mean
+    of the cell's face centres as apex.
+
+    Args:
+        face_centres: (F, 3) face centres
+        face_areas: (F, 3) face area vectors
+        owner: (F,) owner cells
+        neighbour: (F_internal,) neighbour cells
+        n_cells: Number of cells
+
+    Returns:
+        tuple: (cell_centres (C, 3), cell_volumes (C,))
+    """
+    n_internal = len(neighbour)
+    internal_centres = face_centres[:n_internal]
+    n_cell_faces = (np.bincount(owner, minlength=n_cells)
+                    + np.bincount(neighbour, minlength=n_cells))
+    centre_est = (_sum_rows(owner, face_centres, n_cells)
+                  + _sum_rows(neighbour, internal_centres, n_cells)) / n_cell_faces[:, None]
+
+    # Three times the pyramid volumes, seen from the owner and the neighbour
+    pyr_own = np.einsum('ij,ij->i', face_areas, face_centres - centre_est[owner])
+    pyr_nei = np.einsum('ij,ij->i', face_areas[:n_internal],
+                        centre_est[neighbour] - internal_centres)
+    ctr_own = 0.75 * face_centres + 0.25 * centre_est[owner]
+    ctr_nei = 0.75 * internal_centres + 0.25 * centre_est[neighbour]
+
+    volumes = (np.bincount(owner, pyr_own, minlength=n_cells)
+               + np.bincount(neighbour, pyr_nei, minlength=n_cells))
+    centres = (_sum_rows(owner, pyr_own[:, None] * ctr_own, n_cells)
+               + _sum_rows(neighbour, pyr_nei[:, None] * ctr_nei, n_cells))
+    tiny = np.abs(volumes) < 1e-300
+    centres[~tiny] /= volumes[~tiny, None]
+    centres[tiny] = centre_est[tiny]
+    return centres, volumes / 3.0
+
+
+def _sum_rows(index, values, n):
+    """Sum rows of a (M, 3) array into n bins given by index."""
+    return np.stack([np.bincount(index, values[:, k], minlength=n)
+                     for k in range(values.shape[1])], axis=1)
+
+
+def parse_mesh(case_dir):
+    """Parse constant/polyMesh of a case and compute its geometry.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+
+    Returns:
+        PolyMesh: Parsed mesh
+    """
+    mesh_dir = os.path.join(case_dir, 'constant', 'polyMesh')
+    points = read_list(find_field(mesh_dir, 'points'))
+    offsets, labels = read_faces(find_field(mesh_dir, 'faces'))
+    owner = read_list(find_field(mesh_dir, 'owner'), np.int64)
+    neighbour = read_list(find_field(mesh_dir, 'neighbour'), np.int64)
+    patches = read_boundary(find_field(mesh_dir, 'boundary'))
+
+    n_cells = int(max(owner.max(), neighbour.max(initial=-1))) + 1
+    face_centres, face_areas = face_geometry(points, offsets, labels)
+    cell_centres, cell_volumes = cell_geometry(face_centres, face_areas, owner,
+                                               neighbour, n_cells)
+    arrays = {
+        'points': np.ascontiguousarray(points),
+        'face_offsets': offsets,
+        'face_labels': labels,
+        'owner': np.ascontiguousarray(owner),
+        'neighbour': np.ascontiguousarray(neighbour),
+        'face_centres': face_centres,
+        'face_areas': face_areas,
+        'cell_centres': cell_centres,
+        'cell_volumes': cell_volumes,
+    }
+    return PolyMesh(arrays, patches)
+
+
+def load_mesh(case_dir, cache_dir=MESH_CACHE_DIR):
+    """Load the mesh of a case, parsing it only if it is not cached.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        cache_dir: Directory of cached meshes, or None to disable caching
+
+    Returns:
+        PolyMesh: Parsed mesh
+    """
+    digest = mesh_hash(case_dir)
+    cache_path = os.path.join(cache_dir, f'{digest}.npz') if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        return PolyMesh.load(cache_path)
+
+    mesh = parse_mesh(case_dir)
+    mesh.hash = digest
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        mesh.save(cache_path)
+    return mesh
@@ -0,0 +1,167 @@
+"""Drag and lift coefficients from pressure and wall shear on the cylinder."""
+
+import numpy as np
+from physics import calculate_nu_from_reynolds, calculate_drag_coefficient
+
+
+# Name of the cylinder wall patch in the mesh
+CYLINDER_PATCH = 'Circle'
+
+
+def patch_cells(mesh, patch=CYLINDER_PATCH):
+    """Return the owner cell of every face of a patch, in face order."""
+    return mesh.owner[mesh.patch_slice(patch)]
+
+
+def patch_diameter(mesh, patch=CYLINDER_PATCH, lift_dir=(0.0, 1.0, 0.0)):
+    """Measure the extent of a patch across the flow (the cylinder diameter)."""
+    sl = mesh.patch_slice(patch)
+    labels = np.concatenate([mesh.face_points(f) for f in range(sl.start, sl.stop)])
+    extent = mesh.points[labels] @ np.asarray(lift_dir)
+    return float(extent.max() - extent.min())
+
+
+def span(mesh):
+    """Return the z extent of the mesh (the depth of a 2D case)."""
+    z = mesh.points[:, 2]
+    return float(z.max() - z.min())
+
+
+def patch_forces(mesh, pressures, velocities=None, nu=None, patch=CYLINDER_PATCH):
+    """Integrate pressure and viscous forces over a wall patch.
+
+    All time steps are integrated together with matrix products. Pressure
+    at the faces is taken from the owner cells (zero-gradient), and wall
+    shear from the tangential velocity of the owner cells over their
+    wall-normal distance (no-slip wall).
+
+    Args:
+        mesh: PolyMesh
+        pressures: (T, F_patch) kinematic pressure at the patch owner cells
+            (see patch_cells)
+        velocities: (T, F_patch, 3) velocity at the patch owner cells, or
+            None to skip the viscous contribution
+        nu: Kinematic viscosity, required with velocities
+        patch: Patch name
+
+    Returns:
+        np.ndarray: (T, 3) force per unit density acting on the patch
+
+    Raises:
+        ValueError: If velocities are given without nu, or for a different
+            number of time steps than the pressures
+    """
+    sl = mesh.patch_slice(patch)
+    areas = mesh.face_areas[sl]
+    # Boundary area vectors point out of the fluid, i.e. into the body
+    forces = np.atleast_2d(pressures) @ areas
+
+    if velocities is not None:
+        if nu is None:
+            raise ValueError("The viscous forces need the kinematic viscosity nu")
+        if len(velocities) != len(forces):
+            raise ValueError(f"Velocities of {len(velocities)} time steps do not match "
+                             f"pressures of {len(forces)} time steps")
+        mag = np.linalg.norm(areas, axis=1)
+        normals = areas / mag[:, None]
+        cells = mesh.owner[sl]
+        dist = np.abs(np.einsum('ij,ij->i', mesh.face_centres[sl] - mesh.cell_centres[cells],
+                                normals))
+        velocities = velocities.reshape(-1, len(mag), 3)
+        normal_part = np.einsum('tij,ij->ti', velocities, normals)
+        tangential = velocities - normal_part[:, :, None] * normals
+        forces += nu * np.einsum('tij,i->tj', tangential, mag / dist)
+    return forces
+
+
+def force_coefficients(forces, velocity, diameter, depth,
+                       drag_dir=(1.0, 0.0, 0.0), lift_dir=(0.0, 1.0, 0.0)):
+    """Convert forces per unit density into drag and lift coefficients.
+
+    Args:
+        forces: (T, 3) force per unit density
+        velocity: Free stream velocity
+        diameter: Cylinder diameter
+        depth: Span of the cylinder in the mesh
+        drag_dir: Unit vector of the flow direction
+        lift_dir: Unit vector normal to the flow
+
+    Returns:
+        tuple: (Cd, Cl) arrays of shape (T,)
+    """
+    area = diameter * depth
+    cd = calculate_drag_coefficient(forces @ np.asarray(drag_dir), velocity, 1.0, area)
+    cl = calculate_drag_coefficient(forces @ np.asarray(lift_dir), velocity, 1.0, area)
+    return cd, cl
+
+
+def reference_values(mesh, metadata, diameter=None, patch=CYLINDER_PATCH):
+    """Resolve velocity, diameter, depth and nu for the coefficients.
+
+    Values come from the run parameters in metadata (U, Re, nu, D) where
+    available. The diameter falls back to the measured patch extent, and
+    nu to calculate_nu_from_reynolds when the case did not record it.
+
+    Args:
+        mesh: PolyMesh
+        metadata: Run attributes (e.g. the result store metadata)
+        diameter: Cylinder diameter overriding metadata['D']
+        patch: Patch name
+
+    Returns:
+        dict: velocity, diameter, depth and nu
+    """
+    velocity = metadata.get('U')
+    if velocity is None:
+        print("No inlet velocity given; using U = 1.0 for the force coefficients")
+        velocity = 1.0
+    diameter = diameter or metadata.get('D') or patch_diameter(mesh, patch)
+    nu = metadata.get('nu')
+    if nu is None and metadata.get('Re'):
+        nu = calculate_nu_from_reynolds(metadata['Re'], velocity, diameter)
+    return {'velocity': float(velocity), 'diameter': float(diameter),
+            'depth': span(mesh), 'nu': nu}
+
+
+def store_force_coefficients(store, mesh, diameter=None, viscous=True,
+                             patch=CYLINDER_PATCH):
+    """Compute Cd and Cl for every stored time step and save them.
+
+    Only the patch owner cells are read from the store, and all time steps
+    are integrated at once. The results replace the 'Cd' and 'Cl' fields.
+    Wall shear is read from U at the pressure times; if U is missing at
+    some of them, or nu is unknown, the coefficients are pressure-only,
+    which is printed and recorded as metadata['viscous_forces'] = False.
+
+    Args:
+        store: Writable ResultStore holding p (and U for viscous forces)
+        mesh: PolyMesh the store was extracted from
+        diameter: Cylinder diameter overriding the run metadata
+        viscous: Include wall shear in the forces
+        patch: Patch name
+
+    Returns:
+        tuple: (times, Cd, Cl)
+    """
+    ref = reference_values(mesh, store.metadata, diameter, patch)
+    cells = patch_cells(mesh, patch)
+    times = store.times('p')
+    pressures = store.read('p', cells=cells)
+    velocities = None
+    if viscous:
+        missing = 'no nu' if ref['nu'] is None else 'no U field'
+        if ref['nu'] is not None and 'U' in store.fields:
+            u_times = np.asarray(store.times('U'))
+            index = np.clip(np.searchsorted(u_times, times), 0, max(len(u_times) - 1, 0))
+            if len(u_times) and np.allclose(u_times[index], times, rtol=0, atol=1e-9):
+                velocities = store.read('U', index, cells)
+            else:
+                missing = 'U not stored at every pressure time'
+        if velocities is None:
+            print(f"Warning: {missing}; Cd and Cl exclude the viscous forces")
+    store.metadata['viscous_forces'] = velocities is not None
+    forces = patch_forces(mesh, pressures, velocities, ref['nu'], patch)
+    cd, cl = force_coefficients(forces, ref['velocity'], ref['diameter'], ref['depth'])
+    store.put('Cd', times, cd[:, None])
+    store.put('Cl', times, cl[:, None])
+    return times, cd, cl
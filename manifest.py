@@ -0,0 +1,341 @@
+"""Persistent state of the points of a sweep, shared by its workers.
+
+Each (Re, U, mesh) point of a sweep is a row of a SQLite database (by default
+data/manifest_<config>.sqlite for the sweep file <config>.json) with its
+state, attempt count, outputs and metrics:
+
+    pending -> running -> done
+                       -> failed (retried after a backoff until the
+                          attempts are used up)
+
+Workers claim the pending point of highest priority in one transaction,
+so any number of worker processes (on one machine, or on several machines
+sharing the data directory through a filesystem with working locks) pull
+from the same manifest. If a sweep is killed, rerunning it resumes where
+it stopped: done points are skipped, and points left running by a dead
+worker of this host go back to pending. A point is run again when the
+parameters it was added with change (e.g. a longer end time).
+
+    python3 manifest.py status data/manifest_sample.sqlite
+    python3 manifest.py reset data/manifest_sample.sqlite --failed
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+from meshgen import mesh_tag
+
+
+# Attempts per point before it stays failed
+MAX_ATTEMPTS = 3
+
+# Delay before the first retry of a failed point, doubled on each attempt
+RETRY_BACKOFF = 30.0
+
+# Upper bound on the retry delay
+MAX_BACKOFF = 3600.0
+
+STATES = ('pending', 'running', 'done', 'failed')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL,
+    Re TEXT NOT NULL,
+    U TEXT NOT NULL,
+    params TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    started REAL,
+    finished REAL,
+    error TEXT,
+    outputs TEXT,
+    metrics TEXT
+)
+"""
+
+
+def manifest_path(config_file):
+    """Return the default manifest of a sweep file."""
+    stem = os.path.splitext(os.path.basename(config_file))[0]
+    return os.path.join('data', f'manifest_{stem}.sqlite')
+
+
+def run_name(Re, velocity, mesh=None):
+    """Name the run of a point, e.g. 'Re100_U1.0', tagged with its mesh if generated."""
+    name = f'Re{Re}_U{velocity}'
+    return f'{name}_{mesh_tag(mesh)}' if mesh else name
+
+
+def worker_id():
+    """Identify this process as host:pid."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _alive(pid):
+    """Return True if a process of this host with the given pid exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Manifest:
+    """SQLite table of sweep points and their states.
+
+    Every method runs in its own transaction, so a manifest can be used
+    from several processes at once (each opening its own Manifest).
+
+    Args:
+        path: Database file, created if missing
+        max_attempts: Attempts per point before it stays failed
+        backoff: Delay before the first retry of a failed point (s)
+    """
+
+    def __init__(self, path, max_attempts=MAX_ATTEMPTS, backoff=RETRY_BACKOFF):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _transaction(self):
+        """Start a write transaction, locking out other writers."""
+        self.db.execute('BEGIN IMMEDIATE')
+
+    def _commit(self, ok=True):
+        self.db.execute('COMMIT' if ok else 'ROLLBACK')
+
+    def add(self, points, params):
+        """Add sweep points, keeping the state of known unchanged points.
+
+        A known point whose parameters differ, or a done point whose data
+        directory has disappeared, is reset to pending.
+
+        Args:
+            points: List of (velocity, Re, priority, mesh) tuples, in run
+                order; mesh is a dict of mesh parameters (see meshgen), or
+                None for the template mesh
+            params: JSON-serializable parameters shared by the points
+
+        Returns:
+            int: Number of points that are new or were reset
+        """
+        changed = 0
+        self._transaction()
+        try:
+            for velocity, Re, priority, mesh in points:
+                name = run_name(Re, velocity, mesh)
+                text = json.dumps(dict(params, mesh=mesh) if mesh else params,
+                                  sort_keys=True)
+                row = self.db.execute('SELECT params, state, outputs FROM points '
+                                      'WHERE name = ?', (name,)).fetchone()
+                if row is None:
+                    self.db.execute(
+                        'INSERT INTO points (name, Re, U, params, priority) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        (name, json.dumps(Re), json.dumps(velocity), text, priority))
+                    changed += 1
+                elif row['params'] != text or (
+                        row['state'] == 'done' and not os.path.isdir(
+                            json.loads(row['outputs'] or '{}').get('data', ''))):
+                    self.db.execute(
+                        "UPDATE points SET params = ?, priority = ?, state = 'pending', "
+                        'attempts = 0, not_before = 0, error = NULL WHERE name = ?',
+                        (text, priority, name))
+                    changed += 1
+                else:
+                    self.db.execute('UPDATE points SET priority = ? WHERE name = ?',
+                                    (priority, name))
+        except Exception:
+            self._commit(False)
+            raise
+        self._commit()
+        return changed
+
+    def recover(self):
+        """Return points left running by dead workers of this host to pending.
+
+        The interrupted attempt is not counted.
+
+        Returns:
+            int: Number of recovered points
+        """
+        host = socket.gethostname()
+        recovered = 0
+        self._transaction()
+        try:
+            rows = self.db.execute(
+                "SELECT id, worker FROM points WHERE state = 'running'").fetchall()
+            for row in rows:
+                worker_host, _, pid = (row['worker'] or '').rpartition(':')
+                if worker_host == host and pid.isdigit() and not _alive(int(pid)):
+                    self.db.execute(
+                        "UPDATE points SET state = 'pending', worker = NULL, "
+                        'attempts = MAX(attempts - 1, 0) WHERE id = ?', (row['id'],))
+                    recovered += 1
+        except Exception:
+            self._commit(False)
+            raise
+        self._commit()
+        return recovered
+
+    def claim(self, worker=None):
+        """Mark the next runnable point as running and return it.
+
+        Points are taken by priority (highest first), then in the order they
+        were added. Failed points with attempts left become runnable once
+        their backoff has passed.
+
+        Args:
+            worker: Worker id stored with the point, default host:pid
+
+        Returns:
+            dict or None: id, name, Re, U, mesh and attempts of the point, or
+                None if nothing is runnable now
+        """
+        now = time.time()
+        self._transaction()
+        try:
+            row = self.db.execute(
+                "SELECT * FROM points WHERE state IN ('pending', 'failed') "
+                'AND attempts < ? AND not_before <= ? ORDER BY priority DESC, id LIMIT 1',
+                (self.max_attempts, now)).fetchone()
+            if row is not None:
+                self.db.execute(
+                    "UPDATE points SET state = 'running', attempts = attempts + 1, "
+                    'worker = ?, started = ?, finished = NULL WHERE id = ?',
+                    (worker or worker_id(), now, row['id']))
+        except Exception:
+            self._commit(False)
+            raise
+        self._commit()
+        if row is None:
+            return None
+        return {'id': row['id'], 'name': row['name'], 'Re': json.loads(row['Re']),
+                'U': json.loads(row['U']), 'mesh': json.loads(row['params']).get('mesh'),
+                'attempts': row['attempts'] + 1}
+
+    def finish(self, point_id, success, outputs=None, metrics=None, error=None):
+        """Record the outcome of a claimed point.
+
+        A failed point is retried after backoff * 2 ** (attempts - 1)
+        seconds, capped at MAX_BACKOFF, while it has attempts left.
+
+        Args:
+            point_id: id returned by claim
+            success: Whether the run completed
+            outputs: dict of output paths
+            metrics: Run metrics record
+            error: Error message of a failed run
+        """
+        now = time.time()
+        self._transaction()
+        try:
+            attempts = self.db.execute('SELECT attempts FROM points WHERE id = ?',
+                                       (point_id,)).fetchone()['attempts']
+            delay = min(self.backoff * 2 ** max(attempts - 1, 0), MAX_BACKOFF)
+            self.db.execute(
+                'UPDATE points SET state = ?, finished = ?, not_before = ?, error = ?, '
+                'outputs = ?, metrics = ? WHERE id = ?',
+                ('done' if success else 'failed', now, 0 if success else now + delay,
+                 None if success else error, json.dumps(outputs or {}),
+                 json.dumps(metrics) if metrics is not None else None, point_id))
+        except Exception:
+            self._commit(False)
+            raise
+        self._commit()
+
+    def next_retry(self):
+        """Return the seconds until a waiting failed point becomes runnable.
+
+        Returns:
+            float or None: 0 if a point is runnable now, None if no point
+                will become runnable
+        """
+        row = self.db.execute(
+            "SELECT MIN(not_before) FROM points WHERE state IN ('pending', 'failed') "
+            'AND attempts < ?', (self.max_attempts,)).fetchone()
+        if row[0] is None:
+            return None
+        return max(row[0] - time.time(), 0.0)
+
+    def reset(self, states=('failed',)):
+        """Return points in the given states to pending with no attempts.
+
+        Returns:
+            int: Number of reset points
+        """
+        marks = ','.join('?' * len(states))
+        self._transaction()
+        cursor = self.db.execute(
+            "UPDATE points SET state = 'pending', attempts = 0, not_before = 0, "
+            f'error = NULL, worker = NULL WHERE state IN ({marks})', tuple(states))
+        self._commit()
+        return cursor.rowcount
+
+    def counts(self):
+        """Return the number of points per state."""
+        counts = dict.fromkeys(STATES, 0)
+        for state, n in self.db.execute('SELECT state, COUNT(*) FROM points GROUP BY state'):
+            counts[state] = n
+        return counts
+
+    def points(self):
+        """Return all points as dicts, in claim order."""
+        rows = self.db.execute('SELECT * FROM points ORDER BY priority DESC, id').fetchall()
+        return [dict(row) for row in rows]
+
+
+def print_status(manifest):
+    """Print the state counts and the points that are not done."""
+    counts = manifest.counts()
+    print(', '.join(f"{n} {state}" for state, n in counts.items()))
+    for point in manifest.points():
+        if point['state'] == 'done':
+            continue
+        line = f"  {point['name']:<24} {point['state']:<8} attempts {point['attempts']}"
+        if point['state'] == 'running':
+            line += f" on {point['worker']}"
+        if point['error']:
+            line += f" ({point['error']})"
+        print(line)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Sweep manifest tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    status_parser = subparsers.add_parser('status', help='Show the state of the points')
+    status_parser.add_argument('manifest', help='Manifest database')
+    reset_parser = subparsers.add_parser('reset', help='Return points to pending')
+    reset_parser.add_argument('manifest', help='Manifest database')
+    reset_parser.add_argument('--failed', action='store_true', help='Reset failed points')
+    reset_parser.add_argument('--running', action='store_true',
+                              help='Reset running points (only if their workers are gone)')
+    reset_parser.add_argument('--done', action='store_true', help='Reset done points')
+
+    args = parser.parse_args()
+    if not os.path.exists(args.manifest):
+        raise SystemExit(f"No manifest at {args.manifest}")
+    manifest = Manifest(args.manifest)
+    if args.command == 'reset':
+        states = [state for state in ('failed', 'running', 'done') if getattr(args, state)]
+        print(f"Reset {manifest.reset(states or ['failed'])} points")
+    print_status(manifest)
@@ -0,0 +1,468 @@
+"""Generate cylinder meshes from geometry parameters and cache them.
+
+A mesh is described by a few geometry parameters (cylinder diameter,
+domain extent, refinement level, ...; see DEFAULT_GEOMETRY) and built on
+demand with one of two generators:
+
+    gmsh       the layout of circle.geo (triangles around the cylinder,
+               extruded to one layer of prisms), converted with gmshToFoam
+    blockMesh  a structured O-grid around the cylinder inside a block
+               layout filling the rest of the domain
+
+Both produce the patches of the template case (In, Out, Top, Bottom,
+Circle and the empty FrontBack), so the template's initial conditions
+apply unchanged. Each refinement level halves the cell sizes in the plane.
+
+Built meshes are stored in a content-addressed cache keyed by a hash of
+the geometry parameters, so a mesh is generated once and shared read-only
+by every run that uses it:
+
+    cache/polymesh/<key>/
+    ├── geometry.json       # parameters and cell count
+    └── constant/polyMesh/  # read-only mesh files
+
+An entry is a case directory, so it is also parsed once into the .npz
+mesh cache of foam_mesh when it is built.
+
+    python3 meshgen.py build --diameter 1.5 --refinement 1
+    python3 meshgen.py list
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import stat
+import subprocess
+import tempfile
+from foam_dict import FoamDict, Raw, write_atomic
+from foam_mesh import load_mesh
+
+
+# Directory holding generated meshes, relative to the working directory
+GENERATED_MESH_DIR = os.path.join('cache', 'polymesh')
+
+# Geometry of the template mesh (circle.geo); sizes in metres
+DEFAULT_GEOMETRY = {
+    'diameter': 1.0,        # cylinder diameter
+    'upstream': 2.0,        # distance from the inlet to the cylinder centre
+    'length': 15.0,         # domain length (x)
+    'height': 10.0,         # domain height (y); the cylinder is centred in y
+    'depth': 1.0,           # extrusion depth (z), one cell
+    'cell_size': 1.0,       # cell size at the domain boundary
+    'wall_cell_size': 0.1,  # cell size on the cylinder
+    'refinement': 0,        # each level halves both cell sizes
+    'generator': 'gmsh',
+}
+
+GENERATORS = ('gmsh', 'blockMesh')
+
+# Bumped when the generated meshes change for the same parameters
+MESH_VERSION = 1
+
+GEOMETRY_FILE = 'geometry.json'
+
+# Patch types of the template mesh; gmshToFoam makes every patch a 'patch'
+PATCH_TYPES = {'FrontBack': 'empty', 'Top': 'wall', 'Bottom': 'wall', 'Circle': 'wall'}
+
+
+def geometry(params=None):
+    """Complete mesh parameters with the defaults and check them.
+
+    Args:
+        params: dict overriding entries of DEFAULT_GEOMETRY, or None
+
+    Returns:
+        dict: Full, normalized geometry
+
+    Raises:
+        ValueError: On unknown parameters or an impossible geometry
+    """
+    params = params or {}
+    unknown = set(params) - set(DEFAULT_GEOMETRY)
+    if unknown:
+        raise ValueError(f"Unknown mesh parameters: {', '.join(sorted(unknown))}")
+    geom = dict(DEFAULT_GEOMETRY, **params)
+    for key, value in geom.items():
+        if key == 'generator':
+            if value not in GENERATORS:
+                raise ValueError(f"Mesh generator must be one of {', '.join(GENERATORS)}")
+        elif key == 'refinement':
+            if int(value) != value or value < 0:
+                raise ValueError("Mesh refinement must be a non-negative integer")
+            geom[key] = int(value)
+        else:
+            geom[key] = float(value)
+            if geom[key] <= 0:
+                raise ValueError(f"Mesh parameter '{key}' must be positive")
+    radius = geom['diameter'] / 2
+    if (geom['upstream'] <= radius or geom['length'] - geom['upstream'] <= radius
+            or geom['height'] <= geom['diameter']):
+        raise ValueError("The cylinder does not fit inside the domain")
+    return geom
+
+
+def mesh_key(geom):
+    """Return the cache key (hex digest) of a complete geometry."""
+    text = json.dumps({'version': MESH_VERSION, **geom}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def mesh_tag(params):
+    """Return a short label of mesh parameters for run names, e.g. 'M1a2b3c4d'."""
+    return 'M' + mesh_key(geometry(params))[:8]
+
+
+def cell_sizes(geom):
+    """Return the (boundary, cylinder) cell sizes at the geometry's refinement."""
+    scale = 0.5 ** geom['refinement']
+    return geom['cell_size'] * scale, geom['wall_cell_size'] * scale
+
+
+def geo_script(geom):
+    """Write the gmsh geometry of a mesh, following circle.geo.
+
+    Args:
+        geom: Complete geometry (see geometry)
+
+    Returns:
+        str: Contents of a .geo file
+    """
+    far, wall = cell_sizes(geom)
+    length, height, r = geom['length'], geom['height'], geom['diameter'] / 2
+    x, y = geom['upstream'], geom['height'] / 2
+    return f"""// Generated by meshgen.py
+Point(1) = {{0, 0, 0, {far!r}}};
+Point(2) = {{{length!r}, {height!r}, 0, {far!r}}};
+Point(3) = {{{length!r}, 0, 0, {far!r}}};
+Point(4) = {{0, {height!r}, 0, {far!r}}};
+Line(1) = {{1, 3}};
+Line(2) = {{3, 2}};
+Line(3) = {{2, 4}};
+Line(4) = {{4, 1}};
+Point(5) = {{{x!r}, {y!r}, 0, {wall!r}}};
+Point(6) = {{{x!r}, {y - r!r}, 0, {wall!r}}};
+Point(7) = {{{x!r}, {y + r!r}, 0, {wall!r}}};
+Point(8) = {{{x + r!r}, {y!r}, 0, {wall!r}}};
+Point(9) = {{{x - r!r}, {y!r}, 0, {wall!r}}};
+Circle(5) = {{6, 5, 9}};
+Circle(6) = {{9, 5, 7}};
+Circle(7) = {{7, 5, 8}};
+Circle(8) = {{8, 5, 6}};
+Curve Loop(1) = {{3, 4, 1, 2}};
+Curve Loop(2) = {{7, 8, 5, 6}};
+Plane Surface(1) = {{1, 2}};
+out[] = Extrude {{0, 0, {geom['depth']!r}}} {{
+  Surface{{1}};
+  Layers{{1}};
+  Recombine;
+}};
+// out[]: top surface, volume, then one side surface per curve of the loops
+Physical Surface("In") = {{out[3]}};
+Physical Surface("Out") = {{out[5]}};
+Physical Surface("Bottom") = {{out[4]}};
+Physical Surface("Top") = {{out[2]}};
+Physical Surface("Circle") = {{out[6], out[7], out[8], out[9]}};
+Physical Surface("FrontBack") = {{1, out[0]}};
+Physical Volume("Volume") = {{out[1]}};
+"""
+
+
+def _graded_cells(length, first, last):
+    """Return the cell count and expansion ratio of a graded block edge."""
+    return max(1, round(2 * length / (first + last))), last / first
+
+
+def block_layout(geom):
+    """Lay out the blocks of the O-grid mesh.
+
+    A square box of half-width b around the cylinder is split into four
+    blocks between its sides and the cylinder arcs; eight more blocks on
+    the 4 x 4 grid of lines x = 0, xc - b, xc + b, length and
+    y = 0, yc - b, yc + b, height fill the rest of the domain. Cells grow
+    from the cylinder cell size to the boundary cell size.
+
+    Args:
+        geom: Complete geometry (see geometry)
+
+    Returns:
+        dict: 'vertices' (x, y) of one layer (grid points j * 4 + i, then
+            the cylinder points at 225, 315, 45 and 135 degrees), 'blocks'
+            as (vertex ids, cells, grading), 'arcs' as (start, end, mid
+            point) and 'patches' as name -> list of (block, face)
+    """
+    far, wall = cell_sizes(geom)
+    r = geom['diameter'] / 2
+    xc, yc = geom['upstream'], geom['height'] / 2
+    b = min(2 * geom['diameter'], 0.8 * min(xc, yc, geom['length'] - xc))
+    if b < 1.2 * r:
+        raise ValueError("The cylinder is too close to the domain boundary for blockMesh")
+    xs = [0.0, xc - b, xc + b, geom['length']]
+    ys = [0.0, yc - b, yc + b, geom['height']]
+    vertices = [(x, y) for y in ys for x in xs]
+    for angle in (225, 315, 45, 135):
+        vertices.append((xc + r * math.cos(math.radians(angle)),
+                         yc + r * math.sin(math.radians(angle))))
+
+    n_t = max(2, math.ceil(math.pi * r / 2 / wall))
+    box = 2 * b / n_t
+    n_r, g_r = _graded_cells(b * (1 + math.sqrt(2)) / 2 - r, box, wall)
+    n_x0, g_x0 = _graded_cells(xs[1], far, box)
+    n_x2, g_x2 = _graded_cells(xs[3] - xs[2], box, far)
+    n_y0, g_y0 = _graded_cells(ys[1], far, box)
+    n_y2, g_y2 = _graded_cells(ys[3] - ys[2], box, far)
+    columns = [(n_x0, g_x0), (n_t, 1.0), (n_x2, g_x2)]
+    rows = [(n_y0, g_y0), (n_t, 1.0), (n_y2, g_y2)]
+
+    blocks = []
+    patches = {'In': [], 'Out': [], 'Bottom': [], 'Top': [], 'Circle': []}
+    for j in range(3):
+        for i in range(3):
+            if i == j == 1:
+                continue
+            ids = [j * 4 + i, j * 4 + i + 1, (j + 1) * 4 + i + 1, (j + 1) * 4 + i]
+            blocks.append((ids, (columns[i][0], rows[j][0]), (columns[i][1], rows[j][1])))
+            block = len(blocks) - 1
+            if i == 0:
+                patches['In'].append((block, 'x-'))
+            if i == 2:
+                patches['Out'].append((block, 'x+'))
+            if j == 0:
+                patches['Bottom'].append((block, 'y-'))
+            if j == 2:
+                patches['Top'].append((block, 'y+'))
+    # Box corners and cylinder points, counter-clockwise from south-west
+    corners = [5, 6, 10, 9]
+    arcs = []
+    for k in range(4):
+        ids = [corners[k], corners[(k + 1) % 4], 16 + (k + 1) % 4, 16 + k]
+        blocks.append((ids, (n_t, n_r), (1.0, g_r)))
+        patches['Circle'].append((len(blocks) - 1, 'y+'))
+        angle = math.radians(270 + 90 * k)
+        arcs.append((16 + k, 16 + (k + 1) % 4,
+                     (xc + r * math.cos(angle), yc + r * math.sin(angle))))
+    return {'vertices': vertices, 'blocks': blocks, 'arcs': arcs, 'patches': patches}
+
+
+# Vertex order of the hex faces (outward normals), as in the cavity blockMeshDict
+_HEX_FACES = {'x-': (0, 4, 7, 3), 'x+': (1, 2, 6, 5), 'y-': (0, 1, 5, 4),
+              'y+': (3, 7, 6, 2)}
+
+
+def block_mesh_dict(geom, template_text):
+    """Write the blockMeshDict of the O-grid mesh.
+
+    Args:
+        geom: Complete geometry with generator 'blockMesh'
+        template_text: An existing blockMeshDict providing the header
+
+    Returns:
+        str: Contents of system/blockMeshDict
+    """
+    layout = block_layout(geom)
+    n = len(layout['vertices'])
+    depth = geom['depth']
+
+    def fmt(value):
+        return f'{value:.10g}'
+
+    vertices = [f'    ({fmt(x)} {fmt(y)} {fmt(z)})'
+                for z in (0.0, depth) for x, y in layout['vertices']]
+    hexes = []
+    for ids, cells, grading in layout['blocks']:
+        ids = ids + [v + n for v in ids]
+        hexes.append(f"    hex ({' '.join(map(str, ids))}) ({cells[0]} {cells[1]} 1) "
+                     f"simpleGrading ({fmt(grading[0])} {fmt(grading[1])} 1)")
+    edges = [f'    arc {start + offset} {end + offset} ({fmt(x)} {fmt(y)} {fmt(z)})'
+             for offset, z in ((0, 0.0), (n, depth))
+             for start, end, (x, y) in layout['arcs']]
+    boundary = []
+    for name, faces in layout['patches'].items():
+        boundary.append(f'    {name}\n    {{\n'
+                        f"        type {PATCH_TYPES.get(name, 'patch')};\n"
+                        '        faces\n        (\n')
+        for block, side in faces:
+            ids = layout['blocks'][block][0]
+            ids = ids + [v + n for v in ids]
+            face = ' '.join(str(ids[k]) for k in _HEX_FACES[side])
+            boundary[-1] += f'            ({face})\n'
+        boundary[-1] += '        );\n    }'
+
+    def block_list(lines):
+        return Raw('(\n' + '\n'.join(lines) + '\n)')
+
+    d = FoamDict(template_text)
+    d.update({'scale': 1, 'vertices': block_list(vertices), 'blocks': block_list(hexes),
+              'edges': block_list(edges), 'boundary': block_list(boundary),
+              'defaultPatch': {'name': 'FrontBack', 'type': 'empty'}})
+    return d.text
+
+
+def set_patch_types(boundary_path, types=PATCH_TYPES):
+    """Set the type of patches in a polyMesh boundary file.
+
+    Args:
+        boundary_path: Path to constant/polyMesh/boundary
+        types: dict of patch name -> type
+    """
+    with open(boundary_path, 'r') as f:
+        text = f.read()
+    for name, patch_type in types.items():
+        text = re.sub(rf'(\b{name}\s*\{{[^}}]*?\btype\s+)\w+', rf'\g<1>{patch_type}', text)
+        # gmshToFoam also records the type as physicalType
+        text = re.sub(rf'(\b{name}\s*\{{[^}}]*?\bphysicalType\s+)\w+',
+                      rf'\g<1>{patch_type}', text)
+    write_atomic(boundary_path, text)
+
+
+def _run(cmd, case_dir):
+    """Run a meshing command in case_dir, raising RuntimeError on failure."""
+    try:
+        result = subprocess.run(cmd, cwd=case_dir, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True)
+    except FileNotFoundError:
+        raise RuntimeError(f"{cmd[0]} not found; it is needed to generate meshes") from None
+    if result.returncode != 0:
+        tail = '\n'.join(result.stdout.splitlines()[-20:])
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{tail}")
+
+
+def generate_mesh(geom, case_dir, template_dir='flow_cylinder'):
+    """Build the polyMesh of a geometry in a scratch case directory.
+
+    Args:
+        geom: Complete geometry (see geometry)
+        case_dir: Empty directory receiving system/ and constant/polyMesh
+        template_dir: Case providing controlDict and blockMeshDict headers
+    """
+    system = os.path.join(case_dir, 'system')
+    os.makedirs(system, exist_ok=True)
+    os.makedirs(os.path.join(case_dir, 'constant'), exist_ok=True)
+    shutil.copy(os.path.join(template_dir, 'system', 'controlDict'), system)
+    if geom['generator'] == 'gmsh':
+        with open(os.path.join(case_dir, 'mesh.geo'), 'w') as f:
+            f.write(geo_script(geom))
+        _run(['gmsh', '-3', '-format', 'msh2', '-o', 'mesh.msh', 'mesh.geo'], case_dir)
+        _run(['gmshToFoam', 'mesh.msh'], case_dir)
+        set_patch_types(os.path.join(case_dir, 'constant', 'polyMesh', 'boundary'))
+    else:
+        with open(os.path.join(template_dir, 'system', 'blockMeshDict'), 'r') as f:
+            template_text = f.read()
+        with open(os.path.join(system, 'blockMeshDict'), 'w') as f:
+            f.write(block_mesh_dict(geom, template_text))
+        _run(['blockMesh'], case_dir)
+
+
+def _make_read_only(path):
+    """Remove write permission from every file below path."""
+    for root, _, names in os.walk(path):
+        for name in names:
+            file_path = os.path.join(root, name)
+            mode = os.stat(file_path).st_mode
+            os.chmod(file_path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def ensure_mesh(params=None, template_dir='flow_cylinder', cache_dir=GENERATED_MESH_DIR):
+    """Return the cached mesh of a geometry, generating it if needed.
+
+    The mesh is built in a private directory and renamed into the cache
+    when complete, so concurrent runs never see a partial mesh; if two
+    processes build the same mesh at once, the first to finish wins.
+
+    Args:
+        params: Mesh parameters (see DEFAULT_GEOMETRY), or None for the
+            defaults
+        template_dir: Case providing the controlDict used while meshing
+        cache_dir: Directory of generated meshes
+
+    Returns:
+        str: Cache entry, a case directory holding constant/polyMesh
+    """
+    geom = geometry(params)
+    entry = os.path.join(cache_dir, mesh_key(geom))
+    if os.path.isdir(entry):
+        return entry
+
+    os.makedirs(cache_dir, exist_ok=True)
+    build = tempfile.mkdtemp(prefix='.build-', dir=cache_dir)
+    try:
+        print(f"Generating {geom['generator']} mesh (D={geom['diameter']}, "
+              f"{geom['length']}x{geom['height']}, refinement {geom['refinement']})")
+        generate_mesh(geom, build, template_dir)
+        mesh = load_mesh(build)
+        info = dict(geom, n_cells=mesh.n_cells, mesh_hash=mesh.hash)
+        with open(os.path.join(build, GEOMETRY_FILE), 'w') as f:
+            json.dump(info, f, indent=2)
+        # Keep only the mesh; the scratch case files are not needed by runs
+        for name in os.listdir(build):
+            path = os.path.join(build, name)
+            if name == 'system' or name.startswith('mesh.'):
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+        _make_read_only(os.path.join(build, 'constant'))
+        os.chmod(build, 0o755)
+        try:
+            os.rename(build, entry)
+        except OSError:
+            if not os.path.isdir(entry):
+                raise
+            # Built concurrently by another process
+        else:
+            print(f"Mesh {os.path.basename(entry)[:8]}: {mesh.n_cells} cells")
+    finally:
+        if os.path.exists(build):
+            _make_writable(build)
+            shutil.rmtree(build)
+    return entry
+
+
+def _make_writable(path):
+    """Restore write permission on the files below path (before removal)."""
+    for root, _, names in os.walk(path):
+        for name in names:
+            file_path = os.path.join(root, name)
+            os.chmod(file_path, os.stat(file_path).st_mode | stat.S_IWUSR)
+
+
+def list_meshes(cache_dir=GENERATED_MESH_DIR):
+    """Return the geometry records of the cached meshes."""
+    meshes = []
+    if not os.path.isdir(cache_dir):
+        return meshes
+    for name in sorted(os.listdir(cache_dir)):
+        path = os.path.join(cache_dir, name, GEOMETRY_FILE)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                meshes.append(dict(json.load(f), key=name))
+    return meshes
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generated mesh tools')
+    parser.add_argument('--cache-dir', type=str, default=GENERATED_MESH_DIR,
+                        help='Directory of generated meshes')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='Generate a mesh into the cache')
+    for key, value in DEFAULT_GEOMETRY.items():
+        if key == 'generator':
+            build_parser.add_argument('--generator', choices=GENERATORS, default=value,
+                                      help='Mesh generator')
+        else:
+            build_parser.add_argument(f"--{key.replace('_', '-')}", type=type(value),
+                                      default=value, help=f'Default: {value}')
+    build_parser.add_argument('--template', type=str, default='flow_cylinder',
+                              help='Case providing the controlDict used while meshing')
+    subparsers.add_parser('list', help='List the cached meshes')
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        params = {key: getattr(args, key) for key in DEFAULT_GEOMETRY}
+        print(ensure_mesh(params, args.template, args.cache_dir))
+    else:
+        for mesh in list_meshes(args.cache_dir):
+            print(f"{mesh['key'][:8]}  {mesh['generator']:<9} D={mesh['diameter']:<6g} "
+                  f"{mesh['length']:g}x{mesh['height']:g}  refinement {mesh['refinement']}  "
+                  f"{mesh['n_cells']} cells")
@@ -0,0 +1,332 @@
+"""Per-run timing, resource and solver log metrics.
+
+Every run appends one JSON line to a metrics file (data/metrics.jsonl by
+default) with the run parameters, one entry per stage (simulate, extract,
+render) and a summary of the solver log:
+
+    {"run": "Re100_U1.0", "Re": 100, "U": 1.0, "status": "ok",
+     "stages": [{"stage": "simulate", "wall_s": 812.4, "cpu_s": 3.1,
+                 "child_cpu_s": 805.0, "max_rss_mb": 180.2,
+                 "child_max_rss_mb": 95.4}, ...],
+     "solver": {"steps": 5000, "execution_time_s": 801.2, ...}}
+
+CPU times are split between this process (cpu_s, e.g. extraction) and
+the child processes waited for during the stage (child_cpu_s: solver,
+pvbatch, ffmpeg). max_rss_mb is the peak RSS of this process during the
+stage: the kernel's high-water mark is reset through /proc/self/clear_refs
+when the stage starts. Where that is not possible (not Linux, or no
+permission), the lifetime peak of the process is recorded instead, as
+process_max_rss_mb. child_max_rss_mb is always a lifetime value, the
+peak of the largest child process waited for so far.
+
+The per-step solver metrics (Courant number, residuals and iterations)
+are written next to the extracted data as solver/log.csv.
+
+    python3 metrics.py summarize data/metrics.jsonl
+"""
+
+import json
+import os
+import re
+import resource
+import time
+from contextlib import contextmanager
+import numpy as np
+
+
+METRICS_FILE = os.path.join('data', 'metrics.jsonl')
+
+# Name of the solver log inside the case directory
+SOLVER_LOG = 'log.icoFoam'
+
+_TIME_RE = re.compile(r'^Time = (\S+)')
+_COURANT_RE = re.compile(r'^Courant Number mean: (\S+) max: (\S+)')
+_SOLVE_RE = re.compile(r'Solving for (\w+), Initial residual = (\S+), '
+                       r'Final residual = (\S+), No Iterations (\d+)')
+_EXEC_RE = re.compile(r'^ExecutionTime = (\S+) s\s+ClockTime = (\S+) s')
+
+
+def _usage():
+    """Return (self CPU s, children CPU s, self max RSS MB, children max RSS MB)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux
+    return (own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime,
+            own.ru_maxrss / 1024.0, children.ru_maxrss / 1024.0)
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS (VmHWM) of this process; return False if unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    """Return the peak RSS (VmHWM) of this process in MB, or None."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+class RunMetrics:
+    """Collect the stage metrics of one run and write them as a JSON line.
+
+    Args:
+        attrs: Run attributes stored with the record (run name, Re, U, ...)
+    """
+
+    def __init__(self, **attrs):
+        self.record = dict(attrs, stages=[])
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage; yields its entry so callers can add fields."""
+        entry = {'stage': name}
+        wall = time.perf_counter()
+        cpu, child_cpu, _, _ = _usage()
+        per_stage = _reset_peak_rss()
+        try:
+            yield entry
+        finally:
+            end_cpu, end_child_cpu, rss, child_rss = _usage()
+            peak = _peak_rss_mb() if per_stage else None
+            entry.update({
+                'wall_s': round(time.perf_counter() - wall, 6),
+                'cpu_s': round(end_cpu - cpu, 6),
+                'child_cpu_s': round(end_child_cpu - child_cpu, 6),
+            })
+            if peak is not None:
+                entry['max_rss_mb'] = round(peak, 1)
+            else:
+                entry['process_max_rss_mb'] = round(rss, 1)
+            entry['child_max_rss_mb'] = round(child_rss, 1)
+            self.record['stages'].append(entry)
+
+    def add_solver_log(self, log_path, output_dir=None):
+        """Parse a solver log into the record, and save the per-step table.
+
+        Args:
+            log_path: Path to the solver log
+            output_dir: Run output directory for solver/log.csv, or None
+        """
+        if not os.path.exists(log_path):
+            return
+        log = parse_solver_log(log_path)
+        self.record['solver'] = log_summary(log)
+        if output_dir is not None and len(log['Time']):
+            write_log_csv(log, os.path.join(output_dir, 'solver', 'log.csv'))
+
+    def write(self, path=METRICS_FILE):
+        """Append the record to a JSON lines file with a single write."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        line = (json.dumps(self.record) + '\n').encode()
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+def parse_solver_log(log_path):
+    """Parse per-step metrics from an icoFoam log.
+
+    For each solved field the initial residual of the first solve in the
+    step, the final residual of the last one and the total number of
+    iterations are kept (p is solved once per PISO corrector).
+
+    Args:
+        log_path: Path to the solver log
+
+    Returns:
+        dict: Column name -> (steps,) array, with Time, Courant_mean,
+            Courant_max, ExecutionTime, ClockTime and <field>_initial,
+            <field>_final, <field>_iters for each solved field
+    """
+    steps = []
+    step = None
+    with open(log_path, 'r', errors='replace') as f:
+        for line in f:
+            match = _TIME_RE.match(line)
+            if match:
+                step = {'Time': float(match.group(1))}
+                steps.append(step)
+                continue
+            if step is None:
+                continue
+            match = _SOLVE_RE.search(line)
+            if match:
+                field = match.group(1)
+                if f'{field}_iters' not in step:
+                    step[f'{field}_initial'] = float(match.group(2))
+                    step[f'{field}_iters'] = 0
+                step[f'{field}_final'] = float(match.group(3))
+                step[f'{field}_iters'] += int(match.group(4))
+                continue
+            match = _COURANT_RE.match(line)
+            if match:
+                step['Courant_mean'] = float(match.group(1))
+                step['Courant_max'] = float(match.group(2))
+                continue
+            match = _EXEC_RE.match(line)
+            if match:
+                step['ExecutionTime'] = float(match.group(1))
+                step['ClockTime'] = float(match.group(2))
+
+    columns = ['Time']
+    for step in steps:
+        columns += [key for key in step if key not in columns]
+    return {key: np.array([step.get(key, np.nan) for step in steps], dtype=float)
+            for key in columns}
+
+
+def log_summary(log):
+    """Reduce parsed per-step log metrics to a few numbers per run.
+
+    Args:
+        log: Result of parse_solver_log
+
+    Returns:
+        dict: steps, end time, execution and clock time, maximum Courant
+            number and, per field, mean iterations and last initial residual
+    """
+    summary = {'steps': int(len(log['Time']))}
+    if not summary['steps']:
+        return summary
+
+    def last(key):
+        values = log.get(key, np.array([]))
+        values = values[~np.isnan(values)]
+        return float(values[-1]) if len(values) else None
+
+    summary['end_time'] = float(log['Time'][-1])
+    summary['execution_time_s'] = last('ExecutionTime')
+    summary['clock_time_s'] = last('ClockTime')
+    if 'Courant_max' in log:
+        summary['courant_max'] = float(np.nanmax(log['Courant_max']))
+    for key in log:
+        if key.endswith('_iters'):
+            field = key[:-len('_iters')]
+            summary[f'{field}_mean_iters'] = round(float(np.nanmean(log[key])), 3)
+            summary[f'{field}_last_initial'] = last(f'{field}_initial')
+    return summary
+
+
+def write_log_csv(log, path):
+    """Write parsed per-step log metrics as a CSV table."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    columns = list(log)
+    table = np.column_stack([log[key] for key in columns])
+    np.savetxt(path, table, delimiter=',', header=','.join(columns), comments='',
+               fmt='%.10g')
+
+
+def load_metrics(path=METRICS_FILE):
+    """Read all records of a metrics file, skipping incomplete lines."""
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def summarize(records):
+    """Aggregate run metrics across a sweep.
+
+    Args:
+        records: Records from load_metrics
+
+    Returns:
+        dict: 'runs', 'status' (count per run status), 'stages' (per
+            stage: runs, total and mean wall time, total
+            CPU time, peak RSS), 'solver' (steps, execution time, seconds
+            per step, maximum Courant number) and 'slowest' (run names
+            with their total wall time, slowest first)
+    """
+    stages = {}
+    for record in records:
+        for entry in record.get('stages', []):
+            agg = stages.setdefault(entry['stage'], {
+                'runs': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'max_rss_mb': 0.0})
+            agg['runs'] += 1
+            agg['wall_s'] += entry['wall_s']
+            agg['cpu_s'] += entry['cpu_s'] + entry.get('child_cpu_s', 0.0)
+            agg['max_rss_mb'] = max(agg['max_rss_mb'],
+                                    entry.get('max_rss_mb', entry.get('process_max_rss_mb', 0.0)),
+                                    entry.get('child_max_rss_mb', 0.0))
+    for agg in stages.values():
+        agg['mean_wall_s'] = agg['wall_s'] / agg['runs']
+
+    solver = [r['solver'] for r in records if r.get('solver', {}).get('steps')]
+    steps = sum(s['steps'] for s in solver)
+    execution = sum(s.get('execution_time_s') or 0.0 for s in solver)
+    courant = [s['courant_max'] for s in solver if 'courant_max' in s]
+    totals = sorted(((r.get('run', '?'), sum(e['wall_s'] for e in r.get('stages', [])))
+                     for r in records if r.get('stages')), key=lambda item: -item[1])
+    status = {}
+    for record in records:
+        status[record.get('status', '?')] = status.get(record.get('status', '?'), 0) + 1
+    return {
+        'runs': len(records),
+        'status': status,
+        'stages': stages,
+        'solver': {
+            'runs': len(solver),
+            'steps': steps,
+            'execution_time_s': execution,
+            's_per_step': execution / steps if steps else None,
+            'courant_max': max(courant) if courant else None,
+        },
+        'slowest': totals,
+    }
+
+
+def print_summary(summary, top=5):
+    """Print the result of summarize as a table."""
+    counts = ', '.join(f"{n} {status}" for status, n in summary['status'].items())
+    print(f"{summary['runs']} runs ({counts})")
+    print(f"{'stage':<10} {'runs':>5} {'wall h':>9} {'mean s':>9} {'cpu h':>9} {'rss MB':>9}")
+    for name, agg in summary['stages'].items():
+        print(f"{name:<10} {agg['runs']:>5} {agg['wall_s'] / 3600:>9.3f} "
+              f"{agg['mean_wall_s']:>9.1f} {agg['cpu_s'] / 3600:>9.3f} "
+              f"{agg['max_rss_mb']:>9.1f}")
+    solver = summary['solver']
+    if solver['steps']:
+        print(f"solver: {solver['steps']} steps, {solver['execution_time_s'] / 3600:.3f} h, "
+              f"{solver['s_per_step'] * 1e3:.2f} ms/step, max Courant {solver['courant_max']}")
+    print("slowest runs:")
+    for name, wall in summary['slowest'][:top]:
+        print(f"  {name:<24} {wall:10.1f} s")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run metrics tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    summarize_parser = subparsers.add_parser('summarize',
+                                             help='Aggregate run metrics across a sweep')
+    summarize_parser.add_argument('metrics', nargs='?', default=METRICS_FILE,
+                                  help='Metrics JSON lines file')
+    summarize_parser.add_argument('--top', type=int, default=5,
+                                  help='Number of slowest runs to list')
+    summarize_parser.add_argument('--json', action='store_true',
+                                  help='Print the summary as JSON')
+
+    args = parser.parse_args()
+    summary = summarize(load_metrics(args.metrics))
+    if args.json:
+        print(json.dumps(summary, indent=1))
+    else:
+        print_summary(summary, args.top)
@@ -0,0 +1,19 @@
+"""Dimensionless-number relations shared by the run and extraction scripts."""
+
+
+def calculate_nu_from_reynolds(Re, velocity, characteristic_length=0.01):
+    """Calculate kinematic viscosity from Reynolds number.
+    
+    Args:
+        Re: Reynolds number
+        velocity: Free stream velocity (m/s)
+        characteristic_length: Cylinder diameter (m), default is 0.01m (1cm)
+    Returns:
+        nu: Kinematic viscosity (m²/s)
+    """
+    return (velocity * characteristic_length) / Re
+
+
+def calculate_drag_coefficient(force, velocity, density, area):
+    """Calculate drag coefficient."""
+    return 2 * force / (density * velocity * velocity * area)
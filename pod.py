@@ -0,0 +1,315 @@
+"""Snapshot POD of stored runs with bounded memory.
+
+Proper orthogonal decomposition of the fluctuations u'(x, t) = u - mean
+in the volume-weighted inner product (u, v) = sum_c V_c u_c . v_c gives
+the modes used for reduced-order models of the wake. Instead of loading
+all snapshots for one SVD, the decomposition is updated one stored time
+block at a time (incremental PCA; Ross et al. 2008): the current modes,
+scaled by their singular values, are stacked with the new centred block
+and a mean-shift row, and that small matrix is decomposed again. Memory
+use is set by the number of modes and the block size, not the number of
+snapshots.
+
+Two decompositions (e.g. of different sweep runs) merge the same way, so
+POD bases of a sweep can be built per run and combined.
+
+    python3 pod.py build data/run_Re100_U1.0 data/run_Re120_U1.0 --modes 20 \\
+        --out data/pod_U.npz
+    python3 pod.py merge data/pod_a.npz data/pod_b.npz --out data/pod_ab.npz
+
+The output .npz holds the modes (W-orthonormal, field-shaped), singular
+values, mean field, captured energy and, per run, the times and temporal
+coefficients.
+"""
+
+import os
+import numpy as np
+from foam_mesh import PolyMesh, load_mesh, MESH_CACHE_DIR
+from result_store import open_store
+from extract_data import STORE_DIR
+
+
+# Number of modes kept by default
+DEFAULT_MODES = 20
+
+
+class StreamingPOD:
+    """Incrementally updated POD of weighted snapshots.
+
+    Snapshots are flattened field values; weights are per entry (the
+    cell volume of each value's cell).
+
+    Args:
+        n_modes: Number of modes kept
+        weights: (N,) inner product weights of the flattened snapshots
+    """
+
+    def __init__(self, n_modes, weights):
+        self.n_modes = n_modes
+        self.sqrt_weights = np.sqrt(np.asarray(weights, dtype=float))
+        self.n_snapshots = 0
+        self.mean = np.zeros(len(self.sqrt_weights))
+        self.components = np.zeros((0, len(self.sqrt_weights)))
+        self.singular_values = np.zeros(0)
+        self.total_energy = 0.0
+
+    def _combine(self, n_other, mean_other, rows, energy_other):
+        """Fold centred rows with their own mean into the decomposition."""
+        n_total = self.n_snapshots + n_other
+        stacked = [self.singular_values[:, None] * self.components, rows]
+        shift = 0.0
+        if self.n_snapshots:
+            scale = np.sqrt(self.n_snapshots * n_other / n_total)
+            stacked.append(scale * (self.mean - mean_other)[None])
+            shift = scale ** 2 * np.sum((self.mean - mean_other) ** 2)
+        _, s, vt = np.linalg.svd(np.vstack(stacked), full_matrices=False)
+        self.components = vt[:self.n_modes]
+        self.singular_values = s[:self.n_modes]
+        self.mean = (self.n_snapshots * self.mean + n_other * mean_other) / n_total
+        self.total_energy += energy_other + shift
+        self.n_snapshots = n_total
+
+    def update(self, snapshots):
+        """Add a block of snapshots.
+
+        Args:
+            snapshots: (B, N) flattened field values
+        """
+        weighted = np.asarray(snapshots, dtype=float).reshape(len(snapshots), -1) \
+            * self.sqrt_weights
+        if not len(weighted):
+            return
+        block_mean = weighted.mean(axis=0)
+        centred = weighted - block_mean
+        self._combine(len(weighted), block_mean, centred, float(np.sum(centred ** 2)))
+
+    def merge(self, other):
+        """Combine with the decomposition of other snapshots on the same mesh."""
+        if other.n_snapshots:
+            self._combine(other.n_snapshots, other.mean,
+                          other.singular_values[:, None] * other.components,
+                          other.total_energy)
+
+    def project(self, snapshots):
+        """Return the temporal coefficients (B, n_modes) of snapshots."""
+        weighted = np.asarray(snapshots, dtype=float).reshape(len(snapshots), -1) \
+            * self.sqrt_weights
+        return (weighted - self.mean) @ self.components.T
+
+    @property
+    def modes(self):
+        """Modes in physical units, orthonormal in the weighted inner product."""
+        return self.components / self.sqrt_weights
+
+    @property
+    def mean_field(self):
+        """Mean snapshot in physical units."""
+        return self.mean / self.sqrt_weights
+
+    @property
+    def energy_fraction(self):
+        """Cumulative share of the fluctuation energy captured by the modes."""
+        if self.total_energy <= 0:
+            return np.zeros_like(self.singular_values)
+        return np.cumsum(self.singular_values ** 2) / self.total_energy
+
+
+def resolve_store(path):
+    """Accept a run directory or a store directory and return the store path."""
+    store_path = os.path.join(path, STORE_DIR)
+    return store_path if os.path.isdir(store_path) else path
+
+
+def cell_volumes(store, case_dir=None):
+    """Return the cell volumes of the mesh a store was extracted from.
+
+    The mesh is taken from case_dir if given, otherwise from the mesh cache
+    by the store's mesh hash.
+    """
+    if case_dir is not None:
+        return load_mesh(case_dir).cell_volumes
+    digest = store.metadata.get('mesh_hash')
+    path = os.path.join(MESH_CACHE_DIR, f'{digest}.npz')
+    if not digest or not os.path.exists(path):
+        raise FileNotFoundError(f"Mesh of {store.path} is not cached; pass the case directory")
+    return PolyMesh.load(path).cell_volumes
+
+
+def _scale(store, normalize):
+    """Return the factor a run's snapshots are multiplied by."""
+    return 1.0 / float(store.metadata.get('U', 1.0)) if normalize else 1.0
+
+
+def _blocks(store, field):
+    """Yield (times, values) of a stored field one time chunk at a time."""
+    times = store.times(field)
+    block = store.index['fields'][field]['chunk_times']
+    for start in range(0, len(times), block):
+        stop = min(start + block, len(times))
+        yield times[start:stop], store.read(field, slice(start, stop))
+
+
+def build_pod(paths, field='U', n_modes=DEFAULT_MODES, normalize=False, case_dir=None):
+    """Decompose the snapshots of one or more runs.
+
+    Args:
+        paths: Run or store directories; all on the same mesh
+        field: Stored field to decompose (e.g. 'U', 'p', 'vorticity')
+        n_modes: Number of modes kept
+        normalize: Divide each run's snapshots by its inlet velocity, so
+            runs at different U share dimensionless modes
+        case_dir: Case directory for the cell volumes, if the mesh is not
+            in the mesh cache
+
+    Returns:
+        StreamingPOD: Decomposition, with field and runs attributes set
+    """
+    stores = [open_store(resolve_store(path)) for path in paths]
+    hashes = {store.metadata.get('mesh_hash') for store in stores}
+    if len(hashes) > 1:
+        raise ValueError("Runs were extracted on different meshes")
+    shape = stores[0].shape(field)[1:]
+    volumes = cell_volumes(stores[0], case_dir)
+    weights = np.repeat(volumes, int(np.prod(shape[1:], dtype=int)))
+    pod = StreamingPOD(n_modes, weights)
+    for store in stores:
+        scale = _scale(store, normalize)
+        for _, values in _blocks(store, field):
+            pod.update(values.reshape(len(values), -1) * scale)
+        print(f"{store.path}: {pod.n_snapshots} snapshots so far")
+    pod.field = field
+    pod.shape = shape
+    pod.normalize = normalize
+    pod.runs = [store.path for store in stores]
+    return pod
+
+
+def temporal_coefficients(pod, path):
+    """Project the snapshots of one run onto the modes of a decomposition.
+
+    Args:
+        pod: StreamingPOD from build_pod or load_pod
+        path: Run or store directory
+
+    Returns:
+        tuple: (times (T,), coefficients (T, n_modes))
+    """
+    store = open_store(resolve_store(path))
+    scale = _scale(store, pod.normalize)
+    times, coefficients = [], []
+    for block_times, values in _blocks(store, pod.field):
+        times.append(block_times)
+        coefficients.append(pod.project(values.reshape(len(values), -1) * scale))
+    n_modes = len(pod.singular_values)
+    return (np.concatenate(times) if times else np.zeros(0),
+            np.concatenate(coefficients) if coefficients else np.zeros((0, n_modes)))
+
+
+def save_pod(pod, path):
+    """Write a decomposition and the coefficients of its runs to a .npz file.
+
+    Args:
+        pod: StreamingPOD with field, shape, normalize and runs attributes
+        path: Output file
+    """
+    arrays = {}
+    for i, run in enumerate(pod.runs):
+        arrays[f'times_{i}'], arrays[f'coefficients_{i}'] = temporal_coefficients(pod, run)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.tmp-{os.getpid()}.npz'
+    np.savez(tmp, field=pod.field, shape=np.asarray(pod.shape, dtype=int),
+             normalize=pod.normalize, runs=np.asarray(pod.runs, dtype=str),
+             n_snapshots=pod.n_snapshots, total_energy=pod.total_energy,
+             weights=pod.sqrt_weights ** 2,
+             modes=pod.modes.reshape((-1,) + tuple(pod.shape)),
+             mean=pod.mean_field.reshape(pod.shape),
+             singular_values=pod.singular_values, energy_fraction=pod.energy_fraction,
+             **arrays)
+    os.replace(tmp, path)
+
+
+def load_pod(path):
+    """Load a decomposition written by save_pod.
+
+    Returns:
+        StreamingPOD: Decomposition with field, shape, normalize, runs and
+            coefficients (run -> (times, coefficients)) attributes
+    """
+    with np.load(path) as data:
+        pod = StreamingPOD(len(data['singular_values']), data['weights'])
+        pod.n_snapshots = int(data['n_snapshots'])
+        pod.total_energy = float(data['total_energy'])
+        pod.singular_values = data['singular_values']
+        n_modes = len(pod.singular_values)
+        pod.components = data['modes'].reshape(n_modes, -1) * pod.sqrt_weights
+        pod.mean = data['mean'].ravel() * pod.sqrt_weights
+        pod.field = str(data['field'])
+        pod.shape = tuple(int(n) for n in data['shape'])
+        pod.normalize = bool(data['normalize'])
+        pod.runs = [str(run) for run in data['runs']]
+        pod.coefficients = {run: (data[f'times_{i}'], data[f'coefficients_{i}'])
+                            for i, run in enumerate(pod.runs)}
+    return pod
+
+
+def merge_pods(pods, n_modes=None):
+    """Combine decompositions of the same field, mesh and scaling.
+
+    Args:
+        pods: StreamingPOD objects from build_pod or load_pod
+        n_modes: Modes kept, default the largest of the inputs
+
+    Returns:
+        StreamingPOD: Decomposition of all their snapshots
+    """
+    first = pods[0]
+    for pod in pods[1:]:
+        if (pod.field, pod.shape, pod.normalize) != (first.field, first.shape, first.normalize) \
+                or not np.allclose(pod.sqrt_weights, first.sqrt_weights):
+            raise ValueError("Decompositions differ in field, mesh or normalization")
+    merged = StreamingPOD(n_modes or max(pod.n_modes for pod in pods),
+                          first.sqrt_weights ** 2)
+    for pod in pods:
+        merged.merge(pod)
+    merged.field, merged.shape, merged.normalize = first.field, first.shape, first.normalize
+    merged.runs = [run for pod in pods for run in pod.runs]
+    return merged
+
+
+def print_pod(pod, top=10):
+    """Print singular values and captured energy of the leading modes."""
+    print(f"POD of {pod.field}: {pod.n_snapshots} snapshots from {len(pod.runs)} run(s)")
+    for i, (s, energy) in enumerate(zip(pod.singular_values[:top],
+                                        pod.energy_fraction[:top]), 1):
+        print(f"  mode {i:3d}: sigma = {s:.6g}, cumulative energy = {energy:.4f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Snapshot POD of stored runs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='Decompose the snapshots of runs')
+    build_parser.add_argument('runs', nargs='+', help='Run (or store) directories')
+    build_parser.add_argument('--field', type=str, default='U', help='Stored field')
+    build_parser.add_argument('--modes', type=int, default=DEFAULT_MODES,
+                              help='Number of modes kept')
+    build_parser.add_argument('--normalize', action='store_true',
+                              help="Divide each run's snapshots by its inlet velocity")
+    build_parser.add_argument('--case-dir', type=str, default=None,
+                              help='Case directory for the mesh, if it is not cached')
+    build_parser.add_argument('--out', type=str, required=True, help='Output .npz file')
+    merge_parser = subparsers.add_parser('merge', help='Combine saved decompositions')
+    merge_parser.add_argument('inputs', nargs='+', help='Files written by build or merge')
+    merge_parser.add_argument('--modes', type=int, default=None,
+                              help='Number of modes kept (default: largest input)')
+    merge_parser.add_argument('--out', type=str, required=True, help='Output .npz file')
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        result = build_pod(args.runs, args.field, args.modes, args.normalize, args.case_dir)
+    else:
+        result = merge_pods([load_pod(path) for path in args.inputs], args.modes)
+    save_pod(result, args.out)
+    print_pod(result)
+    print(f"Saved {args.out}")
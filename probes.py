@@ -0,0 +1,230 @@
+"""Sample fields at probe points and along lines instead of storing every cell.
+
+A probe file lists named points and lines (in mesh coordinates):
+
+    {
+      "points": {"wake_1D": [3.0, 5.0, 0.5], "wake_3D": [5.0, 5.0, 0.5]},
+      "lines": {"centreline": {"start": [0.0, 5.0, 0.5],
+                               "end": [15.0, 5.0, 0.5], "n": 151}}
+    }
+
+The cell centres are put into a uniform grid of buckets once. Each sample
+location is resolved to an interpolation stencil (its nearest cell
+centres with inverse-distance weights), so sampling a time step only
+gathers a few values per location from the full field. Extraction with
+output format 'probes' stores these compact time series (plus Cd and Cl)
+in output_dir/probes and skips the full-field store.
+"""
+
+import json
+import numpy as np
+
+
+# Directory of the probe time series inside a run's output directory
+PROBES_DIR = 'probes'
+
+# Cells per sample location used for interpolation
+STENCIL_SIZE = 4
+
+# Average number of cells per bucket of the grid index
+CELLS_PER_BUCKET = 2.0
+
+
+class CellIndex:
+    """Uniform grid of buckets over cell centres for nearest-cell queries.
+
+    Axes along which the centres do not vary (the depth of a 2D case) get
+    a single bucket.
+
+    Args:
+        centres: (C, 3) cell centres
+        cells_per_bucket: Average number of cells per bucket
+    """
+
+    def __init__(self, centres, cells_per_bucket=CELLS_PER_BUCKET):
+        self.centres = np.asarray(centres, dtype=float)
+        self.lower = self.centres.min(axis=0)
+        extent = self.centres.max(axis=0) - self.lower
+        spread = extent > 1e-12 * max(extent.max(), 1.0)
+        n_dims = max(int(spread.sum()), 1)
+        volume = np.prod(extent[spread]) if spread.any() else 1.0
+        size = (volume * cells_per_bucket / len(self.centres)) ** (1.0 / n_dims)
+        self.shape = np.where(spread, np.maximum(np.ceil(extent / size), 1), 1).astype(int)
+        self.size = np.where(spread, extent / self.shape, 1.0)
+        self.spread = spread
+
+        bucket = self._bucket_ids(self._coords(self.centres))
+        self.order = np.argsort(bucket, kind='stable')
+        self.starts = np.searchsorted(bucket[self.order], np.arange(self.shape.prod() + 1))
+
+    def _coords(self, points):
+        """Return the integer bucket coordinates of points, clipped to the grid."""
+        coords = np.floor((points - self.lower) / self.size).astype(int)
+        return np.clip(coords, 0, self.shape - 1)
+
+    def _bucket_ids(self, coords):
+        return np.ravel_multi_index(coords.T, self.shape)
+
+    def _cells_within(self, centre, radius):
+        """Return the cells in buckets at most radius buckets from centre."""
+        lo = np.maximum(centre - radius, 0)
+        hi = np.minimum(centre + radius, self.shape - 1)
+        axes = np.meshgrid(*[np.arange(a, b + 1) for a, b in zip(lo, hi)], indexing='ij')
+        ids = self._bucket_ids(np.stack([a.ravel() for a in axes], axis=1))
+        return np.concatenate([self.order[self.starts[i]:self.starts[i + 1]] for i in ids])
+
+    def nearest(self, point, k=1):
+        """Find the k cells whose centres are closest to a point.
+
+        Args:
+            point: (3,) coordinates
+            k: Number of cells
+
+        Returns:
+            tuple: (cells (k,), distances (k,)), closest first
+        """
+        point = np.asarray(point, dtype=float)
+        k = min(k, len(self.centres))
+        centre = self._coords(point[None])[0]
+        # Distance from the point to the edge of its own bucket
+        offset = (point - self.lower) - centre * self.size
+        margin = np.min(np.minimum(offset, self.size - offset)[self.spread], initial=0.0)
+        step = self.size[self.spread].min() if self.spread.any() else 1.0
+        radius = 0
+        while True:
+            cells = self._cells_within(centre, radius)
+            whole_grid = ((centre - radius <= 0).all()
+                          and (centre + radius >= self.shape - 1).all())
+            if len(cells) >= k:
+                dist = np.linalg.norm(self.centres[cells] - point, axis=1)
+                nearest = np.argsort(dist, kind='stable')[:k]
+                # Cells outside the searched buckets are farther than this
+                covered = max(margin, 0.0) + radius * step
+                if dist[nearest[-1]] <= covered or whole_grid:
+                    return cells[nearest], dist[nearest]
+            radius += 1
+
+
+def load_probe_spec(path):
+    """Read a probe file (see the module docstring)."""
+    with open(path, 'r') as f:
+        spec = json.load(f)
+    if not spec.get('points') and not spec.get('lines'):
+        raise ValueError(f"Probe file {path} defines no points or lines")
+    return spec
+
+
+def sample_locations(spec):
+    """Expand a probe spec into sample names and coordinates.
+
+    Args:
+        spec: Probe spec with 'points' and/or 'lines'
+
+    Returns:
+        tuple: (names, (S, 3) coordinates, lines), where lines maps each
+            line name to the [start, stop) range of its samples
+    """
+    names, points, lines = [], [], {}
+    for name, point in spec.get('points', {}).items():
+        names.append(name)
+        points.append(point)
+    for name, line in spec.get('lines', {}).items():
+        start = len(names)
+        n = int(line.get('n', 100))
+        for i, s in enumerate(np.linspace(0.0, 1.0, n)):
+            names.append(f'{name}_{i}')
+            points.append((1 - s) * np.asarray(line['start'], float)
+                          + s * np.asarray(line['end'], float))
+        lines[name] = [start, start + n]
+    return names, np.array(points, dtype=float).reshape(-1, 3), lines
+
+
+def cell_radii(mesh):
+    """Return the largest centre-to-point distance of every cell."""
+    face_of = np.repeat(np.arange(mesh.n_faces), np.diff(mesh.face_offsets))
+    points = mesh.points[mesh.face_labels]
+    radii = np.zeros(mesh.n_cells)
+    owner = mesh.owner[face_of]
+    np.maximum.at(radii, owner,
+                  np.linalg.norm(points - mesh.cell_centres[owner], axis=1))
+    internal = face_of < mesh.n_internal_faces
+    neighbour = mesh.neighbour[face_of[internal]]
+    np.maximum.at(radii, neighbour,
+                  np.linalg.norm(points[internal] - mesh.cell_centres[neighbour], axis=1))
+    return radii
+
+
+def interpolation_stencils(index, points, k=STENCIL_SIZE):
+    """Resolve sample points to cells and inverse-distance weights.
+
+    A point on a cell centre takes that cell's value.
+
+    Args:
+        index: CellIndex over the cell centres
+        points: (S, 3) sample coordinates
+        k: Cells per stencil
+
+    Returns:
+        tuple: (cells (S, k), weights (S, k), distance to the nearest
+            centre (S,))
+    """
+    k = min(k, len(index.centres))
+    cells = np.empty((len(points), k), dtype=np.int64)
+    weights = np.empty((len(points), k))
+    nearest = np.empty(len(points))
+    for i, point in enumerate(points):
+        cells[i], dist = index.nearest(point, k)
+        nearest[i] = dist[0]
+        if dist[0] < 1e-12:
+            weights[i] = 0.0
+            weights[i, 0] = 1.0
+        else:
+            inverse = 1.0 / dist
+            weights[i] = inverse / inverse.sum()
+    return cells, weights, nearest
+
+
+class ProbeSet:
+    """Sample locations of a probe spec resolved on a mesh.
+
+    Args:
+        mesh: PolyMesh
+        spec: Probe spec (see load_probe_spec)
+        k: Cells per interpolation stencil
+    """
+
+    def __init__(self, mesh, spec, k=STENCIL_SIZE):
+        self.spec = spec
+        self.names, self.points, self.lines = sample_locations(spec)
+        index = CellIndex(mesh.cell_centres)
+        self.cells, self.weights, distance = interpolation_stencils(index, self.points, k)
+        outside = distance > cell_radii(mesh)[self.cells[:, 0]]
+        for name in np.asarray(self.names)[outside]:
+            print(f"Warning: probe {name} lies outside the mesh; "
+                  f"using the nearest cells")
+
+    def __len__(self):
+        return len(self.names)
+
+    def sample(self, values):
+        """Interpolate a cell field to the sample locations.
+
+        Args:
+            values: (C,) or (C, ncomp) cell values
+
+        Returns:
+            np.ndarray: (S,) or (S, ncomp) sampled values
+        """
+        gathered = np.asarray(values)[self.cells]
+        return np.einsum('sk,sk...->s...', self.weights, gathered)
+
+    def metadata(self):
+        """Describe the samples for the probe store metadata."""
+        return {
+            'probes': {
+                'names': self.names,
+                'points': self.points.tolist(),
+                'lines': self.lines,
+                'stencil_size': int(self.cells.shape[1]),
+            }
+        }
@@ -0,0 +1,359 @@
+"""Render flow videos with Matplotlib, without ParaView.
+
+The 2D mesh is taken from the faces of the case's 'empty' patch on one
+side of the extruded mesh: each cell owns exactly one of them. The faces
+are split into triangles once per run, and every frame only recolours
+that geometry:
+
+    - velocity magnitude is drawn per cell with tripcolor (flat shading,
+      like ParaView's cell data),
+    - optional vorticity contours come from per-triangle gradients of the
+      velocity averaged to the mesh points.
+
+Frames are drawn by a pool of worker processes on the Agg backend and
+piped in order as raw RGB into ffmpeg, like the ParaView renderer.
+Fields are read from the run's result store when there is one, otherwise
+from the case time directories. Streamlines are not drawn.
+"""
+
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from foam_mesh import load_mesh
+from foam_io import read_cell_addressing
+from extract_data import list_time_dirs, read_time_field
+from result_store import open_store
+
+
+# Renderers selectable from run.py and batch_run.py
+RENDERERS = ('paraview', 'matplotlib')
+
+# Empty margin around the mesh, relative to its extent
+VIEW_MARGIN = 0.02
+
+# Number of vorticity contour levels, symmetric around (and excluding) zero
+VORTICITY_LEVELS = 10
+
+DPI = 100
+
+# Per-process state of the frame workers
+_worker = {}
+
+
+def ffmpeg_command(video_path, resolution, framerate=10):
+    """Return an ffmpeg command encoding raw RGB frames from stdin.
+
+    Args:
+        video_path: Output video file
+        resolution: (width, height) of the frames
+        framerate: Frames per second of the video
+
+    Returns:
+        list: ffmpeg argument list
+    """
+    width, height = resolution
+    return ['ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}',
+            '-framerate', str(framerate), '-i', '-',
+            '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-b:v', '5000k', video_path]
+
+
+def plane_geometry(mesh):
+    """Triangulate the cells of a 2D (one cell thick) mesh.
+
+    Args:
+        mesh: PolyMesh with an 'empty' front and back patch
+
+    Returns:
+        dict: x, y (P,) point coordinates; triangles (T, 3) point indices;
+            tri_cells (T,) cell of each triangle; tri_areas (T,);
+            vertex_points and vertex_cells, the (point, cell) pairs of the
+            cell corners used to average cell values to points; n_cells
+    """
+    faces = np.concatenate([np.arange(mesh.patch_slice(name).start,
+                                      mesh.patch_slice(name).stop)
+                            for name, patch in mesh.patches.items()
+                            if patch['type'] == 'empty'])
+    # Keep the faces on the back side, one per cell
+    faces = faces[mesh.face_areas[faces, 2] < 0]
+    cells = mesh.owner[faces]
+    if len(np.unique(cells)) != mesh.n_cells:
+        raise ValueError("Mesh is not a single layer of cells between empty patches")
+
+    starts = mesh.face_offsets[faces]
+    sizes = mesh.face_offsets[faces + 1] - starts
+    corner = np.concatenate([mesh.face_labels[s:s + n] for s, n in zip(starts, sizes)])
+    used, corner = np.unique(corner, return_inverse=True)
+    corner_offsets = np.concatenate([[0], np.cumsum(sizes)])
+
+    # Fan triangulation of each face around its first corner
+    n_tris = sizes - 2
+    tri_face = np.repeat(np.arange(len(faces)), n_tris)
+    k = np.arange(n_tris.sum()) - np.repeat(np.cumsum(n_tris) - n_tris, n_tris)
+    first = corner_offsets[tri_face]
+    triangles = np.stack([corner[first], corner[first + k + 1], corner[first + k + 2]],
+                         axis=1)
+
+    x, y = mesh.points[used, 0], mesh.points[used, 1]
+    # Orient triangles counter-clockwise in the x-y plane
+    area = 0.5 * ((x[triangles[:, 1]] - x[triangles[:, 0]])
+                  * (y[triangles[:, 2]] - y[triangles[:, 0]])
+                  - (x[triangles[:, 2]] - x[triangles[:, 0]])
+                  * (y[triangles[:, 1]] - y[triangles[:, 0]]))
+    flip = area < 0
+    triangles[flip] = triangles[flip][:, [0, 2, 1]]
+    return {
+        'x': x,
+        'y': y,
+        'triangles': triangles,
+        'tri_cells': cells[tri_face],
+        'tri_areas': np.abs(area),
+        'vertex_points': corner,
+        'vertex_cells': np.repeat(cells, sizes),
+        'n_cells': mesh.n_cells,
+    }
+
+
+def point_values(geometry, cell_values):
+    """Average cell values to the mesh points."""
+    points = geometry['vertex_points']
+    n_points = len(geometry['x'])
+    counts = np.bincount(points, minlength=n_points)
+    values = cell_values[geometry['vertex_cells']]
+    if values.ndim == 1:
+        return np.bincount(points, values, minlength=n_points) / counts
+    return np.stack([np.bincount(points, values[:, k], minlength=n_points) / counts
+                     for k in range(values.shape[1])], axis=1)
+
+
+def vorticity(geometry, velocities):
+    """Return the z vorticity of a cell velocity field at the mesh points.
+
+    The velocity is averaged to the points, differentiated as a linear
+    field on each triangle and averaged back to the points, weighted by
+    triangle area.
+
+    Args:
+        geometry: Result of plane_geometry
+        velocities: (C, 3) cell velocities
+
+    Returns:
+        np.ndarray: (P,) vorticity
+    """
+    x, y, tri = geometry['x'], geometry['y'], geometry['triangles']
+    u = point_values(geometry, velocities[:, :2])
+    dx1 = x[tri[:, 1]] - x[tri[:, 0]]
+    dy1 = y[tri[:, 1]] - y[tri[:, 0]]
+    dx2 = x[tri[:, 2]] - x[tri[:, 0]]
+    dy2 = y[tri[:, 2]] - y[tri[:, 0]]
+    det = dx1 * dy2 - dx2 * dy1
+    du1 = u[tri[:, 1]] - u[tri[:, 0]]
+    du2 = u[tri[:, 2]] - u[tri[:, 0]]
+    # d(u_x)/dy and d(u_y)/dx of the linear interpolant
+    dux_dy = (dx1 * du2[:, 0] - dx2 * du1[:, 0]) / det
+    duy_dx = (du1[:, 1] * dy2 - du2[:, 1] * dy1) / det
+    omega = duy_dx - dux_dy
+
+    weights = np.repeat(geometry['tri_areas'], 3)
+    points = tri.ravel()
+    n_points = len(x)
+    return (np.bincount(points, np.repeat(omega, 3) * weights, minlength=n_points)
+            / np.bincount(points, weights, minlength=n_points))
+
+
+def view_limits(x, y, aspect):
+    """Return x and y limits showing the whole mesh at a width/height aspect."""
+    centre_x, centre_y = (x.min() + x.max()) / 2, (y.min() + y.max()) / 2
+    half_height = max(np.ptp(y), np.ptp(x) / aspect) * (0.5 + VIEW_MARGIN)
+    half_width = half_height * aspect
+    return ((centre_x - half_width, centre_x + half_width),
+            (centre_y - half_height, centre_y + half_height))
+
+
+def list_frames(source, stride=1):
+    """List the (index, time name, time) of the frames to render.
+
+    Args:
+        source: {'store': path} or {'case': case_dir, 'decomposed': bool}
+        stride: Keep every stride-th time
+
+    Returns:
+        list: Frame tuples in time order
+    """
+    if 'store' in source:
+        times = open_store(source['store']).times('U')
+        frames = [(i, None, float(t)) for i, t in enumerate(times)]
+    else:
+        directory = source['case']
+        if source.get('decomposed'):
+            directory = os.path.join(directory, 'processor0')
+        frames = [(None, name, float(name)) for name in list_time_dirs(directory)]
+    return frames[::stride]
+
+
+def _open_source(source):
+    """Open a frame source once per process."""
+    if 'store' in source:
+        return {'store': open_store(source['store'])}
+    addressing = read_cell_addressing(source['case']) if source.get('decomposed') else None
+    return {'case': source['case'], 'addressing': addressing}
+
+
+def _read_velocity(opened, frame, n_cells):
+    """Read the cell velocities of one frame."""
+    index, name, _ = frame
+    if 'store' in opened:
+        return opened['store'].read_time('U', index)
+    return read_time_field(opened['case'], name, 'U', n_cells, opened['addressing'])
+
+
+def _init_worker(geometry, source, style):
+    """Set up the figure, the triangulation and the frame source of a worker."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.colors import LinearSegmentedColormap
+    from matplotlib.figure import Figure
+    from matplotlib.tri import Triangulation
+
+    width, height = style['resolution']
+    fig = Figure(figsize=(width / DPI, height / DPI), dpi=DPI, facecolor='white')
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+
+    triangulation = Triangulation(geometry['x'], geometry['y'], geometry['triangles'])
+    cmap = LinearSegmentedColormap.from_list('velocity', ['blue', 'white', 'red'])
+    colours = ax.tripcolor(triangulation, facecolors=np.zeros(len(geometry['triangles'])),
+                           cmap=cmap, vmin=0.0, vmax=style['vmax'])
+    xlim, ylim = view_limits(geometry['x'], geometry['y'], width / height)
+    ax.set_xlim(*xlim)
+    ax.set_ylim(*ylim)
+    cax = fig.add_axes([0.88, 0.05, 0.012, 0.25])
+    colorbar = fig.colorbar(colours, cax=cax)
+    colorbar.set_label('Velocity Magnitude', fontsize=8)
+    cax.tick_params(labelsize=6)
+    label = ax.text(0.01, 0.98, '', transform=ax.transAxes, va='top', fontsize=10)
+
+    _worker.update({
+        'geometry': geometry,
+        'source': _open_source(source),
+        'style': style,
+        'figure': fig,
+        'canvas': canvas,
+        'axes': ax,
+        'triangulation': triangulation,
+        'colours': colours,
+        'label': label,
+        'contours': None,
+    })
+
+
+def _remove_contours(contours):
+    """Remove a contour set from its axes (Matplotlib before and after 3.8)."""
+    if hasattr(contours, 'remove'):
+        contours.remove()
+    else:
+        for collection in contours.collections:
+            collection.remove()
+
+
+def _render_frame(frame):
+    """Draw one frame in a worker and return it as rgb24 bytes."""
+    geometry = _worker['geometry']
+    velocities = _read_velocity(_worker['source'], frame, geometry['n_cells'])
+    speed = np.linalg.norm(velocities, axis=1)
+    _worker['colours'].set_array(speed[geometry['tri_cells']])
+    _worker['label'].set_text(f't = {frame[2]:.3f}')
+
+    levels = _worker['style']['vorticity_levels']
+    if levels is not None:
+        if _worker['contours'] is not None:
+            _remove_contours(_worker['contours'])
+        _worker['contours'] = _worker['axes'].tricontour(
+            _worker['triangulation'], vorticity(geometry, velocities), levels=levels,
+            colors='k', linewidths=0.5)
+
+    _worker['canvas'].draw()
+    rgba = np.asarray(_worker['canvas'].buffer_rgba())
+    return rgba[:, :, :3].tobytes()
+
+
+def render_video(case_dir, video_path, store_path=None, decomposed=False,
+                 resolution=(1920, 1080), stride=1, framerate=10, vorticity_contours=True,
+                 jobs=None):
+    """Render a velocity magnitude video of a run with Matplotlib.
+
+    The colour range and the vorticity levels are fixed for the whole
+    video from the last frame, when the wake is developed.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory (for the mesh, and
+            the fields when there is no store)
+        video_path: Output video file
+        store_path: Result store of the run, or None to read the case
+        decomposed: Read the processor* directories instead of a
+            reconstructed case (without a store)
+        resolution: (width, height) of the video; both must be even
+        stride: Render every stride-th time step
+        framerate: Frames per second of the video
+        vorticity_contours: Draw vorticity contour lines
+        jobs: Number of render processes, default os.cpu_count()
+
+    Returns:
+        bool: True if the video was written
+    """
+    width, height = resolution
+    if width % 2 or height % 2:
+        raise ValueError(f"Video resolution must be even, got {width}x{height}")
+    if store_path is not None and os.path.exists(store_path):
+        source = {'store': store_path}
+    else:
+        source = {'case': case_dir, 'decomposed': decomposed}
+    frames = list_frames(source, stride)
+    if not frames:
+        print("No time steps to render")
+        return False
+
+    geometry = plane_geometry(load_mesh(case_dir))
+    last = _read_velocity(_open_source(source), frames[-1], geometry['n_cells'])
+    style = {'resolution': (width, height),
+             'vmax': float(np.linalg.norm(last, axis=1).max()) or 1.0,
+             'vorticity_levels': None}
+    if vorticity_contours:
+        scale = float(np.percentile(np.abs(vorticity(geometry, last)), 99)) or 1.0
+        style['vorticity_levels'] = np.linspace(-scale, scale, VORTICITY_LEVELS)
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(frames)))
+    print(f"Rendering {len(frames)} frames with {jobs} process(es)...")
+    encoder = subprocess.Popen(ffmpeg_command(video_path, resolution, framerate),
+                               stdin=subprocess.PIPE)
+    chunksize = max(1, len(frames) // (4 * jobs))
+    try:
+        if jobs == 1:
+            _init_worker(geometry, source, style)
+            images = map(_render_frame, frames)
+            _write_frames(encoder, images)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=(geometry, source, style)) as pool:
+                _write_frames(encoder, pool.map(_render_frame, frames, chunksize=chunksize))
+    finally:
+        _worker.clear()
+        try:
+            encoder.stdin.close()
+        except BrokenPipeError:
+            pass
+        status = encoder.wait()
+    if status != 0:
+        print(f"Error creating video: ffmpeg exited with status {status}")
+        return False
+    return True
+
+
+def _write_frames(encoder, images):
+    """Pipe rendered frames into ffmpeg, stopping if it exits early."""
+    for image in images:
+        try:
+            encoder.stdin.write(image)
+        except BrokenPipeError:
+            return
@@ -0,0 +1,304 @@
+"""Chunked, compressed time x cell store for extracted simulation fields.
+
+A store is a directory with a JSON index and one file per chunk:
+
+    store/
+    ├── store.json        # metadata, field shapes, chunking and times
+    ├── U/0.0.z           # chunk (time block 0, cell block 0) of field U
+    └── p/0.0.z
+
+Each field is a (T, N) or (T, N, 3) array split into blocks of
+chunk_times x chunk_cells, so a single time slice or a single cell
+history only touches a row or a column of chunks. Chunks are zlib
+compressed, or stored as plain .npy files (memory-mappable) when
+compression is None.
+"""
+
+import json
+import os
+import zlib
+import numpy as np
+
+
+INDEX_FILE = 'store.json'
+
+# Upper bound on the in-memory time block of one field when chunk_times
+# is chosen automatically
+BUFFER_BYTES = 64 * 1024 * 1024
+MAX_CHUNK_TIMES = 64
+
+
+def _write_atomic(path, data):
+    """Write bytes to path through a temporary file and os.replace."""
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ResultStore:
+    """Append-only chunked store of per-cell fields over time.
+
+    Fields are appended one time step at a time and buffered until a block
+    of chunk_times steps is complete; only flushed blocks are listed in the
+    index, so the store on disk is always consistent.
+
+    Args:
+        path: Store directory
+        mode: 'r' to read, 'a' to create or append
+        chunk_times: Number of time steps per chunk; if None it is chosen
+            per field so a buffered time block stays below BUFFER_BYTES
+        chunk_cells: Number of cells per chunk
+        compression: 'zlib' or None
+        metadata: dict of run attributes (Re, U, nu, ...) to merge into
+            the store metadata
+    """
+
+    def __init__(self, path, mode='r', chunk_times=None, chunk_cells=4096,
+                 compression='zlib', metadata=None):
+        self.path = path
+        self.mode = mode
+        self._buffers = {}
+        index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r') as f:
+                self.index = json.load(f)
+        elif mode == 'r':
+            raise FileNotFoundError(f"No result store at {path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.index = {
+                'metadata': {},
+                'chunk_times': chunk_times,
+                'chunk_cells': chunk_cells,
+                'compression': compression,
+                'fields': {},
+            }
+        if metadata:
+            self.index['metadata'].update(metadata)
+        if mode != 'r':
+            self._save_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def metadata(self):
+        """Run attributes stored with the data."""
+        return self.index['metadata']
+
+    @property
+    def fields(self):
+        """Names of the stored fields."""
+        return list(self.index['fields'])
+
+    def times(self, field):
+        """Return the flushed times of a field as an array."""
+        return np.asarray(self.index['fields'][field]['times'])
+
+    def shape(self, field):
+        """Return the (T, N[, ncomp]) shape of the flushed part of a field."""
+        info = self.index['fields'][field]
+        return (len(info['times']), info['n_cells']) + tuple(info['tail'])
+
+    # Writing
+
+    def _save_index(self):
+        _write_atomic(os.path.join(self.path, INDEX_FILE),
+                      json.dumps(self.index, indent=1).encode())
+
+    def _chunk_path(self, field, ti, ci):
+        ext = 'z' if self.index['compression'] == 'zlib' else 'npy'
+        return os.path.join(self.path, field, f'{ti}.{ci}.{ext}')
+
+    def _write_chunk(self, field, ti, ci, block):
+        path = self._chunk_path(field, ti, ci)
+        block = np.ascontiguousarray(block, dtype='<f8')
+        if self.index['compression'] == 'zlib':
+            _write_atomic(path, zlib.compress(block.tobytes(), 1))
+        else:
+            tmp = f'{path}.tmp-{os.getpid()}.npy'
+            np.save(tmp, block)
+            os.replace(tmp, path)
+
+    def _start_field(self, field, values):
+        """Register a new field, or reload its trailing partial block."""
+        info = self.index['fields'].get(field)
+        if info is None:
+            chunk_times = self.index['chunk_times']
+            if chunk_times is None:
+                row_bytes = values.size * 8
+                chunk_times = int(np.clip(BUFFER_BYTES // row_bytes, 1, MAX_CHUNK_TIMES))
+            info = {
+                'n_cells': values.shape[0],
+                'tail': list(values.shape[1:]),
+                'chunk_times': chunk_times,
+                'chunk_cells': self.index['chunk_cells'],
+                'times': [],
+            }
+            self.index['fields'][field] = info
+            os.makedirs(os.path.join(self.path, field), exist_ok=True)
+        elif (info['n_cells'], *info['tail']) != values.shape:
+            raise ValueError(f"Field {field} has shape {(info['n_cells'], *info['tail'])}, "
+                             f"got {values.shape}")
+
+        # Continue filling a partially written last time block
+        n_flushed = len(info['times'])
+        start = n_flushed - n_flushed % info['chunk_times']
+        buffer = {'start': start, 'times': info['times'][start:], 'rows': []}
+        if start < n_flushed:
+            buffer['rows'] = list(self.read(field, slice(start, n_flushed)))
+        self._buffers[field] = buffer
+        return buffer
+
+    def append(self, field, t, values):
+        """Append the values of one field at one time.
+
+        Args:
+            field: Field name (e.g. 'U')
+            t: Simulation time
+            values: Array of shape (N,) or (N, ncomp)
+
+        Returns:
+            bool: True if a complete time block was flushed to disk
+        """
+        values = np.asarray(values, dtype=np.float64)
+        buffer = self._buffers.get(field) or self._start_field(field, values)
+        buffer['times'].append(float(t))
+        buffer['rows'].append(values)
+        if len(buffer['rows']) == self.index['fields'][field]['chunk_times']:
+            self._flush_field(field)
+            self._save_index()
+            return True
+        return False
+
+    def _flush_field(self, field):
+        """Write the buffered time block of a field, which may be partial.
+
+        A partial block stays buffered and is rewritten as it grows.
+        """
+        buffer = self._buffers[field]
+        if not buffer['rows']:
+            return
+        info = self.index['fields'][field]
+        ti = buffer['start'] // info['chunk_times']
+        block = np.stack(buffer['rows'])
+        cc = info['chunk_cells']
+        for ci, start in enumerate(range(0, info['n_cells'], cc)):
+            self._write_chunk(field, ti, ci, block[:, start:start + cc])
+        info['times'] = info['times'][:buffer['start']] + buffer['times']
+        if len(buffer['rows']) == info['chunk_times']:
+            del self._buffers[field]
+
+    def remove(self, field):
+        """Drop a field and its chunks, if it exists."""
+        self._buffers.pop(field, None)
+        self.index['fields'].pop(field, None)
+        field_dir = os.path.join(self.path, field)
+        if os.path.isdir(field_dir):
+            for name in os.listdir(field_dir):
+                os.remove(os.path.join(field_dir, name))
+        self._save_index()
+
+    def put(self, field, times, values):
+        """Write or replace a whole field at once.
+
+        Args:
+            field: Field name
+            times: (T,) simulation times
+            values: Array of shape (T, N) or (T, N, ncomp)
+        """
+        values = np.asarray(values, dtype=np.float64)
+        self.remove(field)
+        for t, row in zip(times, values):
+            self.append(field, t, row)
+        if field in self._buffers:
+            self._flush_field(field)
+        self._save_index()
+
+    def flush(self):
+        """Write all buffered data, including partial time blocks."""
+        for field in list(self._buffers):
+            self._flush_field(field)
+        self._save_index()
+
+    def close(self):
+        """Flush buffered data if the store is writable."""
+        if self.mode != 'r':
+            self.flush()
+
+    # Reading
+
+    def _read_chunk(self, field, ti, ci):
+        info = self.index['fields'][field]
+        ct = info['chunk_times']
+        cc = info['chunk_cells']
+        n_t = min(ct, len(info['times']) - ti * ct)
+        n_c = min(cc, info['n_cells'] - ci * cc)
+        path = self._chunk_path(field, ti, ci)
+        if self.index['compression'] == 'zlib':
+            with open(path, 'rb') as f:
+                raw = zlib.decompress(f.read())
+            block = np.frombuffer(raw, dtype='<f8').reshape((-1, n_c) + tuple(info['tail']))
+        else:
+            block = np.load(path, mmap_mode='r')
+        return block[:n_t]
+
+    def read(self, field, times=slice(None), cells=slice(None)):
+        """Read a block of a field, touching only the chunks it overlaps.
+
+        Args:
+            field: Field name
+            times: Time index, slice or index array
+            cells: Cell index, slice or index array
+
+        Returns:
+            np.ndarray: Values with the indexed time and cell axes
+        """
+        info = self.index['fields'][field]
+        n_times = len(info['times'])
+        t_idx = np.arange(n_times)[times]
+        c_idx = np.arange(info['n_cells'])[cells]
+        t_flat = np.atleast_1d(t_idx)
+        c_flat = np.atleast_1d(c_idx)
+
+        ct = info['chunk_times']
+        cc = info['chunk_cells']
+        out = np.empty((len(t_flat), len(c_flat)) + tuple(info['tail']))
+        t_chunks = t_flat // ct
+        c_chunks = c_flat // cc
+        for ti in np.unique(t_chunks):
+            t_sel = np.nonzero(t_chunks == ti)[0]
+            for ci in np.unique(c_chunks):
+                c_sel = np.nonzero(c_chunks == ci)[0]
+                block = self._read_chunk(field, ti, ci)
+                out[np.ix_(t_sel, c_sel)] = block[np.ix_(t_flat[t_sel] - ti * ct,
+                                                         c_flat[c_sel] - ci * cc)]
+
+        if np.ndim(t_idx) == 0:
+            out = out[0]
+            return out[0] if np.ndim(c_idx) == 0 else out
+        return out[:, 0] if np.ndim(c_idx) == 0 else out
+
+    def read_time(self, field, index):
+        """Read all cells of a field at one time index."""
+        return self.read(field, index)
+
+    def read_cell(self, field, cell):
+        """Read the full time history of a field at one cell."""
+        return self.read(field, slice(None), cell)
+
+
+def open_store(path):
+    """Open an existing result store for reading.
+
+    Args:
+        path: Store directory
+
+    Returns:
+        ResultStore: Read-only store
+    """
+    return ResultStore(path, 'r')
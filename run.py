@@ -1,8 +1,24 @@
 """Script to run OpenFOAM simulation and create ParaView visualization."""
 
 import os
+import shutil
 import subprocess
-from extract_data import extract_simulation_data
+import tempfile
+from extract_data import extract_simulation_data, list_time_dirs, STORE_DIR
+from foam_io import processor_dirs
+from metrics import RunMetrics, METRICS_FILE, SOLVER_LOG
+from render import ffmpeg_command, render_video, RENDERERS
+from derived_fields import DERIVED_FIELDS
+from courant import resolve_time_controls, DEFAULT_COURANT, DEFAULT_SNAPSHOTS_PER_PERIOD
+from warm_start import warm_start as seed_initial_conditions, reset_initial_conditions
+from foam_dict import FoamDict, edit_dict
+from foam_mesh import load_mesh
+from forces import patch_diameter
+from physics import calculate_nu_from_reynolds
+
+
+# Name of the inlet patch in the mesh
+INLET_PATCH = 'In'
 
 
 def modify_transport_properties(transport_properties_path, nu):
@@ -10,96 +26,283 @@ def modify_transport_properties(transport_properties_path, nu):
     
     Args:
         transport_properties_path: Path to the transportProperties file
-        nu: New kinematic viscosity value
+        nu: New kinematic viscosity value; a dimensioned entry keeps its
+            dimensions
     """
-    with open(transport_properties_path, 'r') as file:
-        lines = file.readlines()
-    
-    modified_lines = []
-    for line in lines:
-        if 'nu' in line and '[' in line and ']' in line:
-            modified_lines.append(f'nu              {nu} [0 2 -1 0 0 0 0];\n')
-        else:
-            modified_lines.append(line)
-    
-    with open(transport_properties_path, 'w') as file:
-        file.writelines(modified_lines)
-
-
-def modify_control_dict(control_dict_path, end_time, delta_t):
+    edit_dict(transport_properties_path, {'nu': nu})
+
+
+def control_dict_changes(end_time, delta_t, write_format='ascii', write_compression=False,
+                         start_from='startTime', write_interval=0.1):
+    """Return the controlDict entries set for a run (see modify_control_dict)."""
+    return {
+        # Undo a 'writeNow' left by an early-stopped run
+        'stopAt': 'endTime',
+        'startFrom': start_from,
+        'endTime': end_time,
+        'deltaT': delta_t,
+        'writeControl': 'runTime',
+        'writeInterval': write_interval,
+        'writeFormat': write_format,
+        'writeCompression': 'on' if write_compression else 'off',
+    }
+
+
+def modify_control_dict(control_dict_path, end_time, delta_t,
+                        write_format='ascii', write_compression=False,
+                        start_from='startTime', write_interval=0.1):
     """Modify controlDict file with new endTime and deltaT values.
     
     Args:
         control_dict_path: Path to the controlDict file
         end_time: New end time value
         delta_t: New time step size
+        write_format: Field output format, 'ascii' or 'binary'
+        write_compression: Whether to gzip the written fields
+        start_from: 'startTime', or 'latestTime' to restart from the last
+            time directory
+        write_interval: Simulated time between written time directories
     """
-    with open(control_dict_path, 'r') as file:
-        lines = file.readlines()
-    
-    modified_lines = []
-    for line in lines:
-        if 'endTime' in line and 'stopAt' not in line:
-            modified_lines.append(f'endTime         {end_time};\n')
-        elif 'deltaT' in line:
-            modified_lines.append(f'deltaT          {delta_t};\n')
-        elif 'writeControl' in line:
-            modified_lines.append('writeControl    runTime;\n')
-        elif 'writeInterval' in line:
-            modified_lines.append('writeInterval   0.1;\n')
-        else:
-            modified_lines.append(line)
+    edit_dict(control_dict_path, control_dict_changes(
+        end_time, delta_t, write_format, write_compression, start_from, write_interval))
+
+
+def inlet_changes(velocity, patch=INLET_PATCH):
+    """Return the 0/U entries setting a uniform inlet velocity along x."""
+    return {f'boundaryField/{patch}/value': ('uniform', [float(velocity), 0, 0])}
+
+
+def set_inlet_velocity(u_path, velocity, patch=INLET_PATCH):
+    """Set the inlet velocity in an initial velocity field file.
     
-    with open(control_dict_path, 'w') as file:
-        file.writelines(modified_lines)
+    Args:
+        u_path: Path to the U field file (e.g. 0/U)
+        velocity: Inlet velocity (m/s) along x
+        patch: Name of the inlet patch
+    """
+    field = FoamDict.read(u_path)
+    if f'boundaryField/{patch}/value' not in field:
+        print(f"Warning: no '{patch}' value in {u_path}; inlet velocity not set")
+        return
+    field.update(inlet_changes(velocity, patch))
+    field.write(u_path)
 
 
-def run_openfoam_simulation(case_dir):
-    """Run OpenFOAM simulation using icoFoam from the case directory.
+def hierarchical_split(n_procs):
+    """Split n_procs into a near-square (nx ny 1) hierarchical decomposition.
+
+    The larger factor goes to x, which is the longer side of the domain.
+
+    Args:
+        n_procs: Number of subdomains
+
+    Returns:
+        tuple: (nx, ny, 1) with nx * ny == n_procs
+    """
+    ny = int(n_procs ** 0.5)
+    while n_procs % ny:
+        ny -= 1
+    return (n_procs // ny, ny, 1)
+
+
+def decompose_par_dict_changes(n_procs):
+    """Return the decomposeParDict entries of a hierarchical split."""
+    return {
+        'numberOfSubdomains': n_procs,
+        'method': 'hierarchical',
+        'coeffs/n': list(hierarchical_split(n_procs)),
+    }
+
+
+def modify_decompose_par_dict(decompose_par_dict_path, n_procs):
+    """Modify decomposeParDict for a hierarchical split into n_procs subdomains.
     
+    Args:
+        decompose_par_dict_path: Path to the decomposeParDict file
+        n_procs: Number of subdomains
+    """
+    edit_dict(decompose_par_dict_path, decompose_par_dict_changes(n_procs))
+
+
+def case_changes(end_time, delta_t, nu, velocity, write_format='ascii',
+                 write_compression=False, start_from='startTime', write_interval=0.1,
+                 n_procs=1):
+    """Collect the dictionary entries set for a run, by case file.
+    
+    Returns:
+        dict: File path relative to the case -> entry path -> value, for
+            controlDict, transportProperties, 0/U and (with n_procs > 1)
+            decomposeParDict
+    """
+    changes = {
+        os.path.join('system', 'controlDict'): control_dict_changes(
+            end_time, delta_t, write_format, write_compression, start_from, write_interval),
+        os.path.join('constant', 'transportProperties'): {'nu': nu},
+        os.path.join('0', 'U'): inlet_changes(velocity),
+    }
+    if n_procs > 1:
+        changes[os.path.join('system', 'decomposeParDict')] = \
+            decompose_par_dict_changes(n_procs)
+    return changes
+
+
+def clean_case(case_dir):
+    """Remove the results of earlier runs from a case directory.
+
+    Deletes every time directory except 0 and any processor* directories,
+    so neither the extraction nor the run cache can pick up stale output.
+
     Args:
         case_dir: Path to the OpenFOAM case directory
+    """
+    stale = [os.path.join(case_dir, t_dir) for t_dir in list_time_dirs(case_dir)
+             if t_dir != '0']
+    for path in stale + processor_dirs(case_dir):
+        shutil.rmtree(path)
+
+
+def cylinder_diameter(case_dir):
+    """Measure the cylinder diameter of a case from its mesh."""
+    return patch_diameter(load_mesh(case_dir))
+
+
+def run_parallel_simulation(case_dir, n_procs, solver_cmd=None, launcher=None,
+                            reconstruct=True, decompose_cmd=None, reconstruct_cmd=None):
+    """Run a domain-decomposed simulation with MPI.
+    
+    Runs decomposePar, then '<launcher> -np N <solver> -parallel', then
+    reconstructPar (unless reconstruct is False, in which case the
+    processor* directories are left for extract_data to read directly).
+    The output of each step goes to log.<step> in the case directory.
+    
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        n_procs: Number of MPI ranks (must match decomposeParDict)
+        solver_cmd: Solver command as an argument list, default ['icoFoam']
+        launcher: MPI launcher command as an argument list, default ['mpirun']
+        reconstruct: Whether to run reconstructPar after the solver
+        decompose_cmd: Decomposition command as an argument list, default
+            ['decomposePar', '-force']
+        reconstruct_cmd: Reconstruction command as an argument list,
+            default ['reconstructPar']
         
     Returns:
-        bool: True if simulation successful, False otherwise
+        bool: True if all steps succeeded, False otherwise
     """
+    steps = [
+        ('log.decomposePar', decompose_cmd or ['decomposePar', '-force']),
+        (SOLVER_LOG, (launcher or ['mpirun']) + ['-np', str(n_procs)]
+         + (solver_cmd or ['icoFoam']) + ['-parallel']),
+    ]
+    if reconstruct:
+        steps.append(('log.reconstructPar', reconstruct_cmd or ['reconstructPar']))
     try:
-        # Change to the case directory
-        original_dir = os.getcwd()
-        os.chdir(case_dir)
-        
-        # Run the simulation
-        subprocess.run(['icoFoam'], check=True)
-        
-        # Change back to original directory
-        os.chdir(original_dir)
+        for log_name, cmd in steps:
+            with open(os.path.join(case_dir, log_name), 'w') as log:
+                subprocess.run(cmd, cwd=case_dir, check=True, stdout=log,
+                               stderr=subprocess.STDOUT)
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error running simulation: {e}")
-        # Make sure to return to original directory even if there's an error
-        os.chdir(original_dir)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"Error running parallel simulation: {e}")
+        return False
+
+
+def run_openfoam_simulation(case_dir, solver_cmd=None, output_dir=None, metrics=None,
+                            **extract_kwargs):
+    """Run OpenFOAM simulation using icoFoam from the case directory.
+    
+    The solver output is written to log.icoFoam in the case directory.
+    
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        solver_cmd: Solver command as an argument list, default ['icoFoam']
+        output_dir: If given, each time directory is extracted into this
+            directory as soon as the solver has written it
+        metrics: RunMetrics receiving the 'simulate' stage (which includes
+            the overlapped extraction), or None
+        extract_kwargs: Extra arguments for extract_simulation_data
+            (e.g. output_format, metadata, resume)
+        
+    Returns:
+        bool: True if simulation successful, False otherwise
+    """
+    metrics = metrics or RunMetrics()
+    log_path = os.path.join(case_dir, SOLVER_LOG)
+    print(f"Solver output: {log_path}")
+    with metrics.stage('simulate') as stage, open(log_path, 'w') as log:
+        if output_dir is None:
+            try:
+                # Run the solver inside the case directory
+                subprocess.run(solver_cmd or ['icoFoam'], cwd=case_dir, check=True,
+                               stdout=log, stderr=subprocess.STDOUT)
+                return True
+            except subprocess.CalledProcessError as e:
+                print(f"Error running simulation: {e}")
+                return False
+
+        # Overlap extraction with the solve
+        stage['extract_overlapped'] = True
+        extract_kwargs.setdefault('resume', False)
+        process = subprocess.Popen(solver_cmd or ['icoFoam'], cwd=case_dir,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        try:
+            extract_simulation_data(case_dir, output_dir,
+                                    is_running=lambda: process.poll() is None,
+                                    **extract_kwargs)
+        finally:
+            process.wait()
+    if process.returncode != 0:
+        print(f"Error running simulation: solver exited with status {process.returncode}")
         return False
+    return True
 
 
-def create_paraview_visualization(case_dir):
+def parse_resolution(text):
+    """Parse a 'WIDTHxHEIGHT' string into a (width, height) tuple."""
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def create_paraview_visualization(case_dir, work_dir='.', decomposed=False,
+                                  resolution=(1920, 1080), stride=1, framerate=10):
     """Create flow visualization using ParaView.
     
+    Frames are rendered off-screen by pvbatch and piped as raw RGB straight
+    into a single ffmpeg process, so no image files are written. The
+    ParaView script lives in a private directory below work_dir, so
+    several runs can render into the same work_dir at once.
+    
     Args:
         case_dir: Path to the OpenFOAM case directory
+        work_dir: Directory for the resulting flow_visualization.mp4
+        decomposed: Read the processor* directories instead of a
+            reconstructed case
+        resolution: (width, height) of the video; both must be even
+        stride: Render every stride-th time step
+        framerate: Frames per second of the video
     """
-    # Create frames directory
-    os.makedirs('frames', exist_ok=True)
+    width, height = resolution
+    if width % 2 or height % 2:
+        raise ValueError(f"Video resolution must be even, got {width}x{height}")
+    os.makedirs(work_dir, exist_ok=True)
+    render_dir = tempfile.mkdtemp(prefix='.render_', dir=work_dir)
+    foam_file = os.path.abspath(os.path.join(case_dir, "flow_cylinder.foam"))
+    case_type = 'Decomposed Case' if decomposed else 'Reconstructed Case'
+    video_path = os.path.abspath(os.path.join(work_dir, 'flow_visualization.mp4'))
+    encoder = ffmpeg_command(video_path, resolution, framerate)
     
     # Generate ParaView state file
     paraview_state = f'''
 # ParaView State File
 from paraview.simple import *
-import os
-os.makedirs('frames', exist_ok=True)
+import subprocess
+from vtkmodules.vtkRenderingCore import vtkWindowToImageFilter
+from vtkmodules.util.numpy_support import vtk_to_numpy
 paraview.simple._DisableFirstRenderCameraReset()
 
 # Create a new 'OpenFOAM Reader'
-foam = OpenFOAMReader(FileName='{os.path.join(case_dir, "flow_cylinder.foam")}')
+foam = OpenFOAMReader(FileName='{foam_file}')
+foam.CaseType = '{case_type}'
 foam.MeshRegions = ['internalMesh']
 foam.CellArrays = ['U', 'p']
 
@@ -158,95 +361,239 @@ renderView.CameraParallelScale = 15
 
 # Set background
 renderView.Background = [1.0, 1.0, 1.0]  # White background
+renderView.ViewSize = [{width}, {height}]
 
-# Save animation
+# Grab rendered frames from the render window
+grabber = vtkWindowToImageFilter()
+grabber.SetInput(renderView.GetRenderWindow())
+grabber.SetInputBufferTypeToRGB()
+grabber.ReadFrontBufferOff()
+grabber.ShouldRerenderOff()
+
+# Stream the animation into ffmpeg
 scene.GoToFirst()
-print("Saving animation frames...")
-timesteps = foam.TimestepValues
-for i in range(len(timesteps)):
-    scene.AnimationTime = timesteps[i]
-    Render()
-    SaveScreenshot('frames/frame_%04d.png' % i, renderView,
-                  ImageResolution=[1920, 1080])
-    print('Frame %d of %d' % (i+1, len(timesteps)))
-
-print("Creating video from frames...")
+timesteps = foam.TimestepValues[::{stride}]
+print("Encoding %d frames..." % len(timesteps))
+encoder = subprocess.Popen({encoder!r}, stdin=subprocess.PIPE)
+for i, t in enumerate(timesteps):
+    scene.AnimationTime = t
+    Render(renderView)
+    grabber.Modified()
+    grabber.Update()
+    image = grabber.GetOutput()
+    w, h, _ = image.GetDimensions()
+    pixels = vtk_to_numpy(image.GetPointData().GetScalars()).reshape(h, w, -1)
+    # VTK images start at the bottom row
+    encoder.stdin.write(pixels[::-1, :, :3].tobytes())
+    print('Frame %d of %d' % (i + 1, len(timesteps)))
+encoder.stdin.close()
+if encoder.wait() != 0:
+    raise SystemExit('ffmpeg exited with status %d' % encoder.returncode)
 '''
 
     # Write ParaView state file
-    with open('visualization.py', 'w') as f:
+    script = os.path.join(render_dir, 'visualization.py')
+    with open(script, 'w') as f:
         f.write(paraview_state)
 
     # Run ParaView in batch mode
-    subprocess.run(['pvbatch', 'visualization.py'], check=True)
-
-    # Create video from frames using ffmpeg
     try:
-        subprocess.run([
-            'ffmpeg', '-framerate', '10',
-            '-pattern_type', 'glob',
-            '-i', 'frames/frame_*.png',
-            '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
-            '-b:v', '5000k', 'flow_visualization.mp4'
-        ], check=True)
-        
-        # Only cleanup if video creation was successful
-        subprocess.run(['rm', '-rf', 'frames'], check=True)
-        subprocess.run(['rm', 'visualization.py'], check=True)
+        subprocess.run(['pvbatch', 'visualization.py'], cwd=render_dir, check=True)
     except subprocess.CalledProcessError as e:
         print(f"Error creating video: {e}")
-        print("Frames are preserved in the 'frames' directory")
+        print(f"The ParaView script is preserved in {script}")
+        return
+    shutil.rmtree(render_dir, ignore_errors=True)
 
 
-def calculate_nu_from_reynolds(Re, velocity, characteristic_length=0.01):
-    """Calculate kinematic viscosity from Reynolds number.
-    
+def create_visualization(case_dir, work_dir='.', renderer='paraview', decomposed=False,
+                         store_path=None, render_jobs=None, resolution=(1920, 1080),
+                         stride=1):
+    """Render flow_visualization.mp4 into work_dir with the chosen renderer.
+
     Args:
-        Re: Reynolds number
-        velocity: Free stream velocity (m/s)
-        characteristic_length: Cylinder diameter (m), default is 0.01m (1cm)
-    Returns:
-        nu: Kinematic viscosity (m²/s)
+        case_dir: Path to the OpenFOAM case directory
+        work_dir: Directory for the resulting flow_visualization.mp4
+        renderer: 'paraview' (pvbatch) or 'matplotlib' (render.py)
+        decomposed: Read the processor* directories instead of a
+            reconstructed case
+        store_path: Result store the matplotlib renderer reads the fields
+            from, or None to read the case
+        render_jobs: Number of matplotlib render processes
+        resolution: (width, height) of the video
+        stride: Render every stride-th time step
     """
-    return (velocity * characteristic_length) / Re
+    if renderer == 'matplotlib':
+        os.makedirs(work_dir, exist_ok=True)
+        render_video(case_dir, os.path.join(work_dir, 'flow_visualization.mp4'), store_path,
+                     decomposed, resolution, stride, jobs=render_jobs)
+    else:
+        create_paraview_visualization(case_dir, work_dir, decomposed, resolution, stride)
 
 
-def main(end_time, delta_t, Re, velocity):
-    """Main function to run simulation and create visualization."""
-    # Calculate nu from Reynolds number
-    nu = calculate_nu_from_reynolds(Re, velocity)
-    print(f"Calculated kinematic viscosity: {nu} m²/s")
+def main(end_time, delta_t, Re, velocity, write_format='ascii', write_compression=False,
+         solver_cmd=None, n_procs=1, launcher=None, reconstruct=True, output_dir=None,
+         output_format='store', warm_start=None, warm_start_dir='data', early_stop=None,
+         write_interval=None, courant=DEFAULT_COURANT,
+         snapshots=DEFAULT_SNAPSHOTS_PER_PERIOD, metrics_file=METRICS_FILE,
+         resolution=(1920, 1080), frame_stride=1, renderer='paraview', render_jobs=None,
+         probes=None, derived=None):
+    """Main function to run simulation and create visualization.
     
+    If delta_t is None, deltaT and writeInterval are chosen from the mesh
+    for the target Courant number and snapshots per shedding period. Stage
+    timings and solver log metrics are appended to metrics_file. The video
+    is rendered with ParaView or, with renderer='matplotlib', by render.py.
+    With output_format='probes', only the samples at the locations of the
+    probes file are kept. derived lists derived fields added to the store.
+
+    Returns:
+        bool: True if the simulation succeeded, False otherwise
+    """
     # Paths to configuration files
     case_dir = "flow_cylinder"
+
+    # Calculate nu from Reynolds number and the cylinder diameter of the mesh
+    nu = calculate_nu_from_reynolds(Re, velocity, cylinder_diameter(case_dir))
+    print(f"Calculated kinematic viscosity: {nu} m²/s")
     control_dict_path = os.path.join(case_dir, "system", "controlDict")
     transport_properties_path = os.path.join(case_dir, "constant", "transportProperties")
     
     # Modify configuration files
-    modify_control_dict(control_dict_path, end_time, delta_t)
+    delta_t, write_interval = resolve_time_controls(case_dir, Re, velocity, delta_t,
+                                                    write_interval, courant, snapshots)
+    modify_control_dict(control_dict_path, end_time, delta_t,
+                        write_format, write_compression, write_interval=write_interval)
     modify_transport_properties(transport_properties_path, nu)
+
+    # Initial conditions: uniform, or seeded from the closest completed runs.
+    # Both start from the pristine 0.orig, so the inlet velocity set below
+    # never carries over to the next run.
+    metadata = {'Re': Re, 'U': velocity}
+    if warm_start:
+        metadata['warm_start'] = seed_initial_conditions(
+            case_dir, Re, velocity, warm_start_dir, warm_start == 'interpolate')
+    else:
+        reset_initial_conditions(case_dir)
+    set_inlet_velocity(os.path.join(case_dir, "0", "U"), velocity)
     
-    # Run simulation
+    # Run simulation on a case cleared of earlier results
+    clean_case(case_dir)
+    extract_kwargs = {'output_format': output_format, 'metadata': metadata,
+                      'early_stop': early_stop, 'probes': probes, 'derived': derived,
+                      'decomposed': n_procs > 1 and not reconstruct}
     print(f"Running simulation with Re={Re}, U={velocity}, endTime={end_time}, deltaT={delta_t}")
-    if run_openfoam_simulation(case_dir):
-        print("Simulation completed successfully")
-        
-        # Create ParaView visualization
-        print("Creating flow visualization...")
-        create_paraview_visualization(case_dir)
-        print("Visualization created: flow_visualization.mp4")
-    else:
-        print("Simulation failed")
+    metrics = RunMetrics(run=f'Re{Re}_U{velocity}', Re=Re, U=velocity, end_time=end_time,
+                         delta_t=delta_t, n_procs=n_procs, status='failed')
+    try:
+        if n_procs > 1:
+            modify_decompose_par_dict(os.path.join(case_dir, "system", "decomposeParDict"),
+                                      n_procs)
+            with metrics.stage('simulate'):
+                success = run_parallel_simulation(case_dir, n_procs, solver_cmd, launcher,
+                                                  reconstruct)
+            if success and output_dir is not None:
+                with metrics.stage('extract'):
+                    extract_simulation_data(case_dir, output_dir, resume=False,
+                                            **extract_kwargs)
+        else:
+            success = run_openfoam_simulation(case_dir, solver_cmd, output_dir, metrics,
+                                              **extract_kwargs)
+        metrics.add_solver_log(os.path.join(case_dir, SOLVER_LOG), output_dir)
+        if success:
+            print("Simulation completed successfully")
+            metrics.record['status'] = 'ok'
+            
+            # Create flow visualization
+            print("Creating flow visualization...")
+            store_path = None
+            if output_dir is not None and output_format == 'store':
+                store_path = os.path.join(output_dir, STORE_DIR)
+            with metrics.stage('render'):
+                create_visualization(case_dir, renderer=renderer,
+                                     decomposed=n_procs > 1 and not reconstruct,
+                                     store_path=store_path, render_jobs=render_jobs,
+                                     resolution=resolution, stride=frame_stride)
+            print("Visualization created: flow_visualization.mp4")
+        else:
+            print("Simulation failed")
+    finally:
+        metrics.write(metrics_file)
+    return success
 
 
 if __name__ == "__main__":
     import argparse
+    import shlex
+    import sys
     
     parser = argparse.ArgumentParser(description='Run OpenFOAM simulation with custom parameters')
     parser.add_argument('--end-time', type=float, required=True, help='End time for simulation')
-    parser.add_argument('--delta-t', type=float, required=True, help='Time step size')
+    parser.add_argument('--delta-t', type=float, default=None,
+                        help='Time step size (default: largest stable step for --courant)')
+    parser.add_argument('--write-interval', type=float, default=None,
+                        help='Time between written fields (default: --snapshots per '
+                             'shedding period with automatic deltaT, else 0.1)')
+    parser.add_argument('--courant', type=float, default=DEFAULT_COURANT,
+                        help='Target Courant number for the automatic deltaT')
+    parser.add_argument('--snapshots', type=int, default=DEFAULT_SNAPSHOTS_PER_PERIOD,
+                        help='Written time steps per expected shedding period '
+                             'for the automatic writeInterval')
     parser.add_argument('--Re', type=float, required=True, help='Reynolds number')
     parser.add_argument('--velocity', type=float, required=True, help='Inlet velocity (m/s)')
+    parser.add_argument('--write-format', choices=['ascii', 'binary'], default='ascii',
+                        help='Format of the written fields')
+    parser.add_argument('--compress', action='store_true',
+                        help='Write gzip-compressed fields (writeCompression on)')
+    parser.add_argument('--solver', type=str, default='icoFoam',
+                        help='Solver command to run inside the case directory')
+    parser.add_argument('--np', dest='n_procs', type=int, default=1,
+                        help='Number of MPI ranks (decomposes the case when > 1)')
+    parser.add_argument('--launcher', type=str, default='mpirun',
+                        help='MPI launcher command used when --np > 1')
+    parser.add_argument('--no-reconstruct', action='store_true',
+                        help='Skip reconstructPar and keep the processor* directories')
+    parser.add_argument('--output-dir', type=str, default=None,
+                        help='Extract data into this directory while the solver runs')
+    parser.add_argument('--format', choices=['store', 'csv', 'probes'], default='store',
+                        help='Output format of the extracted data')
+    parser.add_argument('--probes', type=str, default=None,
+                        help='Probe file (JSON points and lines) sampled with --format probes')
+    parser.add_argument('--derived', nargs='*', choices=DERIVED_FIELDS, default=None,
+                        help='Store derived fields (default with no names: all of them)')
+    parser.add_argument('--warm-start', choices=['nearest', 'interpolate'], default=None,
+                        help='Seed 0/U and 0/p from the closest completed run, or '
+                             'interpolate between the two nearest in Re')
+    parser.add_argument('--early-stop', action='store_true',
+                        help='Stop the solver once the shedding cycle has settled '
+                             '(needs --output-dir, serial runs only)')
+    parser.add_argument('--stop-tolerance', type=float, default=0.01,
+                        help='Relative spread of St and mean Cd allowed for --early-stop')
+    parser.add_argument('--stop-periods', type=int, default=4,
+                        help='Number of shedding periods that must agree for --early-stop')
+    parser.add_argument('--warm-start-dir', type=str, default='data',
+                        help='Directory of completed run_* outputs used for --warm-start')
+    parser.add_argument('--metrics', type=str, default=METRICS_FILE,
+                        help='JSON lines file the run metrics are appended to')
+    parser.add_argument('--resolution', type=parse_resolution, default=(1920, 1080),
+                        help='Video resolution as WIDTHxHEIGHT (even numbers)')
+    parser.add_argument('--frame-stride', type=int, default=1,
+                        help='Render every N-th written time step')
+    parser.add_argument('--renderer', choices=RENDERERS, default='paraview',
+                        help='Render the video with ParaView (pvbatch) or Matplotlib')
+    parser.add_argument('--render-jobs', type=int, default=None,
+                        help='Processes drawing frames with --renderer matplotlib '
+                             '(default: all CPUs)')
     
     args = parser.parse_args()
-    main(args.end_time, args.delta_t, args.Re, args.velocity) 
\ No newline at end of file
+    success = main(
+        args.end_time, args.delta_t, args.Re, args.velocity,
+        args.write_format, args.compress, shlex.split(args.solver),
+        args.n_procs, shlex.split(args.launcher), not args.no_reconstruct,
+        args.output_dir, args.format, args.warm_start, args.warm_start_dir,
+        {'tolerance': args.stop_tolerance, 'n_periods': args.stop_periods}
+        if args.early_stop else None, args.write_interval, args.courant, args.snapshots,
+        args.metrics, args.resolution, args.frame_stride, args.renderer, args.render_jobs,
+        args.probes,
+        None if args.derived is None else args.derived or list(DERIVED_FIELDS))
+    sys.exit(0 if success else 1)
@@ -0,0 +1,298 @@
+"""Content-addressed cache of finished simulation runs.
+
+A run is identified by a hash of everything that determines its results
+except the end time: the run parameters, the case dictionaries, the mesh
+and the solver build. Each cache entry keeps the extracted outputs, the
+latest time directory (so a longer run can restart from it) and the
+rendered video:
+
+    cache/runs/<key>/
+    ├── entry.json      # parameters, end time, last use and size
+    ├── data/           # extracted outputs (store/, drag/, ...)
+    ├── latest/<time>/  # last time directory written by the solver
+    └── flow.mp4        # rendered video, if any
+
+The cache is bounded in size; the least recently used entries are evicted
+first.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from foam_io import mesh_hash
+from extract_data import list_time_dirs, STORE_DIR
+from probes import PROBES_DIR
+from result_store import open_store
+from warm_start import initial_dir
+
+
+# Directory holding cached runs, relative to the working directory
+RUN_CACHE_DIR = os.path.join('cache', 'runs')
+
+# Default upper bound on the total cache size
+DEFAULT_CACHE_BYTES = 10 * 1024 ** 3
+
+ENTRY_FILE = 'entry.json'
+VIDEO_FILE = 'flow.mp4'
+
+# Case files whose contents determine the solution
+CASE_FILES = [
+    os.path.join('system', 'controlDict'),
+    os.path.join('system', 'fvSchemes'),
+    os.path.join('system', 'fvSolution'),
+    os.path.join('constant', 'transportProperties'),
+]
+
+# Initial condition files, hashed from the pristine 0.orig when the case has one
+INITIAL_FILES = ['U', 'p']
+
+# Dictionary entries set from the run parameters; they are hashed through
+# the parameters instead, so a case edited in place by an earlier run
+# (including 'stopAt writeNow' left by an early stop) still produces the
+# same key
+RUN_KEYS = {'startFrom', 'stopAt', 'endTime', 'deltaT', 'writeControl', 'writeInterval',
+            'writeFormat', 'writeCompression', 'nu'}
+
+
+def solver_version(solver_cmd=None):
+    """Describe the solver build used for a run.
+
+    Args:
+        solver_cmd: Solver command as an argument list, default ['icoFoam']
+
+    Returns:
+        str: Command, OpenFOAM version and the size and mtime of the
+            solver executable
+    """
+    solver_cmd = solver_cmd or ['icoFoam']
+    parts = [' '.join(solver_cmd), os.environ.get('WM_PROJECT_VERSION', '')]
+    executable = shutil.which(solver_cmd[0])
+    if executable:
+        stat = os.stat(executable)
+        parts += [os.path.realpath(executable), str(stat.st_size), str(int(stat.st_mtime))]
+    return '|'.join(parts)
+
+
+def _case_digest(case_dir, digest):
+    """Feed the case dictionaries into digest, skipping per-run entries."""
+    paths = [(name, os.path.join(case_dir, name)) for name in CASE_FILES]
+    paths += [(os.path.join('0', name), os.path.join(initial_dir(case_dir), name))
+              for name in INITIAL_FILES]
+    for name, path in paths:
+        if not os.path.exists(path):
+            continue
+        digest.update(name.encode())
+        with open(path, 'r') as f:
+            for line in f:
+                words = line.split()
+                if words and words[0] in RUN_KEYS:
+                    continue
+                digest.update(line.encode())
+
+
+def run_key(case_dir, params, solver_cmd=None):
+    """Return the cache key of a run.
+
+    Args:
+        case_dir: Template case the run starts from
+        params: dict of run parameters (Re, U, delta_t, ...) excluding the
+            end time
+        solver_cmd: Solver command as an argument list
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    _case_digest(case_dir, digest)
+    digest.update(mesh_hash(case_dir).encode())
+    digest.update(solver_version(solver_cmd).encode())
+    return digest.hexdigest()
+
+
+def _write_entry(path, entry):
+    """Write entry.json of a cache entry atomically."""
+    tmp = os.path.join(path, f'{ENTRY_FILE}.tmp-{os.getpid()}')
+    with open(tmp, 'w') as f:
+        json.dump(entry, f, indent=1)
+    os.replace(tmp, os.path.join(path, ENTRY_FILE))
+
+
+def _dir_size(path):
+    """Return the total size of the files below path in bytes."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def lookup(key, cache_dir=RUN_CACHE_DIR):
+    """Find the cache entry of a run and mark it as recently used.
+
+    Args:
+        key: Run key from run_key
+        cache_dir: Cache directory
+
+    Returns:
+        dict or None: Entry with 'path', 'end_time' and 'latest_time', or
+            None on a miss
+    """
+    path = os.path.join(cache_dir, key)
+    try:
+        with open(os.path.join(path, ENTRY_FILE), 'r') as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    entry['last_used'] = time.time()
+    _write_entry(path, entry)
+    entry['path'] = path
+    return entry
+
+
+def covers(entry, end_time):
+    """Return True if a cache entry reaches end_time."""
+    return entry is not None and entry['end_time'] >= end_time - 1e-9
+
+
+def restore_data(entry, output_dir):
+    """Copy the cached outputs of an entry into output_dir.
+
+    Args:
+        entry: Entry returned by lookup
+        output_dir: Output directory, created if needed
+    """
+    shutil.copytree(os.path.join(entry['path'], 'data'), output_dir, dirs_exist_ok=True)
+
+
+def restore_video(entry, video_path):
+    """Copy the cached video of an entry, returning False if there is none."""
+    cached = os.path.join(entry['path'], VIDEO_FILE)
+    if not os.path.exists(cached):
+        return False
+    shutil.copy2(cached, video_path)
+    return True
+
+
+def restore_latest_time(entry, case_dir):
+    """Copy the last cached time directory into a case to restart from it.
+
+    Args:
+        entry: Entry returned by lookup
+        case_dir: Case directory the run continues in
+
+    Returns:
+        str: Name of the restored time directory
+    """
+    name = entry['latest_time']
+    shutil.copytree(os.path.join(entry['path'], 'latest', name),
+                    os.path.join(case_dir, name), dirs_exist_ok=True)
+    return name
+
+
+def run_finished(case_dir, end_time, output_dir):
+    """Return True if a run reached end_time or was stopped once settled.
+
+    Args:
+        case_dir: Case directory holding the solver's time directories
+        end_time: End time the run was asked to reach
+        output_dir: Directory with the extracted outputs
+    """
+    times = list_time_dirs(case_dir)
+    if times and float(times[-1]) >= end_time - 1e-9:
+        return True
+    for sub in (STORE_DIR, PROBES_DIR):
+        try:
+            if open_store(os.path.join(output_dir, sub)).metadata.get('early_stop'):
+                return True
+        except FileNotFoundError:
+            continue
+    return False
+
+
+def save(key, params, end_time, output_dir, case_dir, video=None,
+         cache_dir=RUN_CACHE_DIR):
+    """Store a finished run in the cache, replacing an older entry.
+
+    Args:
+        key: Run key from run_key
+        params: Run parameters recorded with the entry
+        end_time: End time the run reached
+        output_dir: Directory with the extracted outputs
+        case_dir: Case directory holding the solver's time directories
+        video: Path of the rendered video, or None
+
+    Returns:
+        str or None: Path of the cache entry, or None if the run did not
+            finish (see run_finished) and was not cached
+    """
+    if not run_finished(case_dir, end_time, output_dir):
+        print(f"Run did not reach endTime {end_time}; not caching it")
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    times = [t for t in list_time_dirs(case_dir) if float(t) <= end_time + 1e-9]
+    tmp = tempfile.mkdtemp(prefix=f'.{key[:12]}_', dir=cache_dir)
+    try:
+        shutil.copytree(output_dir, os.path.join(tmp, 'data'))
+        if times:
+            shutil.copytree(os.path.join(case_dir, times[-1]),
+                            os.path.join(tmp, 'latest', times[-1]))
+        if video and os.path.exists(video):
+            shutil.copy2(video, os.path.join(tmp, VIDEO_FILE))
+        _write_entry(tmp, {
+            'key': key,
+            'params': params,
+            'end_time': end_time,
+            'latest_time': times[-1] if times else None,
+            'last_used': time.time(),
+            'size': _dir_size(tmp),
+        })
+
+        final = os.path.join(cache_dir, key)
+        if os.path.exists(final):
+            old = f'{final}.old-{os.getpid()}'
+            os.replace(final, old)
+            os.replace(tmp, final)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(tmp, final)
+        return final
+    finally:
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def evict(max_bytes=DEFAULT_CACHE_BYTES, cache_dir=RUN_CACHE_DIR):
+    """Remove least recently used entries until the cache fits max_bytes.
+
+    Args:
+        max_bytes: Size bound of the cache
+        cache_dir: Cache directory
+
+    Returns:
+        list: Keys of the evicted entries
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+    entries = []
+    for key in os.listdir(cache_dir):
+        try:
+            with open(os.path.join(cache_dir, key, ENTRY_FILE), 'r') as f:
+                entries.append(json.load(f))
+        except (FileNotFoundError, NotADirectoryError, json.JSONDecodeError):
+            continue
+    entries.sort(key=lambda e: e['last_used'])
+    total = sum(e['size'] for e in entries)
+    evicted = []
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(os.path.join(cache_dir, entry['key']), ignore_errors=True)
+        total -= entry['size']
+        evicted.append(entry['key'])
+    if evicted:
+        print(f"Evicted {len(evicted)} cached run(s) to stay below {max_bytes} bytes")
+    return evicted
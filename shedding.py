@@ -0,0 +1,162 @@
+"""Detect a settled vortex-shedding cycle and stop the solver early.
+
+While a run is extracted, the lift and drag coefficients of each new time
+step are fed to a SheddingMonitor. The lift signal is cut into periods at
+its upward mean crossings; once the Strouhal number and the mean drag of
+the last few periods agree within a tolerance, the flow has reached its
+limit cycle and the run is stopped by setting 'stopAt writeNow' in
+controlDict (picked up by the solver through runTimeModifiable). Flows
+below the shedding threshold are stopped once Cd and Cl stop changing.
+
+check_convergence and detect_convergence work on plain arrays, so the
+criteria can be tried offline on recorded or synthetic signals.
+"""
+
+import os
+import numpy as np
+from foam_dict import edit_dict
+
+
+def upward_crossings(times, signal, level=0.0):
+    """Return the interpolated times at which signal rises through level.
+
+    Args:
+        times: (T,) sample times
+        signal: (T,) sampled values
+        level: Crossing level
+
+    Returns:
+        np.ndarray: Crossing times in increasing order
+    """
+    s = np.asarray(signal) - level
+    idx = np.nonzero((s[:-1] < 0) & (s[1:] >= 0))[0]
+    frac = s[idx] / (s[idx] - s[idx + 1])
+    return times[idx] + frac * (times[idx + 1] - times[idx])
+
+
+def check_convergence(times, cd, cl, velocity=1.0, diameter=1.0, n_periods=4,
+                      tolerance=0.01, min_amplitude=1e-3, steady_window=20.0):
+    """Test whether force coefficient histories have settled.
+
+    Periodic: the last n_periods lift periods give Strouhal numbers and
+    mean drag coefficients whose spread is within tolerance (relative).
+    Steady: over the last steady_window convective times (D/U), Cd varies
+    by less than tolerance (relative) and Cl by less than min_amplitude.
+
+    Args:
+        times: (T,) sample times
+        cd: (T,) drag coefficients
+        cl: (T,) lift coefficients
+        velocity: Free stream velocity
+        diameter: Cylinder diameter
+        n_periods: Number of periods that must agree
+        tolerance: Relative spread allowed in St and mean Cd
+        min_amplitude: Smallest lift range treated as shedding
+        steady_window: Length of the steady check in convective times
+
+    Returns:
+        dict or None: mode ('periodic' or 'steady'), strouhal, cd_mean and
+            cl_rms of the settled window, or None if not settled
+    """
+    times = np.asarray(times, dtype=float)
+    cd = np.asarray(cd, dtype=float)
+    cl = np.asarray(cl, dtype=float)
+    if len(times) < 3:
+        return None
+
+    half = cl[len(cl) // 2:]
+    if half.max() - half.min() >= min_amplitude:
+        crossings = upward_crossings(times, cl, half.mean())
+        if len(crossings) < n_periods + 1:
+            return None
+        bounds = crossings[-(n_periods + 1):]
+        periods = np.diff(bounds)
+        strouhal = diameter / (velocity * periods)
+        period_of = np.searchsorted(bounds, times, side='right') - 1
+        inside = (period_of >= 0) & (period_of < n_periods)
+        counts = np.bincount(period_of[inside], minlength=n_periods)
+        if (counts == 0).any():
+            return None
+        cd_means = np.bincount(period_of[inside], cd[inside], minlength=n_periods) / counts
+        window = (times >= bounds[0]) & (times < bounds[-1])
+        st_spread = np.ptp(strouhal) / strouhal.mean()
+        cd_spread = np.ptp(cd_means) / max(abs(cd_means.mean()), 1e-12)
+        if st_spread > tolerance or cd_spread > tolerance:
+            return None
+        return {'mode': 'periodic', 'strouhal': float(strouhal.mean()),
+                'cd_mean': float(cd_means.mean()),
+                'cl_rms': float(np.sqrt(np.mean((cl[window] - cl[window].mean()) ** 2)))}
+
+    window = times >= times[-1] - steady_window * diameter / velocity
+    if times[-1] - times[0] < steady_window * diameter / velocity:
+        return None
+    cd_window = cd[window]
+    if (np.ptp(cd_window) > tolerance * max(abs(cd_window.mean()), 1e-12)
+            or np.ptp(cl[window]) > min_amplitude):
+        return None
+    return {'mode': 'steady', 'strouhal': 0.0, 'cd_mean': float(cd_window.mean()),
+            'cl_rms': float(np.sqrt(np.mean(cl[window] ** 2)))}
+
+
+def detect_convergence(times, cd, cl, **kwargs):
+    """Replay recorded histories and find where a monitor would stop.
+
+    Args:
+        times, cd, cl: Recorded histories
+        kwargs: Criteria passed to check_convergence
+
+    Returns:
+        tuple: (index of the first settled sample, check_convergence
+            result), or (None, None) if the run never settles
+    """
+    for i in range(3, len(times) + 1):
+        state = check_convergence(times[:i], cd[:i], cl[:i], **kwargs)
+        if state is not None:
+            return i - 1, state
+    return None, None
+
+
+class SheddingMonitor:
+    """Accumulate force coefficients during a run and test for a limit cycle.
+
+    Args:
+        velocity: Free stream velocity
+        diameter: Cylinder diameter
+        kwargs: Criteria passed to check_convergence (n_periods,
+            tolerance, min_amplitude, steady_window)
+    """
+
+    def __init__(self, velocity=1.0, diameter=1.0, **kwargs):
+        self.velocity = velocity
+        self.diameter = diameter
+        self.criteria = kwargs
+        self.times = []
+        self.cd = []
+        self.cl = []
+        self.state = None
+
+    @property
+    def converged(self):
+        return self.state is not None
+
+    def update(self, t, cd, cl):
+        """Add one sample; return True once the signals have settled."""
+        self.times.append(float(t))
+        self.cd.append(float(cd))
+        self.cl.append(float(cl))
+        if self.state is None:
+            self.state = check_convergence(self.times, self.cd, self.cl, self.velocity,
+                                           self.diameter, **self.criteria)
+        return self.converged
+
+
+def request_stop(case_dir):
+    """Ask a running solver to write the current time and stop.
+
+    Sets 'stopAt writeNow;' in system/controlDict; the solver rereads the
+    file because the case uses runTimeModifiable.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+    """
+    edit_dict(os.path.join(case_dir, 'system', 'controlDict'), {'stopAt': 'writeNow'})
@@ -0,0 +1,345 @@
+"""Strouhal number, mean drag and lift RMS across a sweep.
+
+The force coefficient (or probe) histories of all runs in data/run_Re*_U*
+are cut after the transient, resampled to each run's median sampling
+interval and zero-padded into one (runs, samples) array. A single batched
+FFT then gives the spectra of every run: a Hann-windowed periodogram, or
+Welch's average over half-overlapping segments. The shedding frequency is
+the interpolated peak of each spectrum, and St = f D / U.
+
+    python3 spectra.py data --transient 0.5 --out data/spectra.csv
+    python3 spectra.py data --signal probe:wake_2D --method welch
+
+Signals are 'Cl' (default), 'Cd', or 'probe:<name>[:<component>]' for the
+transverse velocity (component 1 by default) at a probe of runs
+extracted with --format probes.
+"""
+
+import csv
+import os
+import re
+import numpy as np
+from result_store import open_store
+from extract_data import STORE_DIR
+from probes import PROBES_DIR
+
+
+# Sweep output file of the summary table
+SUMMARY_FILE = os.path.join('data', 'spectra.csv')
+
+# Name pattern of run directories written by batch_run.py (the mesh tag is
+# present for runs on generated meshes)
+RUN_PATTERN = re.compile(r'^run_Re(?P<Re>[^_]+)_U(?P<U>[^_]+)(?:_(?P<mesh>M[0-9a-f]+))?$')
+
+# Share of each history discarded as transient
+TRANSIENT = 0.5
+
+# FFT length relative to the longest history (zero padding for a finer grid)
+PAD_FACTOR = 4
+
+# Histories shorter than this (after the transient) get no spectrum
+MIN_SAMPLES = 8
+
+# Smallest lift RMS (or probe signal RMS) treated as shedding
+MIN_AMPLITUDE = 1e-3
+
+
+def find_runs(data_dir='data'):
+    """List the run directories of a sweep.
+
+    Args:
+        data_dir: Directory holding run_Re*_U* directories
+
+    Returns:
+        list: dicts with name, path, Re, U and mesh tag (or None), sorted
+            by (Re, U)
+    """
+    runs = []
+    for name in sorted(os.listdir(data_dir)):
+        match = RUN_PATTERN.match(name)
+        path = os.path.join(data_dir, name)
+        if match and os.path.isdir(path):
+            runs.append({'name': name, 'path': path,
+                         'Re': float(match.group('Re')), 'U': float(match.group('U')),
+                         'mesh': match.group('mesh')})
+    runs.sort(key=lambda run: (run['Re'], run['U']))
+    return runs
+
+
+def _open_run_store(run_path):
+    """Return the result store (or probe store) of a run, or None."""
+    for sub in (STORE_DIR, PROBES_DIR):
+        path = os.path.join(run_path, sub)
+        if os.path.isdir(path):
+            return open_store(path)
+    return None
+
+
+def _read_drag_csv(run_path):
+    """Return (times, Cd, Cl) from drag/data.csv, or None."""
+    path = os.path.join(run_path, 'drag', 'data.csv')
+    if not os.path.exists(path):
+        return None
+    table = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+    return table[:, 0], table[:, 1], table[:, 2]
+
+
+def load_signal(run_path, signal='Cl'):
+    """Read one time series of a run.
+
+    Args:
+        run_path: Run directory
+        signal: 'Cl', 'Cd' or 'probe:<name>[:<component>]'
+
+    Returns:
+        tuple: (times (T,), values (T,)); empty arrays if the run has no
+            such signal
+    """
+    store = _open_run_store(run_path)
+    if signal.startswith('probe:'):
+        parts = signal.split(':')
+        component = int(parts[2]) if len(parts) > 2 else 1
+        names = (store.metadata.get('probes', {}).get('names', [])
+                 if store is not None else [])
+        if parts[1] not in names or 'U' not in store.fields:
+            return np.zeros(0), np.zeros(0)
+        values = store.read('U', cells=[names.index(parts[1])])[:, 0, component]
+        return store.times('U'), values
+
+    if store is not None and signal in store.fields:
+        return store.times(signal), store.read(signal, cells=0)
+    drag = _read_drag_csv(run_path)
+    if drag is None:
+        return np.zeros(0), np.zeros(0)
+    return drag[0], drag[1 if signal == 'Cd' else 2]
+
+
+def pad_histories(histories, transient=TRANSIENT):
+    """Cut the transient and put histories into one zero-padded array.
+
+    Each history is resampled (linearly) to its median sampling interval,
+    since Courant-adjusted runs are not written at uniform times.
+
+    Args:
+        histories: List of (times, values)
+        transient: Share of each history's time span discarded
+
+    Returns:
+        tuple: (values (R, N), lengths (R,), dt (R,), t_start (R,))
+    """
+    rows, dts, starts = [], [], []
+    for times, values in histories:
+        times = np.asarray(times, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if len(times) < 2:
+            rows.append(np.zeros(0))
+            dts.append(np.nan)
+            starts.append(np.nan)
+            continue
+        start = times[0] + transient * (times[-1] - times[0])
+        dt = float(np.median(np.diff(times)))
+        grid = np.arange(start, times[-1] + 0.5 * dt, dt)
+        rows.append(np.interp(grid, times, values))
+        dts.append(dt)
+        starts.append(start)
+    lengths = np.array([len(row) for row in rows], dtype=int)
+    padded = np.zeros((len(rows), max(lengths.max(initial=0), 1)))
+    for i, row in enumerate(rows):
+        padded[i, :len(row)] = row
+    return padded, lengths, np.array(dts), np.array(starts)
+
+
+def _masked_moments(values, lengths):
+    """Return the mean and RMS fluctuation of each padded row."""
+    mask = np.arange(values.shape[1]) < lengths[:, None]
+    n = np.maximum(lengths, 1)
+    mean = np.where(mask, values, 0.0).sum(axis=1) / n
+    rms = np.sqrt(np.where(mask, (values - mean[:, None]) ** 2, 0.0).sum(axis=1) / n)
+    return mean, rms
+
+
+def _hann(lengths, width):
+    """Return (R, width) Hann windows of the given lengths, zero beyond."""
+    j = np.arange(width)
+    n = np.maximum(lengths[:, None] - 1, 1)
+    window = 0.5 - 0.5 * np.cos(2 * np.pi * j / n)
+    return np.where(j < lengths[:, None], window, 0.0)
+
+
+def _next_pow2(n):
+    return 1 << max(int(n) - 1, 1).bit_length()
+
+
+def batched_psd(values, lengths, dt, method='periodogram', nperseg=None,
+                pad_factor=PAD_FACTOR):
+    """Power spectral densities of zero-padded histories in one FFT call.
+
+    Args:
+        values: (R, N) padded histories (from pad_histories)
+        lengths: (R,) valid samples per row
+        dt: (R,) sampling interval per row
+        method: 'periodogram' (Hann window over each whole history) or
+            'welch' (Hann segments of nperseg samples, half overlapping)
+        nperseg: Welch segment length; default half the shortest history
+        pad_factor: FFT length relative to the window length
+
+    Returns:
+        tuple: (frequencies (R, F), one-sided PSD (R, F)); the frequency
+            grid differs per row because the sampling intervals do
+    """
+    mean, _ = _masked_moments(values, lengths)
+    centred = np.where(np.arange(values.shape[1]) < lengths[:, None],
+                       values - mean[:, None], 0.0)
+    dt = np.where(np.isfinite(dt), dt, 1.0)
+    if method == 'periodogram':
+        window = _hann(lengths, values.shape[1])
+        nfft = _next_pow2(pad_factor * values.shape[1])
+        spectra = np.abs(np.fft.rfft(centred * window, nfft, axis=1)) ** 2
+        norm = np.maximum((window ** 2).sum(axis=1), 1e-300)
+    elif method == 'welch':
+        usable = lengths[lengths >= MIN_SAMPLES]
+        if nperseg is None:
+            nperseg = max(int(usable.min()) // 2 if len(usable) else MIN_SAMPLES, MIN_SAMPLES)
+        nperseg = min(nperseg, values.shape[1])
+        step = max(nperseg // 2, 1)
+        segments = np.lib.stride_tricks.sliding_window_view(centred, nperseg, axis=1)[:, ::step]
+        segments = segments - segments.mean(axis=2, keepdims=True)
+        starts = np.arange(segments.shape[1]) * step
+        valid = (starts[None] + nperseg <= lengths[:, None]).astype(float)
+        window = _hann(np.array([nperseg]), nperseg)[0]
+        nfft = _next_pow2(pad_factor * nperseg)
+        per_segment = np.abs(np.fft.rfft(segments * window, nfft, axis=2)) ** 2
+        counts = valid.sum(axis=1)
+        spectra = np.einsum('rs,rsf->rf', valid, per_segment) / np.maximum(counts, 1)[:, None]
+        norm = np.where(counts > 0, (window ** 2).sum(), np.inf)
+    else:
+        raise ValueError(f"Unknown method '{method}'")
+    psd = spectra * dt[:, None] / norm[:, None]
+    psd[:, 1:] *= 2.0
+    frequencies = np.arange(psd.shape[1])[None] / (nfft * dt[:, None])
+    return frequencies, psd
+
+
+def peak_frequencies(frequencies, psd):
+    """Return the frequency of the largest non-zero-frequency peak per row.
+
+    The peak bin is refined by a parabola through the log PSD of the bin
+    and its neighbours.
+    """
+    log_psd = np.log(np.maximum(psd, 1e-300))
+    k = np.clip(np.argmax(psd[:, 1:], axis=1) + 1, 1, psd.shape[1] - 2)
+    rows = np.arange(len(psd))
+    left, mid, right = log_psd[rows, k - 1], log_psd[rows, k], log_psd[rows, k + 1]
+    curvature = left - 2 * mid + right
+    offset = np.where(curvature < 0, 0.5 * (left - right) / np.where(curvature < 0,
+                                                                    curvature, -1.0), 0.0)
+    df = frequencies[:, 1] - frequencies[:, 0]
+    return frequencies[rows, k] + np.clip(offset, -0.5, 0.5) * df
+
+
+def sweep_spectra(runs, signal='Cl', transient=TRANSIENT, method='periodogram',
+                  nperseg=None, diameter=None):
+    """Compute Strouhal numbers and force statistics of all runs at once.
+
+    Args:
+        runs: Result of find_runs
+        signal: Signal whose spectral peak defines the shedding frequency
+        transient: Share of each history discarded
+        method: 'periodogram' or 'welch'
+        nperseg: Welch segment length
+        diameter: Cylinder diameter; default the run's D metadata, or 1
+
+    Returns:
+        tuple: (summary rows, spectra) where spectra holds the frequencies
+            and PSD arrays of the signal
+    """
+    forces = [load_signal(run['path'], 'Cd') + load_signal(run['path'], 'Cl')[1:]
+              for run in runs]
+    cd, lengths, dt, starts = pad_histories([(t, d) for t, d, _ in forces], transient)
+    cl, _, _, _ = pad_histories([(t, l) for t, _, l in forces], transient)
+    cd_mean, _ = _masked_moments(cd, lengths)
+    _, cl_rms = _masked_moments(cl, lengths)
+
+    values, signal_lengths = cl, lengths
+    if signal != 'Cl':
+        values, signal_lengths, dt, _ = pad_histories(
+            [load_signal(run['path'], signal) for run in runs], transient)
+    frequencies, psd = batched_psd(values, signal_lengths, dt, method, nperseg)
+    peaks = peak_frequencies(frequencies, psd)
+    _, signal_rms = _masked_moments(values, signal_lengths)
+
+    rows = []
+    for i, run in enumerate(runs):
+        store = _open_run_store(run['path'])
+        metadata = store.metadata if store is not None else {}
+        d = diameter or float(metadata.get('D', 1.0))
+        velocity = float(metadata.get('U', run['U']))
+        n = int(signal_lengths[i])
+        if n < MIN_SAMPLES:
+            st = np.nan
+        elif signal_rms[i] < MIN_AMPLITUDE:
+            st = 0.0
+        else:
+            st = float(peaks[i] * d / velocity)
+        rows.append({
+            'run': run['name'], 'Re': run['Re'], 'U': run['U'], 'St': st,
+            'frequency': st * velocity / d if np.isfinite(st) else np.nan,
+            'Cd_mean': float(cd_mean[i]) if lengths[i] else np.nan,
+            'Cl_rms': float(cl_rms[i]) if lengths[i] else np.nan,
+            'samples': n, 't_start': float(starts[i]),
+        })
+    return rows, {'frequencies': frequencies, 'psd': psd}
+
+
+def write_summary(rows, path=SUMMARY_FILE):
+    """Write the summary rows as a CSV table."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+def print_summary(rows):
+    """Print the summary rows as a table."""
+    print(f"{'Re':>8} {'U':>8} {'St':>8} {'Cd mean':>9} {'Cl rms':>9} {'samples':>8}")
+    for row in rows:
+        print(f"{row['Re']:>8g} {row['U']:>8g} {row['St']:>8.4f} {row['Cd_mean']:>9.4f} "
+              f"{row['Cl_rms']:>9.4f} {row['samples']:>8d}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Strouhal number and force statistics '
+                                                 'of a sweep')
+    parser.add_argument('data_dir', nargs='?', default='data',
+                        help='Directory holding the run_Re*_U* directories')
+    parser.add_argument('--signal', type=str, default='Cl',
+                        help="'Cl', 'Cd' or 'probe:<name>[:<component>]'")
+    parser.add_argument('--transient', type=float, default=TRANSIENT,
+                        help='Share of each history discarded as transient')
+    parser.add_argument('--method', choices=['periodogram', 'welch'], default='periodogram',
+                        help='Spectral estimate')
+    parser.add_argument('--nperseg', type=int, default=None,
+                        help='Welch segment length (default: half the shortest history)')
+    parser.add_argument('--diameter', type=float, default=None,
+                        help='Cylinder diameter (default: run metadata, or 1)')
+    parser.add_argument('--out', type=str, default=SUMMARY_FILE, help='Summary CSV file')
+    parser.add_argument('--psd', type=str, default=None,
+                        help='Also save the spectra of all runs to this .npz file')
+
+    args = parser.parse_args()
+    runs = find_runs(args.data_dir)
+    if not runs:
+        raise SystemExit(f"No run_Re*_U* directories in {args.data_dir}")
+    summary, spectra = sweep_spectra(runs, args.signal, args.transient, args.method,
+                                     args.nperseg, args.diameter)
+    write_summary(summary, args.out)
+    print_summary(summary)
+    print(f"Saved {args.out}")
+    if args.psd:
+        np.savez(args.psd, runs=np.asarray([run['name'] for run in runs]), **spectra)
+        print(f"Saved {args.psd}")
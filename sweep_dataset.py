@@ -0,0 +1,371 @@
+"""Lazy access to the stored fields of every run of a sweep.
+
+SweepDataset indexes the runs in a data directory by their parameters
+(Re, U, nu, D, the mesh, ...) without reading any field data. Fields are
+opened as lazy array views; indexing one reads only the chunks of the
+result store it overlaps:
+
+    from sweep_dataset import SweepDataset
+
+    ds = SweepDataset('data')
+    ds.sel(Re=100).p[-1]                  # pressure of all cells, last time
+    ds.sel(Re=100, U=1.0).U[:, 42]        # (T, 3) velocity history of cell 42
+    wake = ds.filter(Re=(100, 200), U=1.0)
+    [run.Cd[:].mean() for run in wake]    # mean drag of every run in range
+    wake.read('p', -1, [0, 10, 20])       # (runs, 3) array
+
+Decompressed chunks are kept in an LRU cache shared by all runs of a
+dataset and bounded in bytes, so repeated access to neighbouring data
+(e.g. stepping through time in a notebook) reads each chunk from disk
+once. Chunks of uncompressed stores are memory-mapped. Runs extracted in
+the CSV format have no store and are not indexed.
+
+    python3 sweep_dataset.py data --where Re=100:200 --where U=1.0
+"""
+
+import math
+import os
+from collections import OrderedDict
+import numpy as np
+from result_store import ResultStore, INDEX_FILE
+from extract_data import STORE_DIR
+from probes import PROBES_DIR
+from spectra import find_runs
+
+
+# Default size bound of the chunk cache of a dataset
+CHUNK_CACHE_BYTES = 256 * 1024 ** 2
+
+
+class ChunkCache:
+    """Least recently used cache of decoded store chunks.
+
+    Args:
+        max_bytes: Upper bound on the total size of the cached chunks
+    """
+
+    def __init__(self, max_bytes=CHUNK_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._chunks = OrderedDict()
+
+    def get(self, key, load):
+        """Return the chunk under key, calling load() on a miss."""
+        block = self._chunks.get(key)
+        if block is not None:
+            self._chunks.move_to_end(key)
+            self.hits += 1
+            return block
+        self.misses += 1
+        block = load()
+        if block.nbytes <= self.max_bytes:
+            self._chunks[key] = block
+            self.nbytes += block.nbytes
+            while self.nbytes > self.max_bytes:
+                _, old = self._chunks.popitem(last=False)
+                self.nbytes -= old.nbytes
+        return block
+
+    def clear(self):
+        self._chunks.clear()
+        self.nbytes = 0
+
+    def info(self):
+        """Return hits, misses, the number of cached chunks and their size."""
+        return {'hits': self.hits, 'misses': self.misses, 'chunks': len(self._chunks),
+                'nbytes': self.nbytes, 'max_bytes': self.max_bytes}
+
+
+class _CachedStore(ResultStore):
+    """Read-only result store reading its chunks through a ChunkCache."""
+
+    def __init__(self, path, cache):
+        super().__init__(path, 'r')
+        self.cache = cache
+
+    def _read_chunk(self, field, ti, ci):
+        return self.cache.get((self.path, field, int(ti), int(ci)),
+                              lambda: super(_CachedStore, self)._read_chunk(field, ti, ci))
+
+
+class FieldView:
+    """Lazy (T, N) or (T, N, ncomp) view of one field of one run.
+
+    Indexing with [times, cells, component] reads only the overlapped
+    chunks; every index may be an integer, a slice or an index array.
+    """
+
+    def __init__(self, store, field):
+        self.store = store
+        self.field = field
+
+    @property
+    def shape(self):
+        return self.store.shape(self.field)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float64)
+
+    @property
+    def times(self):
+        """Simulation times of the time axis."""
+        return self.store.times(self.field)
+
+    def time_index(self, t):
+        """Return the index of the stored time closest to t."""
+        return int(np.argmin(np.abs(self.times - t)))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        times = key[0]
+        cells = key[1] if len(key) > 1 else slice(None)
+        values = self.store.read(self.field, times, cells)
+        return values[(Ellipsis,) + key[2:]] if len(key) > 2 else values
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+    def __repr__(self):
+        return f'<FieldView {self.field} {self.shape}>'
+
+
+class Run:
+    """One run of a sweep: its parameters and lazy field views.
+
+    Fields are attributes (run.p, run.U, run.Cd) or items (run['p']).
+
+    Attributes:
+        name: Run name, e.g. 'Re100_U1.0'
+        path: Store directory of the run
+        params: dict of the run's scalar parameters (Re, U, nu, D, ...);
+            nested metadata is flattened as '<key>_<entry>' (e.g.
+            mesh_refinement)
+    """
+
+    def __init__(self, name, path, params, cache):
+        self.name = name
+        self.path = path
+        self.params = params
+        self._cache = cache
+        self._store = None
+
+    @property
+    def store(self):
+        """The run's result store, opened on first use."""
+        if self._store is None:
+            self._store = _CachedStore(self.path, self._cache)
+        return self._store
+
+    @property
+    def fields(self):
+        return self.store.fields
+
+    def __getitem__(self, field):
+        if field not in self.store.index['fields']:
+            raise KeyError(f"Run {self.name} has no field '{field}' "
+                           f"(fields: {', '.join(self.fields)})")
+        return FieldView(self.store, field)
+
+    def __getattr__(self, field):
+        if field.startswith('_'):
+            raise AttributeError(field)
+        try:
+            return self[field]
+        except KeyError as e:
+            raise AttributeError(str(e)) from None
+
+    def __repr__(self):
+        return f'<Run {self.name}>'
+
+
+def _flatten(metadata):
+    """Return the scalar entries of run metadata, flattening nested dicts."""
+    params = {}
+    for key, value in metadata.items():
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                if isinstance(sub_value, (int, float, str, bool)):
+                    params[f'{key}_{sub_key}'] = sub_value
+        elif isinstance(value, (int, float, str, bool)):
+            params[key] = value
+    return params
+
+
+def _matches(value, criterion):
+    """Test a parameter value against a filter criterion.
+
+    A tuple (lo, hi) is an inclusive range (None leaves a side open), a
+    list is a set of allowed values, a callable a predicate and anything
+    else must equal the value (numbers to within rounding).
+    """
+    if callable(criterion):
+        return bool(criterion(value))
+    if isinstance(criterion, tuple):
+        lo, hi = criterion
+        return (value is not None and (lo is None or value >= lo)
+                and (hi is None or value <= hi))
+    if isinstance(criterion, list):
+        return any(_matches(value, c) for c in criterion)
+    if isinstance(criterion, (int, float)) and isinstance(value, (int, float)):
+        return math.isclose(value, criterion, rel_tol=1e-9, abs_tol=1e-12)
+    return value == criterion
+
+
+class SweepDataset:
+    """Index of the runs of a sweep, filtered by their parameters.
+
+    Args:
+        data_dir: Directory holding the run_* directories
+        cache_bytes: Size bound of the chunk cache shared by the runs
+    """
+
+    def __init__(self, data_dir='data', cache_bytes=CHUNK_CACHE_BYTES):
+        self.data_dir = data_dir
+        self.cache = ChunkCache(cache_bytes)
+        self.runs = []
+        if not os.path.isdir(data_dir):
+            return
+        for run in find_runs(data_dir):
+            for sub in (STORE_DIR, PROBES_DIR):
+                path = os.path.join(run['path'], sub)
+                if os.path.exists(os.path.join(path, INDEX_FILE)):
+                    break
+            else:
+                continue
+            store = _CachedStore(path, self.cache)
+            params = {'Re': run['Re'], 'U': run['U'], 'mesh': run['mesh']}
+            params.update(_flatten(store.metadata))
+            entry = Run(run['name'][len('run_'):], path, params, self.cache)
+            entry._store = store
+            self.runs.append(entry)
+
+    def _subset(self, runs):
+        subset = SweepDataset.__new__(SweepDataset)
+        subset.data_dir, subset.cache, subset.runs = self.data_dir, self.cache, runs
+        return subset
+
+    def __len__(self):
+        return len(self.runs)
+
+    def __iter__(self):
+        return iter(self.runs)
+
+    def __getitem__(self, index):
+        if isinstance(index, str):
+            for run in self.runs:
+                if run.name == index:
+                    return run
+            raise KeyError(f"No run named {index}")
+        if isinstance(index, slice):
+            return self._subset(self.runs[index])
+        return self.runs[index]
+
+    def filter(self, **criteria):
+        """Select the runs whose parameters match all criteria.
+
+        Args:
+            **criteria: Parameter name -> value, (lo, hi) inclusive range
+                (None for an open side), list of values or predicate
+
+        Returns:
+            SweepDataset: The matching runs, sharing this dataset's cache
+        """
+        return self._subset([run for run in self.runs
+                             if all(_matches(run.params.get(key), criterion)
+                                    for key, criterion in criteria.items())])
+
+    def sel(self, **criteria):
+        """Select exactly one run by its parameters (see filter).
+
+        Raises:
+            KeyError: If no run or more than one run matches
+        """
+        runs = self.filter(**criteria).runs
+        if len(runs) != 1:
+            found = ', '.join(run.name for run in runs) or 'none'
+            raise KeyError(f"{len(runs)} runs match {criteria} ({found}); "
+                           f"add parameters or use filter()")
+        return runs[0]
+
+    def values(self, param):
+        """Return one parameter of every run, in run order, as an array."""
+        return np.array([run.params.get(param) for run in self.runs])
+
+    def read(self, field, times=slice(None), cells=slice(None)):
+        """Read the same block of a field from every run.
+
+        Args:
+            field: Field name
+            times: Time index, slice or index array
+            cells: Cell index, slice or index array
+
+        Returns:
+            np.ndarray: Values with a leading run axis
+
+        Raises:
+            ValueError: If the runs' blocks differ in shape
+        """
+        blocks = [run[field][times, cells] for run in self.runs]
+        shapes = {block.shape for block in blocks}
+        if len(shapes) > 1:
+            raise ValueError(f"Runs have different {field} shapes for this block: "
+                             f"{sorted(shapes)}")
+        return np.stack(blocks) if blocks else np.empty((0,))
+
+    def __repr__(self):
+        return f'<SweepDataset {self.data_dir}: {len(self.runs)} runs>'
+
+
+def parse_criterion(text):
+    """Parse a command-line filter 'KEY=VALUE', 'KEY=LO:HI' or 'KEY=A,B'."""
+    key, _, value = text.partition('=')
+
+    def number(word):
+        try:
+            return float(word) if word else None
+        except ValueError:
+            return word
+
+    if ':' in value:
+        lo, _, hi = value.partition(':')
+        return key, (number(lo), number(hi))
+    if ',' in value:
+        return key, [number(word) for word in value.split(',')]
+    return key, number(value)
+
+
+def print_runs(ds, params=('Re', 'U', 'nu', 'D', 'mesh')):
+    """Print the runs of a dataset with their parameters and fields."""
+    print(f"{'run':<28}" + ''.join(f'{p:>10}' for p in params) + '  fields')
+    for run in ds:
+        cells = ''.join(f"{'' if run.params.get(p) is None else run.params[p]!s:>10}"
+                        for p in params)
+        fields = ', '.join(f"{f}{list(run.store.shape(f))}" for f in run.fields)
+        print(f'{run.name:<28}{cells}  {fields}')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='List the runs of a sweep')
+    parser.add_argument('data_dir', nargs='?', default='data',
+                        help='Directory holding the run_* directories')
+    parser.add_argument('--where', action='append', default=[], type=parse_criterion,
+                        help='Filter as KEY=VALUE, KEY=LO:HI or KEY=A,B (repeatable)')
+
+    args = parser.parse_args()
+    ds = SweepDataset(args.data_dir).filter(**dict(args.where))
+    print_runs(ds)
+    print(f"{len(ds)} runs")
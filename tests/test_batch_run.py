@@ -0,0 +1,88 @@
+"""Run a small parallel sweep against the stub solver of benchmark.py."""
+
+import json
+import os
+import sys
+import pytest
+from benchmark import make_case
+from batch_run import main as run_batch
+from extract_data import STORE_DIR
+from foam_dict import FoamDict
+from manifest import Manifest, run_name
+from result_store import ResultStore, INDEX_FILE
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+POINTS = [(100.0, 1.0), (150.0, 1.0), (200.0, 1.5)]
+
+
+@pytest.fixture
+def sweep(tmp_path, monkeypatch):
+    """Write a synthetic template case and a sweep config into tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    make_case('case', 300, steps=4, template_dir=os.path.join(REPO_DIR, 'flow_cylinder'))
+    with open('sweep.json', 'w') as f:
+        json.dump({'Re': [Re for Re, _ in POINTS], 'velocity': [U for _, U in POINTS]}, f)
+    control = FoamDict.read(os.path.join('case', 'system', 'controlDict'))
+    solver = [sys.executable, os.path.join(REPO_DIR, 'benchmark.py'), 'solve']
+    return lambda: run_batch('sweep.json', float(control['endTime']), float(control['deltaT']),
+                             jobs=2, solver_cmd=solver, template_dir='case', render=False,
+                             cache_dir=None, manifest='manifest.sqlite',
+                             metrics_file='metrics.jsonl')
+
+
+def metrics_lines():
+    with open('metrics.jsonl') as f:
+        return f.read().splitlines()
+
+
+def test_parallel_sweep_publishes_runs(sweep):
+    sweep()
+
+    names = {run_name(Re, U) for Re, U in POINTS}
+    assert {name for name in os.listdir('data') if name.startswith('run_')} \
+        == {f'run_{name}' for name in names}
+    for Re, U in POINTS:
+        store = ResultStore(os.path.join('data', f'run_{run_name(Re, U)}', STORE_DIR))
+        assert set(store.fields) >= {'U', 'p', 'Cd', 'Cl'}
+        assert store.shape('p')[0] == 5
+        assert store.metadata['Re'] == Re and store.metadata['U'] == U
+
+    manifest = Manifest('manifest.sqlite')
+    points = manifest.points()
+    manifest.close()
+    assert {point['name'] for point in points} == names
+    assert all(point['state'] == 'done' and point['attempts'] == 1 for point in points)
+    assert len(metrics_lines()) == len(POINTS)
+    assert not os.listdir('work')
+
+
+def test_rerun_skips_done_points(sweep):
+    sweep()
+    stores = {name: os.path.getmtime(os.path.join('data', name, STORE_DIR, INDEX_FILE))
+              for name in os.listdir('data') if name.startswith('run_')}
+
+    sweep()
+
+    assert len(metrics_lines()) == len(POINTS)
+    assert {name: os.path.getmtime(os.path.join('data', name, STORE_DIR, INDEX_FILE))
+            for name in stores} == stores
+
+
+def test_failed_serial_solve_is_retried_and_marked_failed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_case('flow_cylinder', 300, steps=4,
+              template_dir=os.path.join(REPO_DIR, 'flow_cylinder'))
+    with open('sweep.json', 'w') as f:
+        json.dump({'Re': [100.0], 'velocity': [1.0]}, f)
+
+    run_batch('sweep.json', 0.4, 0.1, solver_cmd=['false'], cache_dir=None,
+              manifest='manifest.sqlite', metrics_file='metrics.jsonl', max_attempts=2,
+              retry_backoff=0)
+
+    manifest = Manifest('manifest.sqlite')
+    points = manifest.points()
+    manifest.close()
+    assert [(point['state'], point['attempts']) for point in points] == [('failed', 2)]
+    assert [json.loads(line)['status'] for line in metrics_lines()] == ['failed', 'failed']
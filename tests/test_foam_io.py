@@ -0,0 +1,94 @@
+"""Read small ASCII, binary and gzip fixtures with foam_io.read_field."""
+
+import gzip
+import numpy as np
+import pytest
+from foam_io import read_field
+
+
+HEADER = '''FoamFile
+{{
+    version     2.0;
+    format      {fmt};
+    arch        "LSB;label=32;scalar=64";
+    class       {cls};
+    object      {name};
+}}
+
+dimensions      [0 1 -1 0 0 0 0];
+
+'''
+
+BOUNDARY = b'''
+boundaryField
+{
+}
+'''
+
+SCALARS = np.array([0.5, -1.25, 3.0, 1e-3])
+VECTORS = np.array([[1.0, 0.0, 0.0], [0.5, -0.25, 0.0], [2.0, 1.5, 0.0], [0.0, 0.0, 1e-3]])
+
+
+def field_bytes(values, fmt='ascii', uniform=False):
+    """Return the contents of a volScalarField or volVectorField file."""
+    values = np.asarray(values, dtype=np.float64)
+    vector = values.ndim == 2
+    cls = 'volVectorField' if vector else 'volScalarField'
+    text = HEADER.format(fmt=fmt, cls=cls, name='U' if vector else 'p').encode()
+    if uniform:
+        value = '(%.17g %.17g %.17g)' % tuple(values[0]) if vector else '%.17g' % values[0]
+        return text + f'internalField   uniform {value};\n'.encode() + BOUNDARY
+    kind = 'vector' if vector else 'scalar'
+    text += f'internalField   nonuniform List<{kind}>\n{len(values)}\n('.encode()
+    if fmt == 'binary':
+        body = values.astype('<f8').tobytes()
+    elif vector:
+        body = ''.join('\n(%.17g %.17g %.17g)' % tuple(v) for v in values).encode() + b'\n'
+    else:
+        body = ''.join('\n%.17g' % v for v in values).encode() + b'\n'
+    return text + body + b')\n;\n' + BOUNDARY
+
+
+def write_fixture(tmp_path, name, data, compress=False):
+    path = tmp_path / (name + '.gz' if compress else name)
+    if compress:
+        with gzip.open(path, 'wb') as f:
+            f.write(data)
+    else:
+        path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize('values', [SCALARS, VECTORS], ids=['scalar', 'vector'])
+@pytest.mark.parametrize('fmt', ['ascii', 'binary'])
+@pytest.mark.parametrize('compress', [False, True], ids=['plain', 'gz'])
+def test_nonuniform_matches_ascii(tmp_path, values, fmt, compress):
+    reference = read_field(write_fixture(tmp_path, 'ref', field_bytes(values)))
+    path = write_fixture(tmp_path, 'field', field_bytes(values, fmt), compress)
+    result = read_field(path)
+    assert result.shape == values.shape == reference.shape
+    assert result.dtype == reference.dtype == np.float64
+    np.testing.assert_array_equal(result, reference)
+    np.testing.assert_array_equal(result, values)
+
+
+@pytest.mark.parametrize('values', [SCALARS, VECTORS], ids=['scalar', 'vector'])
+@pytest.mark.parametrize('compress', [False, True], ids=['plain', 'gz'])
+def test_uniform_expands_to_cells(tmp_path, values, compress):
+    path = write_fixture(tmp_path, 'field', field_bytes(values, uniform=True), compress)
+    single = read_field(path)
+    assert single.shape == (1,) + values.shape[1:]
+    result = read_field(path, n_cells=5)
+    assert result.shape == (5,) + values.shape[1:]
+    assert result.dtype == np.float64
+    np.testing.assert_array_equal(result, np.broadcast_to(values[0], result.shape))
+
+
+@pytest.mark.parametrize('fmt', ['ascii', 'binary'])
+@pytest.mark.parametrize('compress', [False, True], ids=['plain', 'gz'])
+def test_truncated_file_raises(tmp_path, fmt, compress):
+    data = field_bytes(VECTORS, fmt)
+    cut = data.index(b'(', data.index(b'List<vector>')) + 1 + 30
+    path = write_fixture(tmp_path, 'field', data[:cut], compress)
+    with pytest.raises(ValueError):
+        read_field(path)
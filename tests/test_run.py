@@ -0,0 +1,85 @@
+"""MPI mode of run.py against fake decompose, launcher and reconstruct tools."""
+
+import os
+import shutil
+import sys
+from foam_dict import FoamDict
+from run import modify_decompose_par_dict, run_parallel_simulation
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stand-in for the OpenFOAM tools: records its name, arguments and working
+# directory, and fails when its name is 'fail'
+FAKE_TOOL = '''import os, sys
+with open(os.environ['CALLS'], 'a') as f:
+    f.write(' '.join([sys.argv[1], os.getcwd()] + sys.argv[2:]) + '\\n')
+print(sys.argv[1], 'done')
+sys.exit(sys.argv[1] == 'fail')
+'''
+
+
+def fake_tools(tmp_path, monkeypatch):
+    script = tmp_path / 'tool.py'
+    script.write_text(FAKE_TOOL)
+    monkeypatch.setenv('CALLS', str(tmp_path / 'calls.txt'))
+    return lambda name: [sys.executable, str(script), name]
+
+
+def read_calls(tmp_path):
+    with open(tmp_path / 'calls.txt') as f:
+        return [line.split() for line in f]
+
+
+def make_case(tmp_path):
+    case_dir = str(tmp_path / 'case')
+    shutil.copytree(os.path.join(REPO_DIR, 'flow_cylinder', 'system'),
+                    os.path.join(case_dir, 'system'))
+    return case_dir
+
+
+def test_parallel_mode_runs_the_tools_in_order(tmp_path, monkeypatch):
+    tool = fake_tools(tmp_path, monkeypatch)
+    case_dir = make_case(tmp_path)
+    modify_decompose_par_dict(os.path.join(case_dir, 'system', 'decomposeParDict'), 6)
+
+    assert run_parallel_simulation(case_dir, 6, tool('icoFoam'), tool('mpirun'),
+                                   decompose_cmd=tool('decomposePar'),
+                                   reconstruct_cmd=tool('reconstructPar'))
+
+    assert read_calls(tmp_path) == [
+        ['decomposePar', case_dir],
+        ['mpirun', case_dir, '-np', '6', sys.executable, str(tmp_path / 'tool.py'),
+         'icoFoam', '-parallel'],
+        ['reconstructPar', case_dir],
+    ]
+    for log in ('log.decomposePar', 'log.icoFoam', 'log.reconstructPar'):
+        assert os.path.exists(os.path.join(case_dir, log))
+    decompose = FoamDict.read(os.path.join(case_dir, 'system', 'decomposeParDict'))
+    assert decompose['numberOfSubdomains'] == 6
+    assert decompose['method'] == 'hierarchical'
+    assert decompose['coeffs/n'] == [3, 2, 1]
+
+
+def test_parallel_mode_without_reconstruct(tmp_path, monkeypatch):
+    tool = fake_tools(tmp_path, monkeypatch)
+    case_dir = make_case(tmp_path)
+    assert run_parallel_simulation(case_dir, 2, tool('icoFoam'), tool('mpirun'),
+                                   reconstruct=False, decompose_cmd=tool('decomposePar'),
+                                   reconstruct_cmd=tool('reconstructPar'))
+    assert [call[0] for call in read_calls(tmp_path)] == ['decomposePar', 'mpirun']
+
+
+def test_parallel_mode_stops_at_a_failing_step(tmp_path, monkeypatch):
+    tool = fake_tools(tmp_path, monkeypatch)
+    case_dir = make_case(tmp_path)
+    assert not run_parallel_simulation(case_dir, 2, tool('icoFoam'), tool('fail'),
+                                       decompose_cmd=tool('decomposePar'),
+                                       reconstruct_cmd=tool('reconstructPar'))
+    assert [call[0] for call in read_calls(tmp_path)] == ['decomposePar', 'fail']
+
+
+def test_parallel_mode_reports_missing_tools(tmp_path):
+    case_dir = make_case(tmp_path)
+    assert not run_parallel_simulation(case_dir, 2, ['true'], ['env'],
+                                       decompose_cmd=[str(tmp_path / 'missing')])
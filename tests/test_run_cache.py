@@ -0,0 +1,38 @@
+"""Run cache entries and keys on a synthetic case."""
+
+import os
+import pytest
+import run_cache
+from benchmark import make_case, stub_solve
+from extract_data import extract_simulation_data
+from shedding import request_stop
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def case(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_case('case', 300, steps=4, template_dir=os.path.join(REPO_DIR, 'flow_cylinder'))
+    return 'case'
+
+
+def test_only_finished_runs_are_saved(case):
+    stub_solve(case)
+    extract_simulation_data(case, 'out')
+
+    assert run_cache.save('short', {}, 0.8, 'out', case, cache_dir='runs') is None
+    assert not os.path.exists(os.path.join('runs', 'short'))
+
+    path = run_cache.save('full', {}, 0.4, 'out', case, cache_dir='runs')
+    entry = run_cache.lookup('full', 'runs')
+    assert entry['path'] == path and run_cache.covers(entry, 0.4)
+    assert entry['latest_time'] == '0.4'
+
+
+def test_key_is_stable_across_an_early_stop(case):
+    params = {'Re': 100.0, 'U': 1.0}
+    key = run_cache.run_key(case, params)
+    request_stop(case)
+    assert run_cache.run_key(case, params) == key
@@ -0,0 +1,63 @@
+"""Convergence detection on synthetic force coefficient histories."""
+
+import numpy as np
+import pytest
+from shedding import check_convergence, detect_convergence, SheddingMonitor
+
+
+TIMES = np.arange(0.0, 60.0, 0.05)
+
+
+def periodic(times, strouhal=0.2, velocity=1.0, diameter=1.0):
+    """Return (cd, cl) of a settled shedding cycle at the given Strouhal number."""
+    phase = 2 * np.pi * strouhal * velocity / diameter * times
+    return 1.3 + 0.02 * np.cos(2 * phase), 0.5 * np.sin(phase)
+
+
+def test_sinusoid_settles_periodic():
+    cd, cl = periodic(TIMES)
+    index, state = detect_convergence(TIMES, cd, cl)
+    assert index is not None and index < len(TIMES) - 1
+    assert state['mode'] == 'periodic'
+    assert state['strouhal'] == pytest.approx(0.2, rel=1e-3)
+    assert state['cd_mean'] == pytest.approx(1.3, rel=1e-3)
+    assert state['cl_rms'] == pytest.approx(0.5 / np.sqrt(2), rel=0.02)
+
+
+def test_strouhal_scales_with_velocity_and_diameter():
+    cd, cl = periodic(TIMES, strouhal=0.2, velocity=2.0, diameter=0.5)
+    state = check_convergence(TIMES, cd, cl, velocity=2.0, diameter=0.5)
+    assert state['strouhal'] == pytest.approx(0.2, rel=1e-3)
+
+
+def test_constant_drag_settles_steady():
+    rng = np.random.default_rng(0)
+    cd = np.full(len(TIMES), 1.5)
+    cl = 1e-5 * rng.standard_normal(len(TIMES))
+    index, state = detect_convergence(TIMES, cd, cl)
+    assert state['mode'] == 'steady'
+    assert state['strouhal'] == 0.0
+    assert state['cd_mean'] == pytest.approx(1.5)
+    # The steady check needs steady_window convective times of history
+    assert TIMES[index] == pytest.approx(20.0, abs=0.1)
+
+
+@pytest.mark.parametrize('signals', [
+    lambda t: (1.0 + 0.05 * t, np.zeros_like(t)),
+    lambda t: (1.3 + 0.01 * t, 0.5 * np.sin(2 * np.pi * 0.2 * t)),
+    lambda t: (np.full_like(t, 1.3), 0.5 * np.sin(2 * np.pi * (0.1 * t + 0.002 * t ** 2))),
+], ids=['ramping-drag', 'drifting-mean-drag', 'ramping-frequency'])
+def test_ramping_signal_never_settles(signals):
+    cd, cl = signals(TIMES)
+    assert detect_convergence(TIMES, cd, cl) == (None, None)
+
+
+def test_monitor_stops_where_detect_convergence_does():
+    cd, cl = periodic(TIMES)
+    index, state = detect_convergence(TIMES, cd, cl)
+    monitor = SheddingMonitor()
+    for i, sample in enumerate(zip(TIMES, cd, cl)):
+        if monitor.update(*sample):
+            break
+    assert i == index
+    assert monitor.state == state
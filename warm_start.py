@@ -0,0 +1,161 @@
+"""Seed initial conditions from previously solved Reynolds numbers.
+
+A run started from the uniform fields in 0/ spends a long time in the
+start-up transient before vortex shedding develops. Neighbouring points
+of a sweep have similar flows, so 0/U and 0/p can instead be taken from
+the last stored time of the closest completed run (or interpolated
+between the two runs bracketing the new Reynolds number).
+
+The case's original 0/ is kept in 0.orig so a warm start (or the inlet
+velocity of a run) never leaks into later runs of the same case.
+"""
+
+import os
+import shutil
+from foam_io import find_field, mesh_hash, write_internal_field
+from result_store import open_store
+from extract_data import STORE_DIR
+
+
+# Pristine copy of the initial conditions, OpenFOAM's usual name for it
+ORIG_DIR = '0.orig'
+
+# Fields seeded from earlier runs, with the power of the velocity ratio
+# they scale with (kinematic pressure scales with U^2)
+SEED_FIELDS = {'U': 1, 'p': 2}
+
+
+def initial_dir(case_dir):
+    """Return the directory holding the unmodified initial conditions."""
+    orig = os.path.join(case_dir, ORIG_DIR)
+    return orig if os.path.isdir(orig) else os.path.join(case_dir, '0')
+
+
+def reset_initial_conditions(case_dir):
+    """Restore 0/ from 0.orig, saving 0/ as 0.orig first if there is none.
+
+    Runs that edit 0/ in place (warm starts, the inlet velocity) then
+    always start from the pristine files, and 0.orig stays unchanged for
+    the run cache key.
+    """
+    zero_dir = os.path.join(case_dir, '0')
+    orig = os.path.join(case_dir, ORIG_DIR)
+    if not os.path.isdir(orig):
+        shutil.copytree(zero_dir, orig)
+    shutil.copytree(orig, zero_dir, dirs_exist_ok=True)
+
+
+def completed_runs(data_dir='data', mesh=None):
+    """List the finished runs in data_dir that can seed a new run.
+
+    Args:
+        data_dir: Directory holding run_* output directories
+        mesh: Mesh hash the runs must match, or None to accept any mesh
+
+    Returns:
+        list: dicts with the store path, Re, U and last stored time
+    """
+    runs = []
+    if not os.path.isdir(data_dir):
+        return runs
+    for name in sorted(os.listdir(data_dir)):
+        if not name.startswith('run_'):
+            continue
+        try:
+            store = open_store(os.path.join(data_dir, name, STORE_DIR))
+        except FileNotFoundError:
+            continue
+        meta = store.metadata
+        if 'Re' not in meta or any(f not in store.fields for f in SEED_FIELDS):
+            continue
+        if mesh is not None and meta.get('mesh_hash') != mesh:
+            continue
+        runs.append({
+            'path': store.path,
+            'Re': float(meta['Re']),
+            'U': float(meta.get('U', 1.0)),
+            'time': float(store.times('U')[-1]),
+        })
+    return runs
+
+
+def nearest_runs(runs, Re, interpolate=False):
+    """Choose the runs to seed from and their weights.
+
+    Args:
+        runs: Candidates from completed_runs
+        Re: Reynolds number of the new run
+        interpolate: Blend the two runs bracketing Re linearly in Re;
+            falls back to the nearest run when Re is outside their range
+
+    Returns:
+        list: (run, weight) pairs, empty if there are no candidates
+    """
+    if not runs:
+        return []
+    if interpolate:
+        below = [r for r in runs if r['Re'] <= Re]
+        above = [r for r in runs if r['Re'] >= Re]
+        if below and above:
+            lo = max(below, key=lambda r: (r['Re'], r['time']))
+            hi = min(above, key=lambda r: (r['Re'], -r['time']))
+            if hi['Re'] > lo['Re']:
+                w = (Re - lo['Re']) / (hi['Re'] - lo['Re'])
+                return [(lo, 1.0 - w), (hi, w)]
+            return [(lo, 1.0)]
+    nearest = min(runs, key=lambda r: (abs(r['Re'] - Re), -r['time']))
+    return [(nearest, 1.0)]
+
+
+def seed_fields(sources, velocity):
+    """Blend the last stored U and p of the source runs.
+
+    Each source is rescaled to the new inlet velocity before blending.
+
+    Args:
+        sources: (run, weight) pairs from nearest_runs
+        velocity: Inlet velocity of the new run
+
+    Returns:
+        dict: Field name -> cell values
+    """
+    fields = {}
+    for run, weight in sources:
+        store = open_store(run['path'])
+        ratio = velocity / run['U']
+        for name, power in SEED_FIELDS.items():
+            values = store.read(name, -1) * (weight * ratio ** power)
+            fields[name] = fields[name] + values if name in fields else values
+    return fields
+
+
+def warm_start(case_dir, Re, velocity, data_dir='data', interpolate=False):
+    """Seed 0/U and 0/p of a case from the closest completed runs.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        Re: Reynolds number of the new run
+        velocity: Inlet velocity of the new run
+        data_dir: Directory holding the completed run_* outputs
+        interpolate: Interpolate between the two nearest runs
+
+    Returns:
+        list: Names of the seeding runs (empty for a cold start)
+    """
+    reset_initial_conditions(case_dir)
+    sources = nearest_runs(completed_runs(data_dir, mesh_hash(case_dir)), Re, interpolate)
+    if not sources:
+        print("No completed run to warm start from; using the initial conditions in 0/")
+        return []
+
+    zero_dir = os.path.join(case_dir, '0')
+    orig = os.path.join(case_dir, ORIG_DIR)
+    for name, values in seed_fields(sources, velocity).items():
+        template = find_field(orig, name)
+        write_internal_field(template, os.path.join(zero_dir, os.path.basename(template)),
+                             values)
+
+    names = [os.path.basename(os.path.dirname(run['path'])) for run, _ in sources]
+    weights = ', '.join(f"{name} ({weight:.2f})" for name, (_, weight) in zip(names, sources))
+    print(f"Warm start from {weights}")
+    return names